@@ -0,0 +1,505 @@
+"""Command line entry point for FAIRyTale.
+
+Usage:
+    python fairytale.py validate <project> [--format text|json|jsonl|sarif] [--output FILE] [--cache] [--quiet]
+                                 [--enable RULE] [--disable RULE] [--rule-stats] [--pdf FILE]
+                                 [--profile [FILE]] [--profile-format chrome|speedscope]
+    python fairytale.py validate-many <root-or-listfile> [--workers N] [--summary FILE] [--pdf] [--cache]
+    python fairytale.py manifest <project> [--workers N]
+    python fairytale.py data-dictionary <project> [--output FILE] [--workers N]
+    python fairytale.py to-parquet <project> [--workers N] [--force]
+    python fairytale.py duplicates <project> [--min-size BYTES] [--workers N]
+    python fairytale.py watch <project> [--enable RULE] [--disable RULE]
+    python fairytale.py extract <archive.zip> [destination]
+    python fairytale.py publish <project> [--sandbox | --url URL] [--token TOKEN] [--deposition ID] [--workers N]
+                                [--chunk-mb N] [--force] [--mock [--fail-every N]]
+    python fairytale.py zenodo-mock [--port N] [--token TOKEN] [--fail-every N]
+    python fairytale.py bench [--subjects N] [--sessions N] [--runs N] [--files N] [--size BYTES] [--depth N]
+                              [--repeat N] [--only NAME] [--baseline FILE] [--save-baseline] [--tolerance F]
+"""
+import argparse
+import sys
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fairytale", description="FAIRyTale: give your data a happily-ever-after")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate = subparsers.add_parser("validate", help="Validate one project (directory or .zip)")
+    validate.add_argument("project", help="Path to the project directory or ZIP archive")
+    validate.add_argument("-f", "--format", choices=["text", "json", "jsonl", "sarif"], default="text",
+                          help="Output format (default: text)")
+    validate.add_argument("-o", "--output", default=None, help="Write the report to this file instead of stdout")
+    validate.add_argument("--cache", action="store_true", help="Reuse the incremental validation cache between runs")
+    validate.add_argument("-q", "--quiet", action="store_true",
+                          help="Print nothing; the exit code is 0 if all required checks passed and 1 otherwise "
+                               "(a report is still written with --output)")
+    validate.add_argument("--enable", action="append", default=[], metavar="RULE",
+                          help="Enable a rule that is off by default (repeatable)")
+    validate.add_argument("--disable", action="append", default=[], metavar="RULE", help="Disable a rule (repeatable)")
+    validate.add_argument("--rule-stats", action="store_true",
+                          help="Print the wall time and filesystem calls of each rule (to stderr)")
+    validate.add_argument("--pdf", default=None, metavar="FILE", help="Also write the PDF report to FILE")
+    validate.add_argument("--profile", nargs="?", const="fairytale-profile.json", default=None, metavar="FILE",
+                          help="Record a trace of every phase and rule to FILE (default: fairytale-profile.json) "
+                               "and print a summary to stderr")
+    validate.add_argument("--profile-format", choices=["chrome", "speedscope"], default="chrome",
+                          help="Trace format: chrome (chrome://tracing, Perfetto) or speedscope (default: chrome)")
+
+    many = subparsers.add_parser("validate-many", help="Validate many projects in parallel")
+    many.add_argument("target", help="Directory whose subdirectories are projects, or a file with one project path per line")
+    many.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    many.add_argument("-s", "--summary", default="validation_summary.json", help="Where to write the aggregate JSON summary")
+    many.add_argument("--pdf", action="store_true", help="Also write validation_report.pdf inside each project")
+    many.add_argument("--cache", action="store_true", help="Reuse the incremental validation cache between runs")
+
+    manifest = subparsers.add_parser("manifest", help="Write 05_meta/manifest-sha256.txt for all files under 02_data/")
+    manifest.add_argument("project", help="Path to the project directory")
+    manifest.add_argument("-w", "--workers", type=int, default=None, help="Number of hashing threads")
+
+    dictionary = subparsers.add_parser(
+        "data-dictionary", help="Draft 05_meta/data_dictionary.csv from the tabular files under 02_data/"
+    )
+    dictionary.add_argument("project", help="Path to the project directory")
+    dictionary.add_argument("-o", "--output", default=None, help="Where to write the dictionary (default: 05_meta/data_dictionary.csv)")
+    dictionary.add_argument("-w", "--workers", type=int, default=None, help="Number of files profiled in parallel")
+
+    parquet = subparsers.add_parser(
+        "to-parquet", help="Write Parquet copies of the tables in 02_data/01_raw to 02_data/02_preproc"
+    )
+    parquet.add_argument("project", help="Path to the project directory")
+    parquet.add_argument("-w", "--workers", type=int, default=None, help="Number of files converted in parallel")
+    parquet.add_argument("--force", action="store_true", help="Convert again even if the Parquet copy is up to date")
+
+    duplicates = subparsers.add_parser("duplicates", help="List files stored more than once in a project")
+    duplicates.add_argument("project", help="Path to the project directory")
+    duplicates.add_argument("--min-size", type=int, default=None, metavar="BYTES",
+                            help="Ignore files smaller than this (default: 1024)")
+    duplicates.add_argument("-w", "--workers", type=int, default=None, help="Number of hashing threads")
+
+    watch = subparsers.add_parser("watch", help="Validate a project again every time it changes")
+    watch.add_argument("project", help="Path to the project directory")
+    watch.add_argument("--enable", action="append", default=[], metavar="RULE",
+                       help="Enable a rule that is off by default (repeatable)")
+    watch.add_argument("--disable", action="append", default=[], metavar="RULE", help="Disable a rule (repeatable)")
+
+    extract = subparsers.add_parser(
+        "extract", help="Safely extract a project ZIP (size, compression and path checks; restores deduplicated copies)"
+    )
+    extract.add_argument("archive", help="Path to the ZIP archive")
+    extract.add_argument("destination", nargs="?", default=None,
+                         help="Folder to create (default: the archive name without .zip, next to it)")
+
+    publish = subparsers.add_parser(
+        "publish", help="Upload a validated project to a Zenodo draft deposition (unchanged files are skipped)"
+    )
+    publish.add_argument("project", help="Path to the project directory")
+    target = publish.add_mutually_exclusive_group()
+    target.add_argument("--url", default=None, help="Zenodo API URL (default: $FAIRYTALE_ZENODO_URL or https://zenodo.org/api)")
+    target.add_argument("--sandbox", action="store_true", help="Use the Zenodo sandbox (sandbox.zenodo.org)")
+    target.add_argument("--mock", action="store_true",
+                        help="Upload to a local stand-in of the Zenodo API started for this run (nothing leaves the machine)")
+    publish.add_argument("--token", default=None, help="Zenodo access token (default: $FAIRYTALE_ZENODO_TOKEN)")
+    publish.add_argument("--deposition", type=int, default=None, metavar="ID",
+                         help="Add to this draft deposition (default: the one used last time, or a new one)")
+    publish.add_argument("-w", "--workers", type=int, default=None, help="Uploads in flight at once (default: 4)")
+    publish.add_argument("--chunk-mb", type=int, default=None,
+                         help="Files above this size are uploaded in resumable parts of this size (default: 16)")
+    publish.add_argument("--force", action="store_true", help="Publish even if required checks fail")
+    publish.add_argument("--fail-every", type=int, default=0, metavar="N",
+                         help="With --mock, answer every Nth request with 503 to exercise the retries")
+
+    mock = subparsers.add_parser("zenodo-mock", help="Run a local stand-in of the Zenodo deposition API")
+    mock.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    mock.add_argument("--token", default=None, help="Access token to require (default: fairytale-mock-token)")
+    mock.add_argument("--fail-every", type=int, default=0, metavar="N", help="Answer every Nth request with 503")
+
+    bench = subparsers.add_parser("bench", help="Benchmark validation, PDF, ZIP export and scaffolding on a synthetic project")
+    bench.add_argument("--subjects", type=int, default=10, help="Number of sub- folders")
+    bench.add_argument("--sessions", type=int, default=2, help="Number of ses- folders per subject")
+    bench.add_argument("--runs", type=int, default=2, help="Number of run- folders per session")
+    bench.add_argument("--files", type=int, default=5, help="Data files per run folder")
+    bench.add_argument("--size", type=int, default=16 * 1024, help="Size of each data file in bytes")
+    bench.add_argument("--depth", type=int, default=0, help="Extra directory levels below each run folder")
+    bench.add_argument("--repeat", type=int, default=3, help="Repetitions per benchmark (the median is reported)")
+    bench.add_argument("--only", action="append", default=None, metavar="NAME",
+                       help="Run only this benchmark (repeatable)")
+    bench.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline file to compare against")
+    bench.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    bench.add_argument("--tolerance", type=float, default=0.2,
+                       help="Allowed slowdown relative to the baseline before failing (default: 0.2 = 20%%)")
+    bench.add_argument("--keep", default=None, metavar="DIR",
+                       help="Generate the project in DIR and keep it instead of using a temporary directory")
+
+    return parser
+
+
+def validate(project, output_format="text", output=None, use_cache=False, enabled_rules=(), disabled_rules=(),
+             rule_stats=False, pdf=None, profile=None, profile_format="chrome", quiet=False):
+    """Validate one project and print (or write) the findings in the requested format
+
+    With quiet, nothing is printed and only the return code reports the result;
+    rich (and fpdf, unless pdf is given) are then never imported.
+    """
+    import json
+    from utils.project_index import ZipProjectIndex
+    from utils.findings import finding_to_jsonl
+    from utils.profiling import Profiler, profile_span
+    from utils.validator_class import OpenScienceValidator
+
+    profiler = Profiler() if profile else None
+    stream = open(output, "w", encoding="utf-8") if output else (None if quiet else sys.stdout)
+    verbose = output_format == "text" and not quiet
+    # JSONL is streamed while validating; the other machine-readable formats are written at the end
+    on_finding = (
+        (lambda finding: stream.write(finding_to_jsonl(finding))) if output_format == "jsonl" and stream else None
+    )
+    index = None
+    try:
+        if project.lower().endswith(".zip"):
+            with profile_span(profiler, "index.build"):
+                index = ZipProjectIndex(project).build()
+            validator = OpenScienceValidator(index.project_path, verbose=verbose, index=index,
+                                             on_finding=on_finding, enabled_rules=enabled_rules,
+                                             disabled_rules=disabled_rules, profiler=profiler)
+        else:
+            validator = OpenScienceValidator(project, use_cache=use_cache, verbose=verbose,
+                                             on_finding=on_finding, enabled_rules=enabled_rules,
+                                             disabled_rules=disabled_rules, profiler=profiler)
+        validator.validate_structure()
+        if pdf:
+            validator.generate_pdf_report(pdf)
+
+        if stream is None:
+            # --quiet without --output: the exit code is the whole report
+            pass
+        elif output_format == "json":
+            json.dump(validator.to_json(), stream, indent=2, ensure_ascii=False)
+            stream.write("\n")
+        elif output_format == "sarif":
+            json.dump(validator.to_sarif(), stream, indent=2, ensure_ascii=False)
+            stream.write("\n")
+        elif output_format == "text" and output:
+            for key in ("passed", "failed", "warnings", "recommendations"):
+                for message in validator.validation_results[key]:
+                    stream.write(f"{message}\n")
+    finally:
+        if index is not None:
+            index.close()
+        if output:
+            stream.close()
+
+    if rule_stats:
+        from rich.console import Console
+        from rich.table import Table
+        table = Table(title="Rule Timings")
+        table.add_column("Rule", style="cyan", no_wrap=True)
+        table.add_column("Runs", justify="right")
+        table.add_column("Cached", justify="right")
+        table.add_column("Time (ms)", justify="right")
+        table.add_column("FS calls", justify="right")
+        for name, stats in sorted(validator.rule_stats.items(), key=lambda item: -item[1]["seconds"]):
+            table.add_row(name, str(stats["runs"]), str(stats["cached"]),
+                          f"{stats['seconds'] * 1000:.2f}", str(stats["fs_calls"]))
+        Console(stderr=True).print(table)
+
+    if profiler is not None:
+        profiler.write(profile, profile_format)
+        if not quiet:
+            from rich.console import Console
+            console = Console(stderr=True)
+            console.print(profiler.summary_table())
+            console.print(f"[green]📄 {profile_format.capitalize()} trace saved to: {profile}[/green]")
+
+    return 1 if validator.validation_results["failed"] else 0
+
+
+def list_duplicates(project, min_size=None, workers=None):
+    """Print the groups of identical files in a project and the space their copies take"""
+    from rich import print
+    from rich.table import Table
+    from utils.duplicates import MIN_SIZE, find_duplicates, format_size
+    from utils.project_index import ProjectIndex
+
+    index = ProjectIndex(project).build()
+    if not index.is_dir(""):
+        raise FileNotFoundError(f"Project directory not found: {project}")
+    report = find_duplicates(index, min_size=MIN_SIZE if min_size is None else min_size, workers=workers)
+
+    if report["groups"]:
+        table = Table(title="Duplicate Files")
+        table.add_column("Kept", style="cyan")
+        table.add_column("Copies")
+        table.add_column("Size", justify="right")
+        table.add_column("Reclaimable", justify="right")
+        for group in report["groups"]:
+            table.add_row(group.paths[0], "\n".join(group.paths[1:]), format_size(group.size),
+                          format_size(group.size * (len(group.paths) - 1)))
+        print(table)
+    print(
+        f"[green]🔍 {report['duplicate_files']} duplicate file(s) among {report['files']} files, "
+        f"{format_size(report['reclaimable_bytes'])} reclaimable "
+        f"({report['partial_hashed']} partially hashed, {report['full_hashed']} fully hashed)[/green]"
+    )
+    return 0
+
+
+def watch_table(watch, previous):
+    """Render the failed checks and warnings of the latest validation; new ones since the previous are marked"""
+    from rich.table import Table
+
+    validator = watch.validator
+    results = validator.validation_results
+    issues = [finding for finding in validator.findings if finding.severity != "pass"]
+    issues.sort(key=lambda finding: finding.severity != "fail")
+
+    changes = ", ".join(watch.last_changes[:3]) + (f" and {len(watch.last_changes) - 3} more" if len(watch.last_changes) > 3 else "")
+    table = Table(
+        title=f"FAIRyTale watch: {watch.project_path.name}",
+        caption=(f"✓ {len(results['passed'])} passed  ✗ {len(results['failed'])} failed  "
+                 f"⚠ {len(results['warnings'])} warnings  |  validation #{watch.revision} in "
+                 f"{watch.seconds * 1000:.0f} ms" + (f" after changes to {changes}" if changes else "")
+                 + (f"  |  [red]last update failed: {watch.error}[/red]" if watch.error else "")
+                 + "  |  Ctrl+C to stop"),
+    )
+    table.add_column("", no_wrap=True)
+    table.add_column("Rule", style="cyan", no_wrap=True)
+    table.add_column("Message")
+    for finding in issues:
+        symbol = "[red]✗[/red]" if finding.severity == "fail" else "[yellow]⚠[/yellow]"
+        new = previous is not None and (finding.rule_id, finding.path, finding.message) not in previous
+        table.add_row(symbol, finding.rule_id, f"[bold]{finding.message}[/bold]" if new else finding.message)
+    return table
+
+
+def watch_project(project, enabled_rules=(), disabled_rules=()):
+    """Validate a project, then validate it again on every change until interrupted"""
+    import time
+    from rich.live import Live
+    from utils.project_watch import ProjectWatch
+
+    live = Live(f"🔍 Indexing and validating {project}...", auto_refresh=False, vertical_overflow="visible")
+    seen = [None]
+
+    def update(watch):
+        live.update(watch_table(watch, seen[0]), refresh=True)
+        seen[0] = {(finding.rule_id, finding.path, finding.message) for finding in watch.validator.findings}
+
+    watch = ProjectWatch(project, enabled_rules, disabled_rules, on_update=update)
+    with live:
+        watch.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watch.stop()
+    return 0
+
+
+def publish_project(project, url=None, token=None, deposition=None, workers=None, chunk_mb=None, force=False,
+                    mock=False, fail_every=0):
+    """Validate a project, then upload it to a Zenodo draft deposition with a progress bar"""
+    import os
+    import requests
+    from rich import print
+    from rich.progress import BarColumn, DownloadColumn, Progress, TimeRemainingColumn, TransferSpeedColumn
+    from utils.validator_class import OpenScienceValidator
+    from utils.zenodo_mock import MOCK_TOKEN, MockZenodoServer
+    from utils.zenodo_publish import (
+        CHUNK_SIZE, PUBLISH_CONCURRENCY, ZENODO_API_URL, ZenodoError, ZenodoPublisher
+    )
+
+    token = token or os.environ.get("FAIRYTALE_ZENODO_TOKEN")
+    if not mock and not token:
+        print("[red]✗ A Zenodo access token is needed: pass --token or set FAIRYTALE_ZENODO_TOKEN[/red]")
+        return 1
+
+    validator = OpenScienceValidator(project, verbose=False)
+    validator.validate_structure()
+    failed = validator.validation_results["failed"]
+    if not validator.index.is_dir(""):
+        raise FileNotFoundError(f"Project directory not found: {project}")
+    if failed and not force:
+        print(f"[red]✗ {len(failed)} required check(s) failed; fix them (see `fairytale.py validate`) "
+              f"or publish anyway with --force[/red]")
+        return 1
+
+    server = MockZenodoServer(fail_every=fail_every).start() if mock else None
+    progress = Progress("[progress.description]{task.description}", BarColumn(), DownloadColumn(),
+                        TransferSpeedColumn(), TimeRemainingColumn())
+    task = progress.add_task("📤 Uploading", total=None)
+    publisher = ZenodoPublisher(
+        project, server.url if mock else url or ZENODO_API_URL, MOCK_TOKEN if mock else token,
+        workers or PUBLISH_CONCURRENCY, chunk_mb * 1024 * 1024 if chunk_mb else CHUNK_SIZE,
+        on_progress=lambda done, total: progress.update(task, completed=done, total=total),
+    )
+    try:
+        with progress:
+            summary = publisher.publish(deposition, index=validator.index)
+    except ZenodoError as e:
+        print(f"[red]✗ {e}[/red]")
+        return 1
+    except requests.RequestException as e:
+        print(f"[red]✗ Could not reach {publisher.base_url}: {e}[/red]")
+        return 1
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    for rel_path, error in summary["failed"].items():
+        print(f"[red]✗ Could not upload {rel_path}: {error}[/red]")
+    if summary["remote_only"]:
+        print(f"[yellow]⚠ {len(summary['remote_only'])} file(s) in the deposition are not in the project: "
+              f"{', '.join(summary['remote_only'][:5])}{' ...' if len(summary['remote_only']) > 5 else ''}[/yellow]")
+    resumed = f", {summary['resumed']} resumed" if summary["resumed"] else ""
+    retries = f", {summary['retries']} retried request(s)" if summary["retries"] else ""
+    print(
+        f"[green]📤 Uploaded {len(summary['uploaded'])} file(s) ({summary['bytes'] / 1e6:.1f} MB{resumed}), "
+        f"skipped {summary['skipped']} unchanged, in {summary['seconds']}s{retries}[/green]"
+    )
+    where = "the local mock server; nothing was sent to Zenodo" if mock else summary["url"]
+    print(f"[green]📦 Draft deposition {summary['deposition']} ({where}): review and publish it on Zenodo[/green]")
+    return 1 if summary["failed"] else 0
+
+
+def run_mock_zenodo(port=8765, token=None, fail_every=0):
+    """Serve the local Zenodo stand-in until interrupted"""
+    import time
+    from rich import print
+    from utils.zenodo_mock import MOCK_TOKEN, MockZenodoServer
+
+    server = MockZenodoServer(port=port, token=token or MOCK_TOKEN, fail_every=fail_every).start()
+    print(f"[green]🧪 Mock Zenodo API at {server.url} (token: {server.zenodo.token}); Ctrl+C to stop[/green]")
+    print(f"   python fairytale.py publish <project> --url {server.url} --token {server.zenodo.token}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    from utils.safe_zip import UnsafeArchiveError
+    try:
+        return run_command(parser, args)
+    except (FileNotFoundError, FileExistsError, UnsafeArchiveError) as e:
+        from rich import print
+        print(f"[red]✗ {e}[/red]")
+        return 1
+
+
+def run_command(parser, args):
+    if args.command == "validate":
+        from utils.rules import default_rules
+        unknown = set(args.enable + args.disable) - set(default_rules().names())
+        if unknown:
+            parser.error(f"unknown rule(s): {', '.join(sorted(unknown))}")
+        return validate(args.project, args.format, args.output, args.cache, args.enable, args.disable, args.rule_stats,
+                        args.pdf, args.profile, args.profile_format, args.quiet)
+
+    if args.command == "validate-many":
+        from utils.batch_validation import run_batch
+        return run_batch(args.target, args.workers, args.summary, args.pdf, args.cache)
+
+    if args.command == "manifest":
+        from rich import print
+        from utils.checksum_manifest import generate_manifest
+        summary = generate_manifest(args.project, args.workers)
+        print(
+            f"[green]📄 Manifest saved to: {summary['manifest']} "
+            f"({summary['files']} files, {summary['hashed']} hashed, {summary['reused']} unchanged, "
+            f"{summary['seconds']}s)[/green]"
+        )
+        return 0
+
+    if args.command == "data-dictionary":
+        from rich import print
+        from utils.data_dictionary import generate_data_dictionary
+        summary = generate_data_dictionary(args.project, args.output, args.workers)
+        for source, error in summary["failed"].items():
+            print(f"[red]✗ Could not read {source}: {error}[/red]")
+        print(
+            f"[green]📄 Data dictionary saved to: {summary['dictionary']} "
+            f"({summary['variables']} variables in {summary['files']} files, {summary['seconds']}s)[/green]"
+        )
+        return 1 if summary["failed"] else 0
+
+    if args.command == "to-parquet":
+        from rich import print
+        from utils.parquet_conversion import convert_raw_to_parquet
+        summary = convert_raw_to_parquet(args.project, args.workers, args.force)
+        for source, error in summary["failed"].items():
+            print(f"[red]✗ Could not convert {source}: {error}[/red]")
+        print(
+            f"[green]🗜  Converted {len(summary['converted'])} file(s) "
+            f"({summary['source_bytes'] / 1e6:.1f} MB → {summary['parquet_bytes'] / 1e6:.1f} MB), "
+            f"{len(summary['unchanged'])} unchanged, mapping saved to: {summary['mapping']} "
+            f"({summary['seconds']}s)[/green]"
+        )
+        return 1 if summary["failed"] else 0
+
+    if args.command == "duplicates":
+        return list_duplicates(args.project, args.min_size, args.workers)
+
+    if args.command == "watch":
+        from utils.rules import default_rules
+        unknown = set(args.enable + args.disable) - set(default_rules().names())
+        if unknown:
+            parser.error(f"unknown rule(s): {', '.join(sorted(unknown))}")
+        return watch_project(args.project, args.enable, args.disable)
+
+    if args.command == "extract":
+        from pathlib import Path
+        from rich import print
+        from utils.safe_zip import extract_project
+        destination = args.destination or Path(args.archive).with_suffix("")
+        summary = extract_project(args.archive, destination)
+        restored = f", {summary['restored_duplicates']} duplicate(s) restored" if summary["restored_duplicates"] else ""
+        print(f"[green]📂 Extracted {summary['members']} members to: {summary['project']}{restored}[/green]")
+        return 0
+
+    if args.command == "publish":
+        if args.fail_every and not args.mock:
+            parser.error("--fail-every only applies to --mock")
+        from utils.zenodo_publish import ZENODO_SANDBOX_URL
+        url = ZENODO_SANDBOX_URL if args.sandbox else args.url
+        return publish_project(args.project, url, args.token, args.deposition, args.workers, args.chunk_mb,
+                               args.force, args.mock, args.fail_every)
+
+    if args.command == "zenodo-mock":
+        return run_mock_zenodo(args.port, args.token, args.fail_every)
+
+    if args.command == "bench":
+        from rich import print
+        from utils.benchmark import (
+            BENCHMARKS, compare_with_baseline, load_baseline, over_budget, print_report, run_benchmarks, save_baseline
+        )
+        unknown = set(args.only or []) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))} (choose from {', '.join(BENCHMARKS)})")
+
+        report = run_benchmarks(
+            args.only, args.repeat, args.keep, subjects=args.subjects, sessions=args.sessions, runs=args.runs,
+            files_per_run=args.files, file_size=args.size, depth=args.depth
+        )
+        baseline = None if args.save_baseline else load_baseline(args.baseline)
+        regressions = compare_with_baseline(report, baseline, args.tolerance) if baseline else []
+        over = over_budget(report)
+        print_report(report, baseline, regressions, over)
+        if args.save_baseline:
+            save_baseline(report, args.baseline)
+            print(f"[green]📄 Baseline saved to: {args.baseline}[/green]")
+        return 1 if regressions or over else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
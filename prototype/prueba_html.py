@@ -1,10 +1,43 @@
+import argparse
+import glob
+import json
 import os
-import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich import print
+from rich.progress import Progress, BarColumn, DownloadColumn, TextColumn, TimeRemainingColumn
 from pathlib import Path
 from datetime import datetime
 
-def ask_and_copy_files(target_dir, category_name, report_data):
+# Run from anywhere: the shared helpers live in the repository's utils package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.file_transfer import ingest_file
+
+# Folders of a new project and the category of files that goes into each
+PROJECT_DIRS = {
+    # These directories will go under the 'file' folder
+    "file/data/raw": "raw data",
+    "file/data/processed": "processed data",
+    "file/code/analysis": "analysis code",
+    "file/code/src": "source code",
+    "file/code/notebooks": "Jupyter notebooks",
+    "file/code/env": "environment files",
+    "file/results/figures": "figures",
+    "file/results/tables": "tables",
+
+    # These folders will go outside of 'file' folder
+    "docs": "documentation files",
+    "output-report": "output reports"
+}
+
+
+def ingest(src, target_dir, report_data, hardlink=False):
+    """Copy one file into the project the cheapest way available, counting the method used."""
+    method = ingest_file(src, Path(target_dir) / src.name, hardlink=hardlink)
+    report_data["copy_methods"][method] = report_data["copy_methods"].get(method, 0) + 1
+    return method
+
+def ask_and_copy_files(target_dir, category_name, report_data, hardlink=False):
     """Asks user if they want to add files to a given category and copies them."""
     has_files = input(f"Do you have {category_name} files to add? (y/n): ").strip().lower()
 
@@ -15,9 +48,14 @@ def ask_and_copy_files(target_dir, category_name, report_data):
                 break
             src = Path(file_path)
             if src.exists() and src.is_file():
-                shutil.copy(src, target_dir)
-                print(f"[green]Copied {src.name} to {target_dir}[/green]")
-                report_data["added_files"].append(f"File {src.name} copied to {target_dir}")
+                try:
+                    method = ingest(src, target_dir, report_data, hardlink)
+                except OSError as e:
+                    print(f"[red]Could not copy {src}: {e}[/red]")
+                    report_data["errors"].append(f"Could not copy {src}: {e}")
+                    continue
+                print(f"[green]Copied {src.name} to {target_dir} ({method})[/green]")
+                report_data["added_files"].append(f"File {src.name} copied to {target_dir} ({method})")
             else:
                 print(f"[red]File {src} not found. Try again.[/red]")
                 report_data["errors"].append(f"File {src} not found")
@@ -25,31 +63,111 @@ def ask_and_copy_files(target_dir, category_name, report_data):
         print(f"[yellow]{category_name.capitalize()} folder will be empty.[/yellow]")
         report_data["added_files"].append(f"{category_name.capitalize()} folder will be empty.")
 
-def create_directory_structure(base_path, report_data):
-    """Creates the main project structure under 'file' and outside."""
-    dirs_to_create = {
-        # These directories will go under the 'file' folder
-        "file/data/raw": "raw data",
-        "file/data/processed": "processed data",
-        "file/code/analysis": "analysis code",
-        "file/code/src": "source code",
-        "file/code/notebooks": "Jupyter notebooks",
-        "file/code/env": "environment files",
-        "file/results/figures": "figures",
-        "file/results/tables": "tables",
-        
-        # These folders will go outside of 'file' folder
-        "docs": "documentation files",
-        "output-report": "output reports"
-    }
+def load_manifest(manifest_path):
+    """Read a YAML or JSON manifest mapping folders to the files to copy into them.
+
+    Keys are project folders ("file/data/raw") or their category names ("raw data");
+    values are a path or glob, or a list of them, relative to the manifest's folder.
+    Returns {folder: [patterns]}.
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        if manifest_path.suffix.lower() in (".yml", ".yaml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is needed for YAML manifests (pip install pyyaml), or use a JSON manifest")
+            manifest = yaml.safe_load(f) or {}
+        else:
+            manifest = json.load(f)
+    if not isinstance(manifest, dict):
+        raise ValueError(f"{manifest_path} must map folders to lists of files")
+
+    folders = {category.lower(): relative_path for relative_path, category in PROJECT_DIRS.items()}
+    entries = {}
+    for key, patterns in manifest.items():
+        relative_path = key if key in PROJECT_DIRS else folders.get(str(key).lower())
+        if relative_path is None:
+            raise ValueError(f"Unknown folder or category '{key}' in {manifest_path}")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        # Relative patterns are resolved against the manifest, not the current directory
+        entries.setdefault(relative_path, []).extend(
+            str(manifest_path.parent / os.path.expanduser(pattern)) for pattern in patterns or []
+        )
+    return entries
+
+
+def resolve_manifest_files(manifest, base_path, report_data):
+    """Expand the manifest's globs into (source, target folder) pairs, recording patterns that match nothing."""
+    copies = []
+    for relative_path, patterns in manifest.items():
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            files = [Path(match) for match in matches if os.path.isfile(match)]
+            if not files:
+                print(f"[red]File {pattern} not found.[/red]")
+                report_data["errors"].append(f"File {pattern} not found")
+            copies.extend((src, base_path / relative_path) for src in files)
+    return copies
+
 
+def copy_files(copies, report_data, workers=None, hardlink=False):
+    """Copy (source, target folder) pairs in a thread pool, showing the bytes copied so far."""
+    # The manifest flattens globbed files into their folder: sources sharing a name would race for one target
+    by_target = {}
+    for src, target_dir in copies:
+        sources = by_target.setdefault(target_dir / src.name, [])
+        if src not in sources:
+            sources.append(src)
+    copies = []
+    for target, sources in by_target.items():
+        if len(sources) == 1:
+            copies.append((sources[0], target.parent))
+            continue
+        message = (f"Not copied: {len(sources)} files named {target.name} would all go to {target.parent} "
+                   f"({', '.join(str(src) for src in sources)})")
+        print(f"[red]{message}[/red]")
+        report_data["errors"].append(message)
+    if not copies:
+        return
+    workers = workers or min(16, (os.cpu_count() or 1) * 4)
+    sizes = {src: src.stat().st_size for src, _ in copies}
+    columns = [TextColumn("[green]Copying files"), BarColumn(), DownloadColumn(), TimeRemainingColumn()]
+    with Progress(*columns) as progress, ThreadPoolExecutor(max_workers=workers) as executor:
+        task = progress.add_task("copy", total=sum(sizes.values()))
+        futures = {executor.submit(ingest_file, src, target_dir / src.name, hardlink): (src, target_dir) for src, target_dir in copies}
+        for future in as_completed(futures):
+            src, target_dir = futures[future]
+            try:
+                method = future.result()
+                report_data["copy_methods"][method] = report_data["copy_methods"].get(method, 0) + 1
+                report_data["added_files"].append(f"File {src.name} copied to {target_dir} ({method})")
+            except OSError as e:
+                progress.console.print(f"[red]Could not copy {src}: {e}[/red]")
+                report_data["errors"].append(f"Could not copy {src}: {e}")
+            progress.advance(task, sizes[src])
+    # Threads finish in any order; keep the report stable
+    report_data["added_files"].sort()
+
+
+def create_directory_structure(base_path, report_data, manifest=None, workers=None, hardlink=False):
+    """Creates the main project structure under 'file' and outside.
+
+    Without a manifest the user is asked for the files of every folder;
+    with one, the listed files are copied without prompting.
+    """
     # Create directories and ask to copy files into them
-    for relative_path, category_name in dirs_to_create.items():
+    for relative_path, category_name in PROJECT_DIRS.items():
         dir_path = base_path / relative_path
         dir_path.mkdir(parents=True, exist_ok=True)
         report_data["created_folders"].append(f"Created {dir_path}")
         print(f"[green]Created {dir_path}[/green]")
-        ask_and_copy_files(dir_path, category_name, report_data)
+        if manifest is None:
+            ask_and_copy_files(dir_path, category_name, report_data, hardlink)
+
+    if manifest is not None:
+        copy_files(resolve_manifest_files(manifest, base_path, report_data), report_data, workers, hardlink)
 
 def create_metadata_files(file_base_path, report_data):
     """Creates the metadata files (README.md, LICENSE, CITATION.cff, .gitignore)."""
@@ -109,6 +227,10 @@ def generate_report(report_data, project_name):
     for file in report_data["added_files"]:
         report_content += f"  - {file}\n"
     
+    report_content += "\nCopy Methods:\n"
+    for method, count in report_data["copy_methods"].items():
+        report_content += f"  - {method}: {count} file(s)\n"
+
     report_content += "\nErrors:\n"
     for error in report_data["errors"]:
         report_content += f"  - {error}\n"
@@ -120,7 +242,12 @@ def generate_report(report_data, project_name):
 
     print(f"[cyan]Report generated at {output_txt}[/cyan]")
 
-def create_project_structure(project_name: str):
+def create_project_structure(project_name: str, manifest=None, workers=None, hardlink=False):
+    """Create a project; manifest is a YAML/JSON file (or load_manifest() result) listing the files to copy.
+
+    Files are cloned (reflink) or copied inside the kernel where the filesystem
+    allows it; hardlink=True links them instead, so originals must not be edited.
+    """
     print(f"[bold green]Creating project structure for '{project_name}'[/bold green]")
 
     base_path = Path(project_name)
@@ -133,11 +260,15 @@ def create_project_structure(project_name: str):
         "created_folders": [],
         "created_files": [],
         "added_files": [],
+        "copy_methods": {},
         "errors": []
     }
 
-    # Create the directory structure and ask for file inputs
-    create_directory_structure(base_path, report_data)
+    if manifest is not None and not isinstance(manifest, dict):
+        manifest = load_manifest(manifest)
+
+    # Create the directory structure and ask for file inputs (or copy the manifest's files)
+    create_directory_structure(base_path, report_data, manifest, workers, hardlink)
 
     # Create metadata files in /file
     file_base_path = base_path / "file"
@@ -147,3 +278,23 @@ def create_project_structure(project_name: str):
     generate_report(report_data, project_name)
 
     print(f"[bold green]Project '{project_name}' structure created successfully![/bold green]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create project folders, optionally filled from a manifest")
+    parser.add_argument("projects", nargs="+", help="Project folder(s) to create")
+    parser.add_argument("-m", "--manifest", default=None,
+                        help="YAML/JSON file mapping folders (or categories) to files/globs; skips the prompts")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of copy threads")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="Hardlink files instead of copying them when on the same filesystem (no extra space, "
+                             "but editing either path changes both)")
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest) if args.manifest else None
+    except (OSError, ValueError, ImportError) as e:
+        print(f"[red]Could not read manifest: {e}[/red]")
+        raise SystemExit(1)
+    for project in args.projects:
+        create_project_structure(project, manifest, args.workers, args.hardlink)
@@ -1,7 +1,22 @@
+import os
+import tempfile
+import time
 import streamlit as st
+import zipfile
 from pathlib import Path
-from utils.streamlit_app_utils import create_directory_structure, upload_files, save_files, create_zip_folder
+from utils.streamlit_app_utils import create_directory_structure, upload_files, save_files, create_zip_folder, project_zip_path, README_TEMPLATE, convert_tables_to_parquet
+from utils.project_export import is_export_current, DEFAULT_COMPRESSLEVEL
 from utils.validator_class import OpenScienceValidator
+from utils.project_index import ProjectIndex, ZipProjectIndex
+from utils.result_cache import validation_results, project_key, zip_key
+from utils.checksum_manifest import remember_digests
+from utils.jobs import jobs
+from utils.profiling import PROFILE_DIR, Profiler, profile_span
+
+# How often a running job's progress is refreshed in the page, in seconds
+JOB_POLL_SECONDS = 0.5
+# How often a watched project is checked for a newer validation, in seconds
+WATCH_POLL_SECONDS = 0.25
 
 def main():
     # Set the page config to set a custom logo as the favicon
@@ -102,16 +117,40 @@ def create_project_interface():
         if uploaded_result_files:
             save_files(uploaded_result_files, base_path / "05_meta")
         
-        # Organize the project into a zip file for download
-        zip_filepath = create_zip_folder(base_path, project_name)
-        
-        # Provide a download link for the zip file
-        st.download_button(
-            label="Download Project Files",
-            data=open(zip_filepath, "rb"),
-            file_name=zip_filepath.name,
-            mime="application/zip"
+        # Digests computed while saving uploads are reused by the checksum manifest
+        if st.session_state.get("saved_files"):
+            remember_digests(base_path, st.session_state.saved_files)
+
+        # Parquet copies of the raw tables load much faster than CSV/TXT for reviewers
+        if st.button("🗜 Convert raw tables to Parquet"):
+            convert_tables_to_parquet(base_path)
+
+        # Organize the project into a zip file for download, only when asked for
+        compresslevel = st.select_slider(
+            "ZIP compression level (0 = store only, 9 = smallest)",
+            options=list(range(10)),
+            value=DEFAULT_COMPRESSLEVEL
+        )
+        dedupe = st.checkbox(
+            "Store duplicate files once",
+            help="Identical files are added to the ZIP once; the copies are listed in DUPLICATES.csv"
         )
+        if st.button("📦 Prepare project ZIP"):
+            st.session_state.project_zip = create_zip_folder(base_path, project_name, compresslevel, dedupe)
+
+        zip_filepath = st.session_state.get("project_zip")
+        if zip_filepath and zip_filepath == project_zip_path(base_path, project_name):
+            if is_export_current(base_path, zip_filepath, extra_files={"README.md": README_TEMPLATE}):
+                # Provide a download link for the zip file
+                with open(zip_filepath, "rb") as zip_file:
+                    st.download_button(
+                        label="Download Project Files",
+                        data=zip_file.read(),
+                        file_name=zip_filepath.name,
+                        mime="application/zip"
+                    )
+            else:
+                st.info("The project changed since the ZIP was prepared. Prepare it again to download.")
 
 
 def validate_project_interface():
@@ -121,12 +160,18 @@ def validate_project_interface():
     # Check if we're showing results
     if 'show_validation_results' in st.session_state and st.session_state.show_validation_results:
         display_validation_results()
+    elif st.session_state.get("validation_job"):
+        show_validation_progress()
     else:
         show_validation_input()
 
 
 def show_validation_input():
     """Show the input interface for validation"""
+    # A failed or cancelled validation job leaves its message here
+    if st.session_state.get("validation_error"):
+        st.error(st.session_state.pop("validation_error"))
+
     # Option 1: Text input for path
     project_path = st.text_input(
         "Enter the path to your project directory",
@@ -141,41 +186,40 @@ def show_validation_input():
     
     if st.button("🚀 Run Validation", type="primary"):
         if project_path and Path(project_path).exists():
-            run_validation(project_path)
-            st.session_state.show_validation_results = True
-            st.session_state.is_temp_project = False
-            st.rerun()
+            job = jobs.submit("validation", validation_job, project_path=project_path, description=project_path)
         elif uploaded_zip:
-            # Extract to a persistent location instead of temp
-            import zipfile
-            import os
-            
-            # Create a persistent temp directory
-            temp_base = Path("temp_validations")
-            temp_base.mkdir(exist_ok=True)
-            
-            # Create unique folder for this validation
-            import time
-            temp_dir = temp_base / f"validation_{int(time.time())}"
-            temp_dir.mkdir(exist_ok=True)
-            
-            # Extract zip
-            with zipfile.ZipFile(uploaded_zip, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Find the project root
-            project_dirs = [d for d in temp_dir.iterdir() if d.is_dir()]
-            if project_dirs:
-                project_path = str(project_dirs[0])
-                run_validation(project_path)
-                st.session_state.show_validation_results = True
-                st.session_state.is_temp_project = True
-                st.session_state.temp_project_path = project_path
-                st.rerun()
-            else:
-                st.error("Could not find project directory in uploaded ZIP")
+            job = jobs.submit("validation", validation_job, uploaded_zip=uploaded_zip, description=uploaded_zip.name)
         else:
             st.error("Please provide a valid project path or upload a ZIP file")
+            return
+        st.session_state.validation_job = job.id
+        st.rerun()
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_validation_progress():
+    """Poll the running validation job, showing its progress and a cancel button"""
+    job = jobs.get(st.session_state.validation_job)
+    if job is not None and not job.finished:
+        if job.status == "queued":
+            st.progress(0.0, text=f"⏳ Waiting for a free worker ({len(jobs.active())} job(s) running or queued)...")
+        else:
+            st.progress(job.fraction, text=f"🔍 Validating {job.description}: {job.message}")
+        if st.button("✖ Cancel validation"):
+            jobs.cancel(job.id)
+        return
+
+    del st.session_state.validation_job
+    if job is None:
+        st.session_state.validation_error = "The validation job was lost. Please run it again."
+    elif job.status == "done":
+        store_validation(**job.result)
+        st.session_state.show_validation_results = True
+    elif job.status == "cancelled":
+        st.session_state.validation_error = "Validation cancelled"
+    else:
+        st.session_state.validation_error = job.error
+    st.rerun()
 
 
 def display_validation_results():
@@ -190,6 +234,15 @@ def display_validation_results():
     if st.button("← Back to validation input"):
         st.session_state.show_validation_results = False
         st.rerun()
+
+    if st.session_state.get("validation_cached"):
+        st.caption("⚡ Reused the results of an earlier validation of this unchanged project")
+
+    # Project folders (not uploaded ZIPs) can be watched, so the results follow every edit
+    if not st.session_state.get("is_temp_project", False):
+        if st.toggle("👀 Watch for changes", key="watch_project",
+                     help="Validate the project again whenever one of its files changes"):
+            show_watch_updates()
     
     # Display results in Streamlit UI
     col1, col2, col3 = st.columns(3)
@@ -227,8 +280,18 @@ def display_validation_results():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📄 Generate PDF Report", type="primary"):
-            generate_pdf_report()
+        # The report is written by a background job; its page section polls until it finishes
+        if jobs.get(st.session_state.get("pdf_job")) is not None:
+            show_pdf_progress()
+        else:
+            attach_csv = st.checkbox("Attach full findings list (CSV)", value=False,
+                                     help="Embed every finding in the PDF; the report itself only lists examples")
+            if st.button("📄 Generate PDF Report", type="primary"):
+                st.session_state.pdf_generated = False
+                st.session_state.pdf_job = start_pdf_report(attach_csv).id
+                st.rerun()
+        if st.session_state.get("pdf_error"):
+            st.error(st.session_state.pop("pdf_error"))
     
     with col2:
         if 'pdf_generated' in st.session_state and st.session_state.pdf_generated:
@@ -242,47 +305,125 @@ def display_validation_results():
                 )
 
 
-def run_validation(project_path):
-    """Run the validation and store results in session state"""
-    validator = OpenScienceValidator(project_path)
-    
-    # Show progress
-    with st.spinner("🔍 Validating project structure..."):
-        results = validator.validate_structure()
-    
-    # Store everything in session state
-    st.session_state.validation_results = results
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_pdf_progress():
+    """Poll the PDF report job until the report can be downloaded"""
+    job = jobs.get(st.session_state.pdf_job)
+    if not job.finished:
+        st.progress(job.fraction, text="Generating PDF report...")
+        return
+
+    del st.session_state.pdf_job
+    if job.status == "done":
+        st.session_state.pdf_path = job.result
+        st.session_state.pdf_generated = True
+    else:
+        st.session_state.pdf_error = f"Could not generate the PDF report: {job.error or job.status}"
+    st.rerun()
+
+
+@st.fragment(run_every=WATCH_POLL_SECONDS)
+def show_watch_updates():
+    """Refresh the results whenever the project's watch has validated a change"""
+    # watchdog is only imported once a project is watched
+    from utils.project_watch import shared_watch
+
+    # One watch per folder is shared by all sessions and keeps running when the toggle is switched off
+    watch = shared_watch(st.session_state.current_project_path)
+    if watch.error:
+        st.caption(f"⚠️ The last update failed: {watch.error}")
+    if watch.validator is None:
+        st.caption("👀 Indexing the project to watch it...")
+        return
+
+    revision = (id(watch), watch.revision)
+    if st.session_state.get("watch_revision") != revision:
+        st.session_state.watch_revision = revision
+        store_validation(watch.validator, st.session_state.current_project_path, cached=False,
+                         is_temp_project=False)
+        st.rerun()
+    st.caption(f"👀 Watching for changes: validation #{watch.revision} took {watch.seconds * 1000:.0f} ms")
+
+
+def validation_job(job, project_path=None, uploaded_zip=None):
+    """Validate a project folder or uploaded ZIP in a worker thread
+
+    Validators are shared between sessions in a bounded LRU cache keyed on
+    the project's listing or the archive's hash, so validating an unchanged
+    project or archive again is instant. With FAIRYTALE_PROFILE_DIR set, a
+    Chrome trace of every validation is written there.
+    """
+    profiler = Profiler() if PROFILE_DIR else None
+    if uploaded_zip is not None:
+        # The same archive uploaded again, by any session, reuses its validation
+        with profile_span(profiler, "upload.hash"):
+            cache_key = zip_key(uploaded_zip)
+        # Validate straight from the ZIP central directory, without extracting it
+        try:
+            with profile_span(profiler, "index.build"):
+                index = ZipProjectIndex(uploaded_zip).build()
+        except zipfile.BadZipFile:
+            raise ValueError("The uploaded file is not a valid ZIP archive")
+        if not index.list_dir(""):
+            index.close()
+            raise ValueError("Could not find project directory in uploaded ZIP")
+        project_path = str(index.project_path)
+    else:
+        # Sizes and mtimes of every entry decide whether an earlier validation can be reused
+        index = ProjectIndex(project_path)
+        with profile_span(profiler, "index.build", index=index):
+            index.build()
+        cache_key = project_key(index)
+    job.progress(0, message=f"indexed {len(index.entries)} files and folders")
+
+    def report_progress(done, total):
+        job.progress(done, total, f"{done} of {total} checks and files")
+
+    def validate():
+        validator = OpenScienceValidator(project_path, index=index, on_progress=report_progress, profiler=profiler)
+        validator.validate_structure()
+        # The cached validator outlives this job
+        validator.on_progress = None
+        validator.profiler = None
+        return validator
+
+    try:
+        validator, cached = validation_results.get_or_compute(cache_key, validate)
+    finally:
+        index.close()
+    if profiler is not None:
+        profiler.write(Path(PROFILE_DIR) / f"validation-{time.strftime('%Y%m%d-%H%M%S')}-{job.id[:8]}.json")
+    return {"validator": validator, "project_path": project_path, "cached": cached,
+            "is_temp_project": uploaded_zip is not None}
+
+
+def store_validation(validator, project_path, cached, is_temp_project):
+    """Store the results of a finished validation in session state"""
+    st.session_state.validation_results = validator.validation_results
+    st.session_state.validation_cached = cached
     st.session_state.current_validator = validator
     st.session_state.current_project_path = project_path
+    st.session_state.is_temp_project = is_temp_project
     st.session_state.pdf_generated = False
 
 
-def generate_pdf_report():
-    """Generate the PDF report"""
-    if 'current_validator' in st.session_state and 'current_project_path' in st.session_state:
-        # For temp projects, save PDF to a different location
-        if st.session_state.get('is_temp_project', False):
-            # Save to current directory instead
-            report_path = Path("validation_report.pdf")
-        else:
-            report_path = Path(st.session_state.current_project_path) / "validation_report.pdf"
-        
-        with st.spinner("Generating PDF report..."):
-            st.session_state.current_validator.generate_pdf_report(report_path)
-            st.session_state.pdf_path = report_path
-            st.session_state.pdf_generated = True
-            st.success("✅ PDF Report generated successfully!")
-            
-            # Clean up temp files after generating PDF
-            if st.session_state.get('is_temp_project', False):
-                # Optional: clean up the temp directory
-                import shutil
-                try:
-                    shutil.rmtree(Path(st.session_state.temp_project_path).parent)
-                except:
-                    pass
-            
-            st.rerun()
+def pdf_report_job(job, validator, report_path, attach_csv=False):
+    validator.generate_pdf_report(report_path, attach_csv=attach_csv)
+    return report_path
+
+
+def start_pdf_report(attach_csv=False):
+    """Queue the PDF report of the current validation and return its job"""
+    # For uploaded ZIPs there is no project folder, save PDF to a different location
+    if st.session_state.get('is_temp_project', False):
+        # One file per report, so concurrent sessions do not overwrite each other's PDF
+        fd, report_path = tempfile.mkstemp(prefix="validation_report_", suffix=".pdf")
+        os.close(fd)
+        report_path = Path(report_path)
+    else:
+        report_path = Path(st.session_state.current_project_path) / "validation_report.pdf"
+    return jobs.submit("pdf_report", pdf_report_job, st.session_state.current_validator, report_path,
+                       attach_csv=attach_csv)
 
 
 # Run the app
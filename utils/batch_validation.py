@@ -0,0 +1,134 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from utils.project_index import ZipProjectIndex
+from utils.validator_class import OpenScienceValidator
+
+
+def discover_projects(target):
+    """Return the project paths to validate from a root directory or a list file
+
+    A directory is treated as a root whose direct subdirectories (and .zip
+    archives) are projects. A file is read as one project path per line
+    (blank lines and '#' comments are skipped).
+    """
+    target = Path(target)
+    if target.is_dir():
+        with os.scandir(target) as it:
+            return sorted(
+                Path(entry.path) for entry in it
+                if not entry.name.startswith(".")
+                and (entry.is_dir() or entry.name.lower().endswith(".zip"))
+            )
+
+    projects = []
+    with open(target, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                projects.append(Path(line).expanduser())
+    return projects
+
+
+def validate_one(project_path, write_pdf=False, use_cache=False):
+    """Validate a single project in a worker process and return a picklable summary"""
+    start = time.perf_counter()
+    summary = {"project": str(project_path), "error": None}
+    index = None
+    try:
+        if str(project_path).lower().endswith(".zip"):
+            # Archives are validated from their central directory, without extracting
+            index = ZipProjectIndex(project_path).build()
+            validator = OpenScienceValidator(index.project_path, verbose=False, index=index)
+            report_path = Path(project_path).with_suffix(".validation_report.pdf")
+        else:
+            validator = OpenScienceValidator(project_path, use_cache=use_cache, verbose=False)
+            report_path = Path(project_path) / "validation_report.pdf"
+        results = validator.validate_structure() or validator.validation_results
+        if write_pdf:
+            validator.generate_pdf_report(report_path)
+        summary["results"] = results
+        summary["findings"] = validator.to_json()["findings"]
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+        summary["results"] = {"passed": [], "failed": [], "warnings": [], "recommendations": []}
+        summary["findings"] = []
+    finally:
+        if index is not None:
+            index.close()
+
+    summary["passed"] = len(summary["results"]["passed"])
+    summary["failed"] = len(summary["results"]["failed"])
+    summary["warnings"] = len(summary["results"]["warnings"])
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def validate_many(projects, workers=None, write_pdf=False, use_cache=False):
+    """Validate projects in a process pool, yielding each summary as soon as it finishes"""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(validate_one, project, write_pdf, use_cache) for project in projects]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(target, workers=None, summary_path="validation_summary.json", write_pdf=False, use_cache=False):
+    """Validate every project under target, print results as they arrive and write an aggregate summary"""
+    console = Console()
+    projects = discover_projects(target)
+    if not projects:
+        console.print(f"[red]No projects found in {target}[/red]")
+        return 1
+
+    console.print(f"[bold cyan]🔍 Validating {len(projects)} project(s) with {workers or os.cpu_count()} worker(s)...[/bold cyan]")
+    start = time.perf_counter()
+    summaries = []
+    for summary in validate_many(projects, workers, write_pdf, use_cache):
+        summaries.append(summary)
+        if summary["error"]:
+            status = "[red]ERROR[/red]"
+        elif summary["failed"]:
+            status = "[red]FAIL[/red]"
+        else:
+            status = "[green]PASS[/green]"
+        console.print(
+            f"[{len(summaries)}/{len(projects)}] {status} {summary['project']} "
+            f"({summary['passed']} passed, {summary['failed']} failed, "
+            f"{summary['warnings']} warnings, {summary['seconds']}s)"
+        )
+        if summary["error"]:
+            console.print(f"  [red]{summary['error']}[/red]")
+
+    summaries.sort(key=lambda s: s["project"])
+    elapsed = round(time.perf_counter() - start, 3)
+    aggregate = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "target": str(target),
+        "seconds": elapsed,
+        "projects": len(summaries),
+        "passed_projects": sum(1 for s in summaries if not s["failed"] and not s["error"]),
+        "failed_projects": sum(1 for s in summaries if s["failed"] and not s["error"]),
+        "errored_projects": sum(1 for s in summaries if s["error"]),
+        "results": summaries,
+    }
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(aggregate, f, indent=2, ensure_ascii=False)
+
+    table = Table(title="Batch Validation Summary")
+    table.add_column("Status", style="cyan", no_wrap=True)
+    table.add_column("Projects", justify="right")
+    table.add_row("✓ Passed", str(aggregate["passed_projects"]))
+    table.add_row("✗ Failed", str(aggregate["failed_projects"]))
+    table.add_row("⚠ Errors", str(aggregate["errored_projects"]))
+    console.print(table)
+    console.print(f"[green]📄 Summary saved to: {summary_path} ({elapsed}s)[/green]")
+
+    return 1 if aggregate["failed_projects"] or aggregate["errored_projects"] else 0
@@ -0,0 +1,261 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+from utils.profiling import fs_ops, install_fs_op_counter, io_syscalls
+from utils.synthetic_project import generate_project
+
+
+BENCHMARKS = ["validate", "validate_cached", "pdf_report", "zip_export", "directory_structure", "cli_startup"]
+
+# Wall-time differences smaller than this are treated as noise when comparing with the baseline
+MIN_TIME_DELTA = 0.005
+
+# Benchmarks timed in a child process: their syscalls, FS ops and RSS are not those of this process
+SUBPROCESS_BENCHMARKS = {"cli_startup"}
+# Absolute limits, checked with or without a baseline: `fairytale validate --quiet` on an empty
+# folder is interpreter start plus imports, which is what batch jobs pay for every project
+BUDGETS = {"cli_startup": float(os.environ.get("FAIRYTALE_CLI_STARTUP_BUDGET_MS", "300")) / 1000}
+CLI_SCRIPT = Path(__file__).resolve().parent.parent / "fairytale.py"
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak-RSS high-water mark, so each measurement starts fresh (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def _measure(run):
+    """Run once and return (seconds, read/write syscalls, filesystem operations, peak RSS in MB)"""
+    _reset_peak_rss()
+    syscalls = io_syscalls()
+    ops = fs_ops()
+    start = time.perf_counter()
+    try:
+        run()
+    finally:
+        seconds = time.perf_counter() - start
+        ops = fs_ops() - ops
+    after = io_syscalls()
+    syscalls = after - syscalls if syscalls is not None and after is not None else None
+    return seconds, syscalls, ops, _peak_rss_mb()
+
+
+def _setup(name, project, workdir):
+    """Prepare one repetition of a benchmark and return the function to time"""
+    from utils.validator_class import OpenScienceValidator
+
+    if name == "validate":
+        return lambda: OpenScienceValidator(project, verbose=False).validate_structure()
+
+    if name == "validate_cached":
+        cache_dir = workdir / "cache"
+        OpenScienceValidator(project, use_cache=True, cache_dir=cache_dir, verbose=False).validate_structure()
+        return lambda: OpenScienceValidator(
+            project, use_cache=True, cache_dir=cache_dir, verbose=False
+        ).validate_structure()
+
+    if name == "pdf_report":
+        validator = OpenScienceValidator(project, verbose=False)
+        validator.validate_structure()
+        return lambda: validator.generate_pdf_report(workdir / "validation_report.pdf")
+
+    if name == "zip_export":
+        from utils.streamlit_app_utils import create_zip_folder
+        # Always measure a full build, not a reuse of the previous archive
+        shutil.rmtree(project.parent / "exports", ignore_errors=True)
+        return lambda: create_zip_folder(project, project.name)
+
+    if name == "directory_structure":
+        from utils.streamlit_app_utils import create_directory_structure
+        target = workdir / "scaffold"
+        shutil.rmtree(target, ignore_errors=True)
+        return lambda: create_directory_structure(target)
+
+    if name == "cli_startup":
+        empty = workdir / "empty"
+        empty.mkdir(exist_ok=True)
+        command = [sys.executable, str(CLI_SCRIPT), "validate", str(empty), "--quiet"]
+        # The empty folder fails validation, so the exit code is 1 by design
+        return lambda: subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def run_benchmarks(names=None, repeat=3, workdir=None, **shape):
+    """Generate a synthetic project and time each benchmark repeat times
+
+    Returns {"shape": ..., "results": {name: {seconds, min_seconds, syscalls, fs_ops, peak_rss_mb}}};
+    syscalls counts read/write-class syscalls (Linux), fs_ops the audited filesystem
+    operations (opens, directory scans, mkdir, rename, ...). Times and counts are
+    medians over the repetitions, peak_rss_mb is the maximum. Benchmarks run in a
+    child process only report times.
+    """
+    names = names or BENCHMARKS
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="fairytale-bench-"))
+        workdir = Path(workdir)
+        project = workdir / "project"
+        if project.exists():
+            shutil.rmtree(project)
+        shape = generate_project(project, **shape)
+
+        # st.write warns about the missing script context outside `streamlit run`
+        from streamlit.logger import set_log_level
+        set_log_level("error")
+        install_fs_op_counter()
+
+        results = {}
+        for name in names:
+            samples = []
+            for _ in range(repeat):
+                run = _setup(name, project, workdir)
+                # Validators and st.write print progress; keep the benchmark output readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sample = _measure(run)
+                samples.append((sample[0], None, None, None) if name in SUBPROCESS_BENCHMARKS else sample)
+            seconds = [sample[0] for sample in samples]
+            syscalls = [sample[1] for sample in samples if sample[1] is not None]
+            ops = [sample[2] for sample in samples if sample[2] is not None]
+            peaks = [sample[3] for sample in samples if sample[3] is not None]
+            results[name] = {
+                "seconds": round(statistics.median(seconds), 6),
+                "min_seconds": round(min(seconds), 6),
+                "syscalls": int(statistics.median(syscalls)) if syscalls else None,
+                "fs_ops": int(statistics.median(ops)) if ops else None,
+                "peak_rss_mb": round(max(peaks), 1) if peaks else None,
+            }
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "shape": shape,
+        "results": results,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=0.2):
+    """Return a list of (benchmark, metric, baseline value, current value) that got worse than tolerance"""
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("seconds", "syscalls", "fs_ops", "peak_rss_mb"):
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if metric == "seconds" and after - before < MIN_TIME_DELTA:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append((name, metric, before, after))
+    return regressions
+
+
+def over_budget(report, budgets=None):
+    """Return a list of (benchmark, budget, median seconds) for benchmarks slower than their budget"""
+    budgets = BUDGETS if budgets is None else budgets
+    return [
+        (name, budgets[name], result["seconds"])
+        for name, result in report["results"].items()
+        if name in budgets and result["seconds"] > budgets[name]
+    ]
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_report(report, baseline=None, regressions=(), over=()):
+    """Print the benchmark results, with the change relative to the baseline and the budgets"""
+    console = Console()
+    shape = report["shape"]
+    console.print(
+        f"[bold cyan]⏱  Synthetic project: {shape['files']} files, {shape['bytes'] / 1e6:.1f} MB "
+        f"({shape['subjects']} sub × {shape['sessions']} ses × {shape['runs']} run × "
+        f"{shape['files_per_run']} files, depth {shape['depth']})[/bold cyan]"
+    )
+    if baseline and baseline.get("shape") != shape:
+        console.print("[yellow]⚠ Baseline was recorded for a different project shape; comparison is indicative only[/yellow]")
+
+    regressed = {(name, metric) for name, metric, _, _ in regressions}
+    regressed |= {(name, "seconds") for name, _, _ in over}
+    table = Table(title="Benchmark Results")
+    table.add_column("Benchmark", style="cyan", no_wrap=True)
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("R/W syscalls", justify="right")
+    table.add_column("FS ops", justify="right")
+    table.add_column("Peak RSS (MB)", justify="right")
+    table.add_column("Budget (ms)", justify="right")
+
+    def cell(name, metric, value, fmt):
+        if value is None:
+            return "-"
+        text = fmt(value)
+        previous = (baseline or {}).get("results", {}).get(name, {}).get(metric)
+        if previous:
+            text += f" ({(value - previous) / previous:+.0%})"
+        return f"[red]{text}[/red]" if (name, metric) in regressed else text
+
+    for name, result in report["results"].items():
+        table.add_row(
+            name,
+            cell(name, "seconds", result["seconds"], lambda v: f"{v * 1000:.1f}"),
+            cell(name, "syscalls", result["syscalls"], str),
+            cell(name, "fs_ops", result["fs_ops"], str),
+            cell(name, "peak_rss_mb", result["peak_rss_mb"], lambda v: f"{v:.1f}"),
+            f"{BUDGETS[name] * 1000:.0f}" if name in BUDGETS else "-",
+        )
+    console.print(table)
+
+    for name, metric, before, after in regressions:
+        console.print(f"[red]✗ Regression in {name} {metric}: {before} → {after}[/red]")
+    for name, budget, seconds in over:
+        console.print(f"[red]✗ {name} took {seconds * 1000:.0f} ms, over its budget of {budget * 1000:.0f} ms[/red]")
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from utils.project_index import ProjectIndex
+from utils.validation_cache import default_cache_dir
+
+
+MANIFEST_PATH = "05_meta/manifest-sha256.txt"
+DATA_DIR = "02_data"
+RAW_DATA_DIR = "02_data/01_raw"
+
+# Files are read with readinto() into a reusable buffer of this size;
+# hashlib releases the GIL on large updates, so threads hash in parallel.
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def hash_file(index, rel_path, algorithm="sha256"):
+    """Return the hex digest of an indexed file, streamed in large blocks"""
+    digest = hashlib.new(algorithm)
+    buffer = memoryview(bytearray(HASH_BUFFER_SIZE))
+    with index.open(rel_path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(buffer[:n])
+    return digest.hexdigest()
+
+
+def _encode_path(rel_path):
+    # BagIt manifests percent-encode the characters that would break a line
+    return rel_path.replace("%", "%25").replace("\n", "%0A").replace("\r", "%0D")
+
+
+def _decode_path(encoded):
+    return encoded.replace("%0A", "\n").replace("%0D", "\r").replace("%25", "%")
+
+
+def read_manifest(index, manifest_path=MANIFEST_PATH):
+    """Parse a BagIt-style manifest into {relative path: digest}"""
+    manifest = {}
+    with index.open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            digest, _, encoded = line.partition(" ")
+            manifest[_decode_path(encoded.lstrip(" "))] = digest.lower()
+    return manifest
+
+
+class ManifestState:
+    """Per-project record of (size, mtime_ns, digest), so unchanged files are not hashed again"""
+
+    def __init__(self, project_path, cache_dir=None):
+        project_path = Path(project_path).resolve()
+        cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        key = hashlib.sha1(str(project_path).encode("utf-8", "surrogateescape")).hexdigest()
+        self.state_file = cache_dir / "manifests" / f"{key}.json"
+        self.files = {}
+
+    def load(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+        except (OSError, ValueError):
+            self.files = {}
+        return self
+
+    def lookup(self, rel_path, size, mtime_ns):
+        record = self.files.get(rel_path)
+        if record and record[0] == size and record[1] == mtime_ns:
+            return record[2]
+        return None
+
+    def save(self, files):
+        self.files = files
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(files, f, separators=(",", ":"))
+            os.replace(tmp_file, self.state_file)
+        except OSError:
+            pass
+
+
+def remember_digests(project_path, saved_files, cache_dir=None):
+    """Seed the manifest state with digests computed elsewhere (e.g. while saving uploads)
+
+    saved_files maps absolute paths to dicts with 'size', 'mtime_ns' and 'sha256'.
+    """
+    project_path = Path(project_path).resolve()
+    state = ManifestState(project_path, cache_dir).load()
+    files = dict(state.files)
+    for path, record in saved_files.items():
+        if not record.get("sha256"):
+            continue
+        try:
+            rel_path = Path(path).resolve().relative_to(project_path).as_posix()
+        except ValueError:
+            continue
+        files[rel_path] = [record["size"], record["mtime_ns"], record["sha256"]]
+    state.save(files)
+
+
+def hash_files(index, rel_paths, workers=None, state=None):
+    """Hash files in a thread pool, reusing digests whose size and mtime are unchanged
+
+    Returns ({relative path: digest}, number of files actually hashed, new state records).
+    """
+    digests = {}
+    records = {}
+    to_hash = []
+    for rel_path in rel_paths:
+        size, mtime_ns = index.stat(rel_path) if index.on_disk else (index.entries[rel_path].size, None)
+        known = state.lookup(rel_path, size, mtime_ns) if state is not None and index.on_disk else None
+        if known is not None:
+            digests[rel_path] = known
+            records[rel_path] = [size, mtime_ns, known]
+        else:
+            to_hash.append((rel_path, size, mtime_ns))
+
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as executor:
+            hashed = executor.map(lambda item: hash_file(index, item[0]), to_hash)
+            for (rel_path, size, mtime_ns), digest in zip(to_hash, hashed):
+                digests[rel_path] = digest
+                records[rel_path] = [size, mtime_ns, digest]
+
+    return digests, len(to_hash), records
+
+
+def data_files(index):
+    """Return every file under 02_data/ in a stable order"""
+    return sorted(rel for rel in index.walk(DATA_DIR) if index.is_file(rel))
+
+
+def generate_manifest(project_path, workers=None, cache_dir=None):
+    """Write 05_meta/manifest-sha256.txt for every file under 02_data/
+
+    Returns a summary dict with the manifest path and how many files were hashed or reused.
+    """
+    start = time.perf_counter()
+    index = ProjectIndex(project_path).build()
+    if not index.is_dir(DATA_DIR):
+        raise FileNotFoundError(f"No {DATA_DIR}/ directory found in {project_path}")
+
+    state = ManifestState(project_path, cache_dir).load()
+    files = data_files(index)
+    digests, hashed, records = hash_files(index, files, workers, state)
+
+    manifest_file = Path(project_path) / MANIFEST_PATH
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_file, "w", encoding="utf-8", newline="\n") as f:
+        for rel_path in files:
+            f.write(f"{digests[rel_path]}  {_encode_path(rel_path)}\n")
+    state.save(records)
+
+    return {
+        "manifest": str(manifest_file),
+        "files": len(files),
+        "hashed": hashed,
+        "reused": len(files) - hashed,
+        "bytes": sum(index.entries[rel].size for rel in files),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def verify_manifest(index, workers=None, cache_dir=None):
+    """Compare the files under 02_data/ with the manifest
+
+    Returns a dict with 'modified', 'missing' and 'unlisted' relative paths and
+    the number of 'verified' files. Files whose size and mtime match the last
+    recorded state are trusted without being hashed again.
+    """
+    manifest = read_manifest(index)
+    files = data_files(index)
+    present = set(files)
+
+    modified = []
+    candidates = [rel_path for rel_path in sorted(manifest) if rel_path in present]
+
+    state = ManifestState(index.project_path, cache_dir).load() if index.on_disk else None
+    digests, _, records = hash_files(index, candidates, workers, state)
+    for rel_path in candidates:
+        if digests[rel_path] != manifest[rel_path]:
+            modified.append(rel_path)
+    if state is not None:
+        state.save(records)
+
+    return {
+        "verified": len(candidates) - len(modified),
+        "modified": modified,
+        "missing": sorted(rel for rel in manifest if rel not in present),
+        "unlisted": [rel for rel in files if rel not in manifest],
+    }
@@ -0,0 +1,284 @@
+import csv
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.checksum_manifest import DATA_DIR
+from utils.data_sniffer import looks_tabular, sniff_file
+from utils.project_index import ProjectIndex
+
+
+DICTIONARY_PATH = "05_meta/data_dictionary.csv"
+DICTIONARY_COLUMNS = [
+    "file", "variable", "type", "rows", "missing", "missing_pct", "unique", "unique_estimated", "min", "max",
+    "description",
+]
+# Existing dictionaries/codebooks are documentation, not data
+DICTIONARY_NAMES = {"data_dictionary.csv", "data_dict.csv", "codebook.csv", "variables.csv"}
+
+# Rows read per chunk; memory per file is bounded by this, not by the file size
+CHUNK_ROWS = 100_000
+# Distinct values are counted exactly up to this many, then with a HyperLogLog sketch
+EXACT_UNIQUE_LIMIT = 1024
+# Text columns are only scanned in full for booleans/dates if this many leading values match
+SAMPLE_ROWS = 100
+
+# Type lattice used to combine chunks: a column is the most general type seen
+_GENERALITY = {"empty": 0, "int": 1, "float": 2, "string": 3}
+_BOOL_VALUES = {"true", "false", "yes", "no"}
+_DATE_PATTERN = r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?.*"
+
+
+class HyperLogLog:
+    """Cardinality sketch with 2**precision one-byte registers (4 KiB and ~1.6% error by default)"""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """Add an array of uint64 hashes"""
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Rank = position of the leftmost 1 bit in the remaining bits (rest < 2**52 is exact as float)
+        bit_length = np.zeros(len(rest))
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))) + 1
+        ranks = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    """Running type, missingness, cardinality and range of one column, updated chunk by chunk"""
+
+    def __init__(self, name):
+        self.name = name
+        self.type = "empty"
+        self.rows = 0
+        self.missing = 0
+        self.minimum = None
+        self.maximum = None
+        self.exact = set()
+        self.sketch = HyperLogLog()
+
+    def update(self, series):
+        self.rows += len(series)
+        values = series.dropna()
+        self.missing += len(series) - len(values)
+        if not len(values):
+            return
+
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        self.sketch.add_hashes(hashes)
+        if self.exact is not None:
+            self.exact.update(hashes.tolist())
+            if len(self.exact) > EXACT_UNIQUE_LIMIT:
+                self.exact = None
+
+        chunk_type, low, high = self._describe(values)
+        self._merge(chunk_type, low, high)
+
+    @staticmethod
+    def _describe(values):
+        """Return (type, min, max) of the non-missing values of one chunk"""
+        if pd.api.types.is_bool_dtype(values):
+            return "bool", None, None
+        if pd.api.types.is_integer_dtype(values):
+            return "int", values.min(), values.max()
+        if pd.api.types.is_float_dtype(values):
+            # Integer columns with missing values are read as floats
+            return ("int" if (values % 1 == 0).all() else "float"), values.min(), values.max()
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return "date", values.min().isoformat(), values.max().isoformat()
+
+        # The CSV parser already recognised numbers; only look for yes/no and ISO dates,
+        # and only scan the whole chunk when a sample looks like one of them
+        text = values.astype(str)
+        sample = text.iloc[:SAMPLE_ROWS]
+        if sample.str.lower().isin(_BOOL_VALUES).all() and text.str.lower().isin(_BOOL_VALUES).all():
+            return "bool", None, None
+        if sample.str.fullmatch(_DATE_PATTERN).all() and text.str.fullmatch(_DATE_PATTERN).all():
+            return "date", text.min(), text.max()
+        return "string", None, None
+
+    def _merge(self, chunk_type, low, high):
+        if self.type == "empty" or self.type == chunk_type:
+            new_type = chunk_type
+        elif self.type in _GENERALITY and chunk_type in _GENERALITY:
+            new_type = max(self.type, chunk_type, key=_GENERALITY.get)
+        else:
+            # bool or date mixed with anything else
+            new_type = "string"
+
+        if new_type in ("int", "float", "date") and low is not None:
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        else:
+            self.minimum = self.maximum = None
+        self.type = new_type
+
+    def row(self, rel_path, description=""):
+        unique = len(self.exact) if self.exact is not None else self.sketch.count()
+        return {
+            "file": rel_path,
+            "variable": self.name,
+            "type": self.type,
+            "rows": self.rows,
+            "missing": self.missing,
+            "missing_pct": f"{100 * self.missing / self.rows:.1f}" if self.rows else "",
+            "unique": unique,
+            "unique_estimated": "no" if self.exact is not None else "yes",
+            "min": _format_value(self.minimum),
+            "max": _format_value(self.maximum),
+            "description": description,
+        }
+
+
+def _format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.6g}"
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    return str(value)
+
+
+def _iter_chunks(index, rel_path, chunk_rows):
+    """Yield DataFrame chunks of a tabular file, or nothing if it does not look tabular"""
+    if rel_path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        with index.open(rel_path, "rb") as f:
+            for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        return
+
+    profile = sniff_file(index, rel_path)
+    if not looks_tabular(profile):
+        return
+    with index.open(rel_path, "rb") as f:
+        reader = pd.read_csv(
+            f, sep=profile.delimiter, encoding=profile.encoding, encoding_errors="replace",
+            header=0 if profile.has_header else None, chunksize=chunk_rows, skipinitialspace=True,
+            on_bad_lines="skip", engine="c",
+        )
+        for chunk in reader:
+            if not profile.has_header:
+                chunk.columns = [f"column_{i + 1}" for i in range(len(chunk.columns))]
+            yield chunk
+
+
+def profile_file(index, rel_path, chunk_rows=CHUNK_ROWS):
+    """Stream one file and return its ColumnProfiles in column order"""
+    columns = {}
+    for chunk in _iter_chunks(index, rel_path, chunk_rows):
+        for name in chunk.columns:
+            if name not in columns:
+                columns[name] = ColumnProfile(str(name))
+            columns[name].update(chunk[name])
+    return list(columns.values())
+
+
+def _profile_errors():
+    """Exceptions that mean one file could not be read, as opposed to a bug"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return pd.errors.ParserError, ValueError, OSError
+    return pd.errors.ParserError, ValueError, OSError, pa.ArrowException
+
+
+def dictionary_files(index):
+    """Return the tabular and Parquet files under 02_data/ that should be described"""
+    extensions = (".csv", ".tsv", ".txt", ".parquet")
+    return sorted(
+        rel for rel in index.walk(DATA_DIR)
+        if index.is_file(rel) and rel.lower().endswith(extensions)
+        and os.path.basename(rel).lower() not in DICTIONARY_NAMES
+    )
+
+
+def _existing_descriptions(path):
+    """Descriptions already written in a dictionary, keyed by (file, variable) and by variable"""
+    descriptions = {}
+    try:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for record in csv.DictReader(f):
+                description = (record.get("description") or "").strip()
+                variable = (record.get("variable") or "").strip()
+                if description and variable:
+                    descriptions[(record.get("file") or "", variable)] = description
+                    descriptions.setdefault(("", variable), description)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        pass
+    return descriptions
+
+
+def generate_data_dictionary(project_path, output=None, workers=None, chunk_rows=CHUNK_ROWS):
+    """Describe every column of the tabular data under 02_data/ in 05_meta/data_dictionary.csv
+
+    Files are streamed in chunks and profiled in a thread pool. Descriptions
+    already filled in an existing dictionary are kept. Files that cannot be
+    parsed are left out and listed under "failed". Returns a summary dict.
+    """
+    start = time.perf_counter()
+    index = ProjectIndex(project_path).build()
+    if not index.is_dir(DATA_DIR):
+        raise FileNotFoundError(f"No {DATA_DIR}/ directory found in {project_path}")
+
+    output = Path(output) if output else Path(project_path) / DICTIONARY_PATH
+    descriptions = _existing_descriptions(output)
+    files = dictionary_files(index)
+    workers = workers or min(4, os.cpu_count() or 1)
+    errors = _profile_errors()
+    failed = {}
+
+    def profile(rel_path):
+        try:
+            return profile_file(index, rel_path, chunk_rows)
+        except errors as e:
+            failed[rel_path] = str(e).strip() or type(e).__name__
+            return []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        profiles = list(executor.map(profile, files))
+
+    rows = []
+    for rel_path, columns in zip(files, profiles):
+        for column in columns:
+            description = descriptions.get((rel_path, column.name)) or descriptions.get(("", column.name), "")
+            rows.append(column.row(rel_path, description))
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=DICTIONARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, output)
+
+    return {
+        "dictionary": str(output),
+        "files": sum(1 for columns in profiles if columns),
+        "variables": len(rows),
+        "failed": dict(sorted(failed.items())),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
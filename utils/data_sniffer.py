@@ -0,0 +1,166 @@
+import codecs
+import csv
+import os
+import re
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Only this many bytes are read from the start of each file, whatever its size
+SNIFF_BYTES = int(os.environ.get("FAIRYTALE_SNIFF_KB", "64")) * 1024
+
+TABULAR_EXTENSIONS = (".csv", ".tsv", ".txt")
+DELIMITERS = [",", "\t", ";", "|"]
+EXPECTED_DELIMITERS = {".csv": (",", ";"), ".tsv": ("\t",)}
+# The delimiter is chosen from this many lines; the rest of the prefix is parsed once
+DETECT_LINES = 50
+MISSING_VALUES = {"", "na", "n/a", "nan", "null", "none", "-"}
+
+_INT = re.compile(r"^[+-]?\d+$")
+_FLOAT = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?")
+_BOOL = {"true", "false", "yes", "no"}
+
+# What was learned from the prefix of one file. issues is a list of human-readable problems;
+# a file that does not look tabular at all has delimiter None.
+TableProfile = namedtuple(
+    "TableProfile",
+    ["path", "encoding", "delimiter", "has_header", "columns", "header", "dtypes", "rows_sampled", "ragged_rows",
+     "truncated", "issues"]
+)
+
+
+def _decode(data):
+    """Decode a byte prefix, returning (text, encoding name)"""
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"),
+                          (codecs.BOM_UTF16_BE, "utf-16")):
+        if data.startswith(bom):
+            return data.decode(encoding, errors="replace"), encoding
+    try:
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the prefix is still UTF-8
+        if e.start >= len(data) - 3 and e.reason == "unexpected end of data":
+            return data[:e.start].decode("utf-8"), "utf-8"
+    return data.decode("cp1252", errors="replace"), "cp1252"
+
+
+def _infer_dtype(values):
+    """Return int, float, bool, date, string or empty for the non-missing values of a column"""
+    values = [value.strip() for value in values if value.strip().lower() not in MISSING_VALUES]
+    if not values:
+        return "empty"
+    if all(_INT.match(value) for value in values):
+        return "int"
+    if all(_FLOAT.match(value) for value in values):
+        return "float"
+    if all(value.lower() in _BOOL for value in values):
+        return "bool"
+    if all(_DATE.match(value) for value in values):
+        return "date"
+    return "string"
+
+
+def _split(lines, delimiter):
+    return list(csv.reader(lines, delimiter=delimiter))
+
+
+def _pick_delimiter(lines, ext):
+    """Choose the delimiter that splits the most rows into the same number (> 1) of fields"""
+    best = None
+    for delimiter in sorted(DELIMITERS, key=lambda d: d not in EXPECTED_DELIMITERS.get(ext, ())):
+        rows = _split(lines[:DETECT_LINES], delimiter)
+        widths = Counter(len(row) for row in rows if row)
+        if not widths:
+            continue
+        width, count = widths.most_common(1)[0]
+        if width < 2:
+            continue
+        score = (count / sum(widths.values()), width)
+        if best is None or score > best[0]:
+            best = (score, delimiter, width)
+    return best
+
+
+def sniff_bytes(data, rel_path, truncated=False):
+    """Profile the first bytes of a tabular file"""
+    ext = os.path.splitext(rel_path)[1].lower()
+    issues = []
+    if not data:
+        return TableProfile(rel_path, None, None, False, 0, [], [], 0, 0, False, ["file is empty"])
+    if b"\x00" in data and not data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return TableProfile(rel_path, None, None, False, 0, [], [], 0, 0, truncated, ["contains binary data"])
+
+    text, encoding = _decode(data)
+    lines = text.splitlines()
+    # The last line of a truncated prefix is usually incomplete
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()]
+
+    picked = _pick_delimiter(lines, ext)
+    if picked is not None:
+        _, delimiter, width = picked
+    elif ext in EXPECTED_DELIMITERS and lines:
+        # A single-column CSV/TSV is still a table
+        delimiter, width = EXPECTED_DELIMITERS[ext][0], 1
+    else:
+        issues.append("no column delimiter found (single column or free text)")
+        return TableProfile(rel_path, encoding, None, False, 1, [], [], len(lines), 0, truncated, issues)
+    rows = [row for row in _split(lines, delimiter) if row]
+
+    if encoding == "cp1252":
+        issues.append("not UTF-8 encoded (decoded as cp1252)")
+    if ext in EXPECTED_DELIMITERS and delimiter not in EXPECTED_DELIMITERS[ext]:
+        issues.append(f"uses {delimiter!r} as delimiter, which does not match the {ext} extension")
+
+    ragged = [number for number, row in enumerate(rows, start=1) if row and len(row) != width]
+    if ragged:
+        shown = ", ".join(str(number) for number in ragged[:5])
+        more = f" and {len(ragged) - 5} more" if len(ragged) > 5 else ""
+        issues.append(f"{len(ragged)} row(s) do not have {width} fields (line {shown}{more})")
+
+    first = rows[0]
+    body = [row for row in rows[1:] if len(row) == width]
+    # A header has no numeric fields; without data rows, any non-numeric first row counts as one
+    has_header = all(field.strip() and not _FLOAT.match(field.strip()) for field in first)
+    header = [field.strip() for field in first] if has_header else []
+    if not has_header:
+        issues.append("no header row")
+        body = [row for row in rows if len(row) == width]
+    else:
+        duplicates = sorted(name for name, count in Counter(header).items() if count > 1)
+        if duplicates:
+            issues.append(f"duplicate column names: {', '.join(duplicates)}")
+
+    dtypes = [_infer_dtype([row[i] for row in body]) for i in range(width)]
+    return TableProfile(
+        rel_path, encoding, delimiter, has_header, width, header, dtypes, len(body), len(ragged), truncated, issues
+    )
+
+
+def sniff_file(index, rel_path, max_bytes=None):
+    """Profile an indexed file from at most max_bytes read from its start"""
+    max_bytes = max_bytes or SNIFF_BYTES
+    try:
+        with index.open(rel_path, "rb") as f:
+            data = f.read(max_bytes + 1)
+    except OSError as e:
+        return TableProfile(rel_path, None, None, False, 0, [], [], 0, 0, False, [f"could not be read ({e.strerror or e})"])
+    return sniff_bytes(data[:max_bytes], rel_path, truncated=len(data) > max_bytes)
+
+
+def looks_tabular(profile):
+    """True if a .txt file is delimited text rather than prose, logs or a requirements list"""
+    return profile.delimiter is not None and profile.ragged_rows <= 0.1 * (profile.rows_sampled + profile.ragged_rows)
+
+
+def sniff_files(index, rel_paths, workers=None, max_bytes=None):
+    """Profile many files in a thread pool, yielding TableProfiles in the order of rel_paths"""
+    workers = workers or min(8, (os.cpu_count() or 1) * 2)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        yield from executor.map(lambda rel_path: sniff_file(index, rel_path, max_bytes), rel_paths)
+    finally:
+        # A consumer that stops early (e.g. a cancelled validation) does not wait for the remaining files
+        executor.shutdown(wait=True, cancel_futures=True)
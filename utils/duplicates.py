@@ -0,0 +1,154 @@
+import csv
+import hashlib
+import os
+import shutil
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from utils.checksum_manifest import ManifestState, hash_file
+
+
+# Files smaller than this (empty placeholders, .gitkeep, short notes) are not worth reporting
+MIN_SIZE = 1024
+# Files of the same size are first compared on a hash of their first and last block
+PARTIAL_BLOCK = 64 * 1024
+# Written at the root of a deduplicated ZIP export: one row per copy that was left out
+DUPLICATES_ARCNAME = "DUPLICATES.csv"
+
+# Files with identical contents; paths are sorted, the first one is kept as the original
+DuplicateGroup = namedtuple("DuplicateGroup", ["size", "digest", "paths"])
+
+
+def _partial_hash(index, rel_path, size):
+    """SHA-256 of the first and last PARTIAL_BLOCK bytes; for small files this is the full digest"""
+    digest = hashlib.sha256()
+    with index.open(rel_path, "rb") as f:
+        digest.update(f.read(PARTIAL_BLOCK))
+        if size > 2 * PARTIAL_BLOCK:
+            f.seek(size - PARTIAL_BLOCK)
+        digest.update(f.read(PARTIAL_BLOCK))
+    return digest.hexdigest()
+
+
+def _group(items, key):
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def find_duplicates(index, rel_paths=None, min_size=MIN_SIZE, workers=None, cache_dir=None):
+    """Group identical files of an indexed project
+
+    Candidates are narrowed in three passes: by size (from the index, no I/O),
+    by a hash of their head and tail blocks, and only then by a full SHA-256 of
+    the files that still collide. Digests recorded for the checksum manifest
+    are reused when size and mtime match. Returns a dict with the groups
+    (largest waste first), the reclaimable bytes and how many files were read.
+    """
+    if rel_paths is None:
+        rel_paths = (rel for rel in index.walk("") if index.is_file(rel))
+    sized = [(rel, index.entries[rel].size) for rel in rel_paths if index.entries[rel].size >= min_size]
+
+    workers = workers or min(32, (os.cpu_count() or 1) * 2)
+    by_size = _group(sized, key=lambda item: item[1])
+    candidates = [item for members in by_size for item in members]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        partial = dict(zip(
+            (rel for rel, _ in candidates),
+            executor.map(lambda item: _partial_hash(index, *item), candidates),
+        ))
+        by_partial = _group(candidates, key=lambda item: (item[1], partial[item[0]]))
+
+        # The partial hash already covered the whole of small files
+        state = ManifestState(index.project_path, cache_dir).load() if index.on_disk else None
+        full = {}
+        to_hash = []
+        for members in by_partial:
+            for rel, size in members:
+                if size <= 2 * PARTIAL_BLOCK:
+                    full[rel] = partial[rel]
+                    continue
+                known = state.lookup(rel, *index.stat(rel)) if state is not None else None
+                if known is not None:
+                    full[rel] = known
+                else:
+                    to_hash.append(rel)
+        full.update(zip(to_hash, executor.map(lambda rel: hash_file(index, rel), to_hash)))
+
+    groups = [
+        DuplicateGroup(members[0][1], full[members[0][0]], sorted(rel for rel, _ in members))
+        for candidates_group in by_partial
+        for members in _group(candidates_group, key=lambda item: full[item[0]])
+    ]
+    groups.sort(key=lambda group: (-group.size * (len(group.paths) - 1), group.paths[0]))
+    return {
+        "groups": groups,
+        "duplicate_files": sum(len(group.paths) - 1 for group in groups),
+        "reclaimable_bytes": sum(group.size * (len(group.paths) - 1) for group in groups),
+        "files": len(sized),
+        "partial_hashed": len(candidates),
+        "full_hashed": len(to_hash),
+    }
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1000
+
+
+def duplicate_copies(groups):
+    """Map every duplicate to the path of the copy that is kept: {copy: original}"""
+    return {copy: group.paths[0] for group in groups for copy in group.paths[1:]}
+
+
+def write_duplicates_csv(stream, copies):
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(["path", "copy_of"])
+    for copy in sorted(copies):
+        writer.writerow([copy, copies[copy]])
+
+
+def read_duplicates(extract_dir):
+    """Return the copies to restore from an extracted DUPLICATES.csv as {target path: source path}
+
+    Rows pointing outside extract_dir, at something that is not a file, or
+    at a target that already exists are left out.
+    """
+    extract_dir = Path(extract_dir)
+    listing = extract_dir / DUPLICATES_ARCNAME
+    if not listing.exists():
+        return {}
+    root = extract_dir.resolve()
+    copies = {}
+    with open(listing, "r", encoding="utf-8", newline="") as f:
+        for record in csv.DictReader(f):
+            target = extract_dir / record["path"]
+            source = extract_dir / record["copy_of"]
+            # Never write or read outside the extracted project
+            if not (target.resolve().is_relative_to(root) and source.resolve().is_relative_to(root)):
+                continue
+            if target.exists() or not source.is_file():
+                continue
+            copies[target] = source
+    return copies
+
+
+def restore_duplicates(extract_dir, copies=None):
+    """Recreate the copies left out of a deduplicated ZIP after extracting it; returns how many
+
+    copies is the result of read_duplicates(), if the caller already checked it.
+    """
+    copies = read_duplicates(extract_dir) if copies is None else copies
+    restored = 0
+    for target, source in copies.items():
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+        restored += 1
+    return restored
@@ -0,0 +1,212 @@
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import uuid
+
+
+# Uploads are copied to disk in chunks of this size
+CHUNK_SIZE = int(os.environ.get("FAIRYTALE_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+
+# Upper bound on chunk memory held at once by all concurrent copies in this process
+MAX_INFLIGHT_BYTES = int(os.environ.get("FAIRYTALE_UPLOAD_MAX_INFLIGHT_MB", "64")) * 1024 * 1024
+
+
+class MemoryBudget:
+    """Counting limit on bytes held in copy buffers, shared by every copy in the process"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, n):
+        with self._condition:
+            # A single request larger than the limit is still allowed when nothing else is running
+            while self.in_use and self.in_use + n > self.limit:
+                self._condition.wait()
+            self.in_use += n
+
+    def release(self, n):
+        with self._condition:
+            self.in_use -= n
+            self._condition.notify_all()
+
+
+upload_budget = MemoryBudget(MAX_INFLIGHT_BYTES)
+
+
+def stream_to_file(source, target_path, chunk_size=None, algorithm="sha256", budget=None):
+    """Copy a readable binary stream to target_path in bounded chunks
+
+    The file is written next to the target and renamed into place once complete,
+    and its digest is computed on the fly. Returns (size, hex digest or None).
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    budget = budget or upload_budget
+    digest = hashlib.new(algorithm) if algorithm else None
+    size = 0
+
+    budget.acquire(chunk_size)
+    tmp_path = None
+    try:
+        fd, tmp_path = _temp_file(target_path)
+        buffer = memoryview(bytearray(chunk_size))
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                n = source.readinto(buffer)
+                if not n:
+                    break
+                chunk = buffer[:n]
+                if digest is not None:
+                    digest.update(chunk)
+                f.write(chunk)
+                size += n
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if tmp_path is not None:
+            _remove(tmp_path)
+        raise
+    finally:
+        budget.release(chunk_size)
+
+    return size, digest.hexdigest() if digest is not None else None
+
+
+# ioctl that makes the target share the source's blocks (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+# Errors meaning "this way of copying does not work here", so the next one is tried
+_UNSUPPORTED = {
+    errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM,
+    errno.EBADF,
+}
+INGEST_METHODS = ("reflink", "hardlink", "copy_file_range", "sendfile", "copy")
+
+
+def _temp_name(target_path):
+    directory, name = os.path.split(os.fspath(target_path))
+    return os.path.join(directory or ".", f".{name}.{uuid.uuid4().hex}.part")
+
+
+def _temp_file(target_path):
+    """Create a uniquely named partial file next to target_path, so concurrent writers never share one
+
+    Created with mode 0o666 like open() does, so the kernel applies the umask.
+    Returns (fd, path).
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        path = _temp_name(target_path)
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _hardlink(source, target_path):
+    """Link source to a unique name next to target_path; returns that name, or None if linking is not possible"""
+    link_path = _temp_name(target_path)
+    try:
+        os.link(source, link_path)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED and e.errno not in (errno.EMLINK, errno.EEXIST):
+            raise
+        return None
+    return link_path
+
+
+def _reflink(src_fd, dst_fd, size):
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOTSUP, "reflinks are only tried on Linux")
+    import fcntl
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd, dst_fd, size):
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "copy_file_range is not available")
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, size - copied)
+        if not n:
+            # Some filesystems (procfs, some FUSE mounts) report 0 instead of an error
+            raise OSError(errno.ENOTSUP, f"copy_file_range stopped after {copied} of {size} bytes")
+        copied += n
+
+
+def _sendfile(src_fd, dst_fd, size):
+    if not sys.platform.startswith("linux"):
+        # Elsewhere sendfile() only writes to sockets
+        raise OSError(errno.ENOTSUP, "sendfile to a file is only supported on Linux")
+    copied = 0
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, copied, size - copied)
+        if not n:
+            raise OSError(errno.ENOTSUP, f"sendfile stopped after {copied} of {size} bytes")
+        copied += n
+
+
+def _buffered_copy(src_fd, dst_fd, size):
+    with open(src_fd, "rb", closefd=False) as src, open(dst_fd, "wb", closefd=False) as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def ingest_file(source, target_path, hardlink=False):
+    """Bring a local file into a project without pushing its bytes through Python if possible
+
+    Tries, in order: a reflink (copy-on-write clone, no extra disk space), a
+    hardlink when allowed (same inode, so later edits show in both places),
+    os.copy_file_range and os.sendfile (copied inside the kernel), and a
+    buffered copy. The target is written under a unique name next to its
+    final path and renamed into place. Returns the name of the method that was used.
+    """
+    fd, tmp_path = _temp_file(target_path)
+    linked = None
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            size = os.fstat(src.fileno()).st_size
+            try:
+                _reflink(src.fileno(), dst.fileno(), size)
+                method = "reflink"
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                method = None
+                linked = _hardlink(source, target_path) if hardlink else None
+
+            if method is None and linked is None:
+                for method, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile),
+                                     ("copy", _buffered_copy)):
+                    try:
+                        copy(src.fileno(), dst.fileno(), size)
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED or method == "copy":
+                            raise
+                        # Start the next method from an empty target
+                        os.ftruncate(dst.fileno(), 0)
+                        os.lseek(src.fileno(), 0, os.SEEK_SET)
+                        os.lseek(dst.fileno(), 0, os.SEEK_SET)
+                        continue
+                    break
+
+        if linked is not None:
+            _remove(tmp_path)
+            tmp_path, method = linked, "hardlink"
+        else:
+            shutil.copymode(source, tmp_path)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        _remove(tmp_path)
+        if linked is not None:
+            _remove(linked)
+        raise
+    return method
@@ -0,0 +1,151 @@
+import csv
+import json
+import posixpath
+from collections import namedtuple
+from pathlib import Path
+
+
+# One structured validation result. severity is "pass", "fail" or "warning";
+# path is relative to the project root (None for project-wide findings).
+Finding = namedtuple("Finding", ["rule_id", "severity", "message", "path", "principle"], defaults=[None, None])
+
+# Keys of OpenScienceValidator.validation_results and the symbol shown before each message
+SEVERITY_RESULTS = {"pass": "passed", "fail": "failed", "warning": "warnings"}
+SEVERITY_SYMBOLS = {"pass": "✓", "fail": "✗", "warning": "⚠"}
+SARIF_LEVELS = {"pass": "none", "fail": "error", "warning": "warning"}
+
+# Rule id -> (short description, FAIR principle)
+RULES = {
+    "project.exists": ("Project directory exists", None),
+    "file.required": ("Required top-level files are present", "Findable"),
+    "file.recommended": ("Recommended top-level files are present", "Reusable"),
+    "readme.sections": ("README.md covers the key sections", "Reusable"),
+    "license.cc_by": ("License is CC-BY-4.0", "Reusable"),
+    "citation.fields": ("CITATION.cff has the required fields", "Findable"),
+    "dir.required": ("Required directories are present", "Reusable"),
+    "dir.recommended": ("Recommended directories are present", "Reusable"),
+    "dir.empty": ("Directories are not empty", "Reusable"),
+    "participants.data_files": ("Participant data is stored as CSV/TSV", "Interoperable"),
+    "data.subdirs": ("Data directories contain subdirectories", "Reusable"),
+    "data.raw_dir": ("Data directories contain a raw data folder", "Reusable"),
+    "data.preproc_dir": ("Data directories contain a preprocessed data folder", "Reusable"),
+    "data.empty": ("Raw/preprocessed data directories are not empty", "Reusable"),
+    "data.naming": ("Data subdirectories follow BIDS-like naming", "Interoperable"),
+    "data.empty_subdirs": ("Data subdirectories are not empty", "Reusable"),
+    "data.files": ("Data is stored in open data formats", "Accessible"),
+    "data.readme": ("Raw data is documented with a README", "Reusable"),
+    "data.dictionary": ("Raw data has a data dictionary or codebook", "Interoperable"),
+    "data.tabular": ("Tabular data files are well-formed, delimited UTF-8 with a header", "Interoperable"),
+    "scripts.prep": ("Data preparation scripts are present", "Reusable"),
+    "scripts.analysis": ("Analysis scripts are present", "Reusable"),
+    "results.figures": ("Figures are stored in common formats", "Reusable"),
+    "results.tables": ("Tables are stored in common formats", "Interoperable"),
+    "files.duplicates": ("Files are not stored more than once", "Reusable"),
+    "practice.gitignore": ("Project has a .gitignore", "Reusable"),
+    "practice.environment": ("Software environment is specified", "Reusable"),
+    "practice.data_dictionary": ("Project has a data dictionary or codebook", "Interoperable"),
+    "manifest.verified": ("Data matches the checksum manifest", "Reusable"),
+    "manifest.modified": ("Data was not modified after the manifest was generated", "Reusable"),
+    "manifest.missing": ("Files listed in the checksum manifest exist", "Reusable"),
+    "manifest.unlisted": ("All data files are listed in the checksum manifest", "Reusable"),
+}
+
+
+def format_finding(finding):
+    """Render a finding the way validation_results lists it"""
+    return f"{SEVERITY_SYMBOLS[finding.severity]} {finding.message}"
+
+
+def finding_to_dict(finding):
+    return finding._asdict()
+
+
+def finding_to_jsonl(finding):
+    """Return one JSON line (with trailing newline) for a finding"""
+    return json.dumps(finding_to_dict(finding), ensure_ascii=False) + "\n"
+
+
+def findings_to_json(findings, project_path, recommendations=()):
+    """Return a JSON-serialisable report with a summary, all findings and recommendations"""
+    summary = {results_key: 0 for results_key in SEVERITY_RESULTS.values()}
+    for finding in findings:
+        summary[SEVERITY_RESULTS[finding.severity]] += 1
+    return {
+        "project": str(project_path),
+        "summary": summary,
+        "findings": [finding_to_dict(finding) for finding in findings],
+        "recommendations": list(recommendations),
+    }
+
+
+CSV_COLUMNS = ["severity", "rule_id", "path", "principle", "message"]
+
+
+def findings_to_csv(findings, stream):
+    """Write every finding as one CSV row to a text stream"""
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for finding in findings:
+        writer.writerow([getattr(finding, column) or "" for column in CSV_COLUMNS])
+
+
+def group_findings(findings, depth=2):
+    """Group findings by rule and by the first depth components of their directory
+
+    Returns [(rule_id, directory, findings)], largest groups first; directory
+    is "" for findings at the project root or without a path.
+    """
+    groups = {}
+    for finding in findings:
+        parts = posixpath.dirname(finding.path or "").split("/")
+        directory = "/".join(parts[:depth])
+        groups.setdefault((finding.rule_id, directory), []).append(finding)
+    ordered = sorted(groups.items(), key=lambda item: -len(item[1]))
+    return [(rule_id, directory, members) for (rule_id, directory), members in ordered]
+
+
+def findings_to_sarif(findings, project_path):
+    """Return a SARIF 2.1.0 log; passed checks are included as results of kind 'pass'"""
+    used_rules = sorted({finding.rule_id for finding in findings})
+    rule_index = {rule_id: i for i, rule_id in enumerate(used_rules)}
+    rules = []
+    for rule_id in used_rules:
+        description, principle = RULES.get(rule_id, (rule_id, None))
+        rule = {"id": rule_id, "shortDescription": {"text": description}}
+        if principle:
+            rule["properties"] = {"fair_principle": principle}
+        rules.append(rule)
+
+    results = []
+    for finding in findings:
+        result = {
+            "ruleId": finding.rule_id,
+            "ruleIndex": rule_index[finding.rule_id],
+            "kind": "pass" if finding.severity == "pass" else "fail",
+            "level": SARIF_LEVELS[finding.severity],
+            "message": {"text": finding.message},
+        }
+        if finding.path is not None:
+            result["locations"] = [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": finding.path, "uriBaseId": "PROJECTROOT"}
+                }
+            }]
+        if finding.principle:
+            result["properties"] = {"fair_principle": finding.principle}
+        results.append(result)
+
+    project_uri = Path(project_path).resolve().as_uri() if Path(project_path).exists() else str(project_path)
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {
+                "name": "FAIRyTale",
+                "informationUri": "https://github.com/NeuroHackademy2025/open-science-pipeline",
+                "rules": rules,
+            }},
+            "originalUriBaseIds": {"PROJECTROOT": {"uri": project_uri.rstrip("/") + "/"}},
+            "results": results,
+        }],
+    }
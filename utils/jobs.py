@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Jobs running at once in this process; more are queued
+JOB_WORKERS = int(os.environ.get("FAIRYTALE_JOB_WORKERS", "4"))
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = 3600
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once the job has been cancelled"""
+
+
+class Job:
+    """A unit of background work: status, progress and its result or error
+
+    status goes queued -> running -> done, failed or cancelled. The job
+    function reports progress with job.progress(); that is also where a
+    cancellation takes effect.
+    """
+
+    def __init__(self, kind, description=""):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    def progress(self, done, total=None, message=None):
+        """Record progress; raises JobCancelled if the job was cancelled meanwhile"""
+        self.check_cancelled()
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    @property
+    def fraction(self):
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+
+class JobQueue:
+    """Runs jobs in a bounded pool of worker threads and keeps them by id for polling"""
+
+    def __init__(self, workers=JOB_WORKERS, retention=JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fairytale-job")
+
+    def submit(self, kind, fn, *args, description="", **kwargs):
+        """Queue fn(job, *args, **kwargs) and return its Job at once"""
+        job = Job(kind, description)
+        with self._lock:
+            self._prune()
+            self.jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Ask a job to stop; queued jobs never start, running ones stop at their next progress report"""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+        return job
+
+    def active(self):
+        with self._lock:
+            return [job for job in self.jobs.values() if not job.finished]
+
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        try:
+            job.check_cancelled()
+            job.status = "running"
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            JobQueue._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            JobQueue._finish(job, "failed")
+        else:
+            job.result = result
+            JobQueue._finish(job, "done")
+
+    @staticmethod
+    def _finish(job, status):
+        # finished_at is set first, so a finished job always has one
+        job.finished_at = time.time()
+        job.status = status
+
+    def _prune(self):
+        """Forget jobs that finished more than retention seconds ago; called with self._lock held"""
+        now = time.time()
+        cutoff = now - self.retention
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and (job.finished_at or now) < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+
+# Shared by every session of the app process
+jobs = JobQueue()
@@ -0,0 +1,233 @@
+import csv
+import io
+import os
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from utils.checksum_manifest import RAW_DATA_DIR
+from utils.data_dictionary import DICTIONARY_NAMES
+from utils.data_sniffer import looks_tabular, sniff_file
+from utils.project_index import ProjectIndex
+
+
+PREPROC_DIR = "02_data/02_preproc"
+MAPPING_PATH = "05_meta/parquet_mapping.csv"
+MAPPING_COLUMNS = ["source", "target", "rows", "columns", "skipped_rows", "source_bytes", "parquet_bytes", "converted"]
+
+SOURCE_EXTENSIONS = (".csv", ".tsv", ".txt")
+NULL_VALUES = ["", "NA", "N/A", "n/a", "NaN", "nan", "null", "NULL", "None", "-"]
+# CSV blocks read at a time; one block (plus its Parquet row group) is held in memory per file
+BLOCK_SIZE = 8 * 1024 * 1024
+COMPRESSION = "zstd"
+
+
+def target_paths(rel_paths):
+    """Map 01_raw/<path>.<ext> to 02_preproc/<path>.parquet, keeping the extension on name clashes"""
+    targets = {}
+    stems = {}
+    for rel_path in rel_paths:
+        stem = posixpath.splitext(posixpath.relpath(rel_path, RAW_DATA_DIR))[0]
+        stems.setdefault(stem, []).append(rel_path)
+    for stem, sources in stems.items():
+        for rel_path in sources:
+            name = posixpath.relpath(rel_path, RAW_DATA_DIR) if len(sources) > 1 else stem
+            targets[rel_path] = f"{PREPROC_DIR}/{name}.parquet"
+    return targets
+
+
+class _Utf8Reader(io.RawIOBase):
+    """Read a text file in another encoding as UTF-8 bytes
+
+    The sniffer only saw the first block, so its encoding is a guess for the
+    rest of the file: bytes it cannot decode become U+FFFD instead of failing.
+    """
+
+    def __init__(self, path, encoding):
+        self._text = open(path, "r", encoding=encoding, errors="replace", newline="")
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._pending) < len(buffer):
+            chunk = self._text.read(BLOCK_SIZE // 4)
+            if not chunk:
+                break
+            self._pending += chunk.encode("utf-8")
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+        self._text.close()
+        super().close()
+
+
+def _is_utf8(profile):
+    return profile.encoding in (None, "utf-8", "utf-8-sig")
+
+
+def _read_options(profile, all_text=False):
+    # Other encodings are transcoded by _Utf8Reader; pyarrow's own transcoding raises on undefined bytes
+    read_options = pacsv.ReadOptions(block_size=BLOCK_SIZE, encoding="utf8")
+    if not profile.has_header:
+        read_options.column_names = [f"column_{i + 1}" for i in range(profile.columns)]
+    convert_options = pacsv.ConvertOptions(null_values=NULL_VALUES, strings_can_be_null=True)
+    if all_text:
+        names = profile.header or read_options.column_names
+        convert_options.column_types = {name: pa.string() for name in names}
+    return read_options, convert_options
+
+
+def _stream_convert(source, tmp_path, profile, all_text):
+    """Copy a CSV into Parquet block by block; returns (rows, columns, skipped rows)"""
+    skipped = [0]
+
+    def skip_invalid_row(row):
+        skipped[0] += 1
+        return "skip"
+
+    read_options, convert_options = _read_options(profile, all_text)
+    parse_options = pacsv.ParseOptions(delimiter=profile.delimiter, invalid_row_handler=skip_invalid_row)
+    rows = 0
+    stream = source if _is_utf8(profile) else io.BufferedReader(_Utf8Reader(source, profile.encoding), BLOCK_SIZE)
+    try:
+        reader = pacsv.open_csv(stream, read_options=read_options, parse_options=parse_options,
+                                convert_options=convert_options)
+        with pq.ParquetWriter(tmp_path, reader.schema, compression=COMPRESSION) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    finally:
+        if stream is not source:
+            stream.close()
+    return rows, len(reader.schema), skipped[0]
+
+
+def convert_file(project_path, rel_path, target_rel_path, profile):
+    """Convert one raw tabular file to Parquet, never touching the original
+
+    Column types are inferred from the first block; if a later block does not
+    fit them, the file is converted again with every column stored as text.
+    """
+    project_path = Path(project_path)
+    source = project_path / rel_path
+    target = project_path / target_rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        try:
+            rows, columns, skipped = _stream_convert(source, tmp_path, profile, all_text=False)
+        except pa.ArrowInvalid:
+            rows, columns, skipped = _stream_convert(source, tmp_path, profile, all_text=True)
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    return {
+        "source": rel_path,
+        "target": target_rel_path,
+        "rows": rows,
+        "columns": columns,
+        "skipped_rows": skipped,
+        "source_bytes": source.stat().st_size,
+        "parquet_bytes": target.stat().st_size,
+        "converted": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def read_mapping(project_path):
+    """Return the recorded conversions as {source: row dict}"""
+    try:
+        with open(Path(project_path) / MAPPING_PATH, "r", encoding="utf-8", newline="") as f:
+            return {record["source"]: record for record in csv.DictReader(f)}
+    except (OSError, csv.Error, KeyError):
+        return {}
+
+
+def _write_mapping(project_path, mapping):
+    path = Path(project_path) / MAPPING_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=MAPPING_COLUMNS)
+        writer.writeheader()
+        for source in sorted(mapping):
+            writer.writerow({column: mapping[source].get(column, "") for column in MAPPING_COLUMNS})
+    os.replace(tmp_path, path)
+
+
+def convert_raw_to_parquet(project_path, workers=None, force=False):
+    """Write Parquet copies of the tabular files in 02_data/01_raw to 02_data/02_preproc
+
+    Files whose Parquet copy is newer than the source are skipped unless force
+    is set. The source -> target mapping is recorded in 05_meta/parquet_mapping.csv.
+    Returns a summary dict with the converted, skipped and failed files.
+    """
+    start = time.perf_counter()
+    index = ProjectIndex(project_path).build()
+    if not index.is_dir(RAW_DATA_DIR):
+        raise FileNotFoundError(f"No {RAW_DATA_DIR}/ directory found in {project_path}")
+
+    candidates = sorted(
+        rel for rel in index.walk(RAW_DATA_DIR)
+        if index.is_file(rel) and rel.lower().endswith(SOURCE_EXTENSIONS)
+        and posixpath.basename(rel).lower() not in DICTIONARY_NAMES
+    )
+    targets = target_paths(candidates)
+    mapping = read_mapping(project_path)
+
+    pending = []
+    unchanged = []
+    for rel_path in candidates:
+        target = targets[rel_path]
+        target_entry = index.entries.get(target)
+        if (not force and rel_path in mapping and target_entry is not None
+                and target_entry.mtime_ns >= index.stat(rel_path)[1]):
+            unchanged.append(rel_path)
+            continue
+        profile = sniff_file(index, rel_path)
+        # Notes and logs in 01_raw stay as they are; ragged CSV rows are skipped while converting
+        if profile.delimiter is not None and (not rel_path.lower().endswith(".txt") or looks_tabular(profile)):
+            pending.append((rel_path, target, profile))
+
+    failed = {}
+
+    def convert(item):
+        rel_path, target, profile = item
+        try:
+            return convert_file(project_path, rel_path, target, profile)
+        except (OSError, ValueError, pa.ArrowException) as e:
+            # ValueError covers decode errors: one unreadable file must not lose the others' mapping
+            failed[rel_path] = str(e) or type(e).__name__
+            return None
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        converted = [record for record in executor.map(convert, pending) if record is not None]
+
+    # Forget conversions whose source no longer exists
+    mapping = {source: record for source, record in mapping.items() if source in targets}
+    for record in converted:
+        mapping[record["source"]] = record
+    _write_mapping(project_path, mapping)
+
+    return {
+        "mapping": str(Path(project_path) / MAPPING_PATH),
+        "converted": converted,
+        "unchanged": unchanged,
+        "failed": failed,
+        "source_bytes": sum(record["source_bytes"] for record in converted),
+        "parquet_bytes": sum(record["parquet_bytes"] for record in converted),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
@@ -0,0 +1,196 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+
+# When set, the app writes a Chrome trace of every validation into this directory
+PROFILE_DIR = os.environ.get("FAIRYTALE_PROFILE_DIR") or None
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# One timed phase. start and seconds are wall-clock (start relative to the profiler's creation);
+# cpu_seconds is process CPU time, so seconds - cpu_seconds is time spent waiting (I/O, NFS, locks).
+# syscalls counts read/write-class syscalls (Linux), fs_ops audited filesystem operations
+# (open, scandir, mkdir, rename, ...) and index_calls the scandir/stat/open calls of the ProjectIndex.
+Span = namedtuple(
+    "Span",
+    ["name", "category", "start", "seconds", "cpu_seconds", "syscalls", "fs_ops", "index_calls", "thread", "depth",
+     "args"]
+)
+
+_fs_ops = {"count": 0, "installed": False}
+_proc_io = {"fd": None}
+_install_lock = threading.Lock()
+
+
+def _count_fs_ops(event, args):
+    # os.stat is not audited; ProjectIndex counts its stat calls itself (index_calls)
+    if event == "open" or event.startswith(("os.", "shutil.")):
+        _fs_ops["count"] += 1
+
+
+def install_fs_op_counter():
+    """Start counting audited filesystem operations (audit hooks cannot be removed, so only once)"""
+    with _install_lock:
+        if not _fs_ops["installed"]:
+            sys.addaudithook(_count_fs_ops)
+            _fs_ops["installed"] = True
+
+
+def fs_ops():
+    """Filesystem operations seen by the audit hook since it was installed"""
+    return _fs_ops["count"]
+
+
+def io_syscalls():
+    """Return the number of read- and write-class syscalls made by this process so far (Linux only)"""
+    try:
+        # Kept open and read with pread: reopening it would itself count as a filesystem operation
+        if _proc_io["fd"] is None:
+            _proc_io["fd"] = os.open("/proc/self/io", os.O_RDONLY)
+        counters = dict(line.split(":", 1) for line in os.pread(_proc_io["fd"], 4096, 0).decode().splitlines())
+        return int(counters["syscr"]) + int(counters["syscw"])
+    except (OSError, AttributeError, KeyError, ValueError):
+        return None
+
+
+class Profiler:
+    """Records nested spans of the validation pipeline for a summary table and trace files
+
+    Pass one to OpenScienceValidator(profiler=...) or wrap any phase in
+    profiler.span(name). Spans can be exported as a Chrome trace (chrome://tracing,
+    Perfetto) or a speedscope profile.
+    """
+
+    def __init__(self):
+        install_fs_op_counter()
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category="validation", index=None, **args):
+        """Time the block; index is a ProjectIndex whose filesystem calls are counted too"""
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        syscalls = io_syscalls()
+        ops = fs_ops()
+        index_calls = index.fs_calls() if index is not None else None
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            cpu_seconds = time.process_time() - cpu
+            after = io_syscalls()
+            self._local.depth = depth
+            span = Span(
+                name, category, start - self._origin, seconds, cpu_seconds,
+                after - syscalls if syscalls is not None and after is not None else None,
+                fs_ops() - ops,
+                index.fs_calls() - index_calls if index is not None else None,
+                threading.get_ident(), depth, args,
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    def summary(self):
+        """Aggregate spans by name: {name: {category, calls, seconds, cpu_seconds, wait_seconds, syscalls, ...}}"""
+        totals = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            total = totals.setdefault(span.name, {
+                "category": span.category, "calls": 0, "seconds": 0.0, "cpu_seconds": 0.0, "wait_seconds": 0.0,
+                "syscalls": None, "fs_ops": 0, "index_calls": None,
+            })
+            total["calls"] += 1
+            total["seconds"] += span.seconds
+            total["cpu_seconds"] += span.cpu_seconds
+            total["wait_seconds"] += max(0.0, span.seconds - span.cpu_seconds)
+            total["fs_ops"] += span.fs_ops
+            for key in ("syscalls", "index_calls"):
+                if getattr(span, key) is not None:
+                    total[key] = (total[key] or 0) + getattr(span, key)
+        return totals
+
+    def summary_table(self):
+        """Spans aggregated by name, slowest first; times in ms, Wait = wall - CPU time"""
+        from rich.table import Table
+
+        table = Table(title="Profile (spans include their nested spans)")
+        table.add_column("Span", style="cyan", no_wrap=True)
+        table.add_column("Calls", justify="right")
+        table.add_column("Wall", justify="right")
+        table.add_column("CPU", justify="right")
+        table.add_column("Wait", justify="right")
+        table.add_column("Syscalls", justify="right")
+        table.add_column("FS ops", justify="right")
+        table.add_column("Index", justify="right")
+        for name, total in sorted(self.summary().items(), key=lambda item: -item[1]["seconds"]):
+            table.add_row(
+                name, str(total["calls"]), f"{total['seconds'] * 1000:.1f}", f"{total['cpu_seconds'] * 1000:.1f}",
+                f"{total['wait_seconds'] * 1000:.1f}",
+                "-" if total["syscalls"] is None else str(total["syscalls"]), str(total["fs_ops"]),
+                "-" if total["index_calls"] is None else str(total["index_calls"]),
+            )
+        return table
+
+    def to_chrome_trace(self):
+        """Return the spans in the Chrome trace event format (complete "X" events, microseconds)"""
+        pid = os.getpid()
+        events = []
+        for span in sorted(self.spans, key=lambda span: (span.start, -span.seconds)):
+            args = {key: value for key, value in span.args.items() if value is not None}
+            args.update(cpu_ms=round(span.cpu_seconds * 1000, 3), fs_ops=span.fs_ops)
+            if span.syscalls is not None:
+                args["syscalls"] = span.syscalls
+            if span.index_calls is not None:
+                args["index_calls"] = span.index_calls
+            events.append({
+                "name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": span.thread,
+                "ts": round(span.start * 1e6, 3), "dur": round(span.seconds * 1e6, 3), "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_speedscope(self, name="FAIRyTale validation"):
+        """Return the spans as a speedscope evented profile, one profile per thread"""
+        frames = []
+        frame_ids = {}
+        profiles = []
+        threads = sorted({span.thread for span in self.spans})
+        for number, thread in enumerate(threads):
+            events = []
+            for span in (span for span in self.spans if span.thread == thread):
+                frame = frame_ids.setdefault(span.name, len(frames))
+                if frame == len(frames):
+                    frames.append({"name": span.name, "file": span.category})
+                start, end = span.start * 1000, (span.start + span.seconds) * 1000
+                # Closes sort before opens at the same instant; inner spans open last and close first
+                events.append((start, 1, -end, {"type": "O", "frame": frame, "at": start}))
+                events.append((end, 0, -start, {"type": "C", "frame": frame, "at": end}))
+            events.sort(key=lambda event: event[:3])
+            profiles.append({
+                "type": "evented", "name": name if number == 0 else f"{name} (thread {number})",
+                "unit": "milliseconds", "startValue": events[0][0], "endValue": events[-1][0],
+                "events": [event[3] for event in events],
+            })
+        return {"$schema": SPEEDSCOPE_SCHEMA, "shared": {"frames": frames}, "profiles": profiles,
+                "name": name, "exporter": "fairytale"}
+
+    def write(self, path, fmt="chrome"):
+        """Write the spans to path as a Chrome trace ("chrome") or speedscope profile ("speedscope")"""
+        data = self.to_speedscope() if fmt == "speedscope" else self.to_chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def profile_span(profiler, name, category="validation", index=None, **args):
+    """profiler.span(...), or a no-op context when profiling is off"""
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name, category, index, **args)
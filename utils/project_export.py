@@ -0,0 +1,198 @@
+import hashlib
+import io
+import json
+import os
+import uuid
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from utils.duplicates import DUPLICATES_ARCNAME, duplicate_copies, find_duplicates, write_duplicates_csv
+from utils.project_index import ProjectIndex
+
+
+# Formats that are already compressed (or do not compress) are stored as is
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".tif", ".tiff", ".pdf",
+    ".parquet", ".feather", ".arrow", ".h5", ".hdf5", ".npy", ".npz", ".mat",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".mkv", ".ogg", ".flac",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods",
+}
+
+# Other files are stored if a quick compression of their first block saves less than this
+SAMPLE_SIZE = 64 * 1024
+MIN_SAVING = 0.05
+
+DEFAULT_COMPRESSLEVEL = 6
+
+
+def is_incompressible(path, sample=None):
+    """Guess whether deflating a file is a waste of time, from its extension or a sample"""
+    if os.path.splitext(str(path))[1].lower() in STORED_EXTENSIONS:
+        return True
+    if sample is None:
+        with open(path, "rb") as f:
+            sample = f.read(SAMPLE_SIZE)
+    if len(sample) < 512:
+        return False
+    return len(zlib.compress(sample, 1)) > len(sample) * (1 - MIN_SAVING)
+
+
+def _export_state(index, extra_files):
+    """Describe what would go into the archive: {arcname: [size, mtime_ns]} plus extra files"""
+    members = {}
+    for rel in index.walk(""):
+        entry = index.entries[rel]
+        if entry.is_dir:
+            # Directory mtimes change with their contents; only their presence matters here
+            members[f"{rel}/"] = [0, 0]
+        else:
+            members[rel] = [entry.size, entry.mtime_ns]
+
+    extras = {}
+    for arcname, source in (extra_files or {}).items():
+        source = Path(source)
+        # The project's own file wins over a template with the same name
+        if source.exists() and arcname not in members:
+            stat = source.stat()
+            extras[arcname] = [str(source), stat.st_size, stat.st_mtime_ns]
+    return {"members": members, "extras": extras}
+
+
+def _fingerprint(state):
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def _state_path(zip_path):
+    return Path(f"{zip_path}.state.json")
+
+
+def _load_state(zip_path):
+    try:
+        with open(_state_path(zip_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _unique_tmp(path):
+    # App sessions are threads of one process, so the process id alone is not unique
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def _save_state(zip_path, state):
+    """Write the sidecar through a temporary file, so it is never left half-written"""
+    path = _state_path(zip_path)
+    tmp_path = _unique_tmp(path)
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def _write_members(zipf, base_path, arcnames, workers=None, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Write members in order, deflating only the files that are worth it
+
+    Worker threads sample upcoming files to decide between deflating and
+    storing them (at most twice as many members as workers ahead of the one
+    being written), while the calling thread writes each member with
+    zipfile itself.
+    """
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def write_next():
+            arcname, path, future = pending.popleft()
+            if future is not None and not future.result():
+                zipf.write(path, arcname, compress_type=zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+            else:
+                zipf.write(path, arcname, compress_type=zipfile.ZIP_STORED)
+
+        for arcname in arcnames:
+            path = Path(base_path) / arcname.rstrip("/")
+            future = None
+            if compresslevel and not arcname.endswith("/"):
+                future = executor.submit(is_incompressible, path)
+            pending.append((arcname, path, future))
+            if len(pending) >= workers * 2:
+                write_next()
+        while pending:
+            write_next()
+
+
+def export_project_zip(base_path, zip_path, extra_files=None, workers=None,
+                       compresslevel=DEFAULT_COMPRESSLEVEL, dedupe=False):
+    """Write base_path into zip_path, reusing the existing archive when possible
+
+    extra_files maps archive names to files outside the project (e.g. a README
+    template) that are written first. Members are deflated at compresslevel
+    (0 stores everything), except formats that are already compressed. With dedupe, identical files are stored once and the copies
+    left out are listed in DUPLICATES.csv (see utils.duplicates.restore_duplicates).
+    Returns "cached" if the archive already matches the project,
+    "appended" if only new files were added to it, or "rebuilt" if it had to
+    be written from scratch.
+    """
+    base_path = Path(base_path)
+    zip_path = Path(zip_path)
+    index = ProjectIndex(base_path).build()
+    state = _export_state(index, extra_files)
+    state["compresslevel"] = compresslevel
+    fingerprinted = {"members": state["members"], "extras": state["extras"], "compresslevel": compresslevel}
+    if dedupe:
+        state["dedupe"] = fingerprinted["dedupe"] = True
+    state["fingerprint"] = _fingerprint(fingerprinted)
+    previous = _load_state(zip_path) if zip_path.exists() else None
+
+    if previous and previous.get("fingerprint") == state["fingerprint"]:
+        return "cached"
+
+    # Nothing changed or removed: append the new members to the existing archive
+    # (a deduplicated archive is rebuilt, since new files may be copies of old ones)
+    if previous and not dedupe and not previous.get("dedupe") and previous["extras"] == state["extras"] and previous.get("compresslevel") == compresslevel and all(
+        state["members"].get(arcname) == stats for arcname, stats in previous["members"].items()
+    ):
+        new_members = sorted(arcname for arcname in state["members"] if arcname not in previous["members"])
+        with zipfile.ZipFile(zip_path, "a") as zipf:
+            _write_members(zipf, base_path, new_members, workers, compresslevel)
+        _save_state(zip_path, state)
+        return "appended"
+
+    copies = {}
+    if dedupe and DUPLICATES_ARCNAME not in state["members"]:
+        files = [arcname for arcname in state["members"] if not arcname.endswith("/")]
+        copies = duplicate_copies(find_duplicates(index, files, workers=workers)["groups"])
+
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _unique_tmp(zip_path)
+    with zipfile.ZipFile(tmp_path, "w") as zipf:
+        for arcname, (source, _, _) in state["extras"].items():
+            zipf.write(source, arcname, compress_type=zipfile.ZIP_DEFLATED)
+        if copies:
+            listing = io.StringIO()
+            write_duplicates_csv(listing, copies)
+            zipf.writestr(DUPLICATES_ARCNAME, listing.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+        arcnames = sorted(arcname for arcname in state["members"] if arcname not in copies)
+        _write_members(zipf, base_path, arcnames, workers, compresslevel)
+    os.replace(tmp_path, zip_path)
+    _save_state(zip_path, state)
+    return "rebuilt"
+
+
+def is_export_current(base_path, zip_path, extra_files=None):
+    """Return True if zip_path was built from the current state of base_path"""
+    previous = _load_state(zip_path) if Path(zip_path).exists() else None
+    if not previous:
+        return False
+    state = _export_state(ProjectIndex(base_path).build(), extra_files)
+    state["compresslevel"] = previous.get("compresslevel")
+    if previous.get("dedupe"):
+        state["dedupe"] = True
+    return previous.get("fingerprint") == _fingerprint(state)
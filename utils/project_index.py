@@ -0,0 +1,456 @@
+import hashlib
+import io
+import os
+import posixpath
+import time
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+
+from utils.safe_zip import UnsafeArchiveError, check_archive
+
+
+# One record per indexed path. mtime_ns is kept as an int so it can be compared exactly.
+IndexEntry = namedtuple("IndexEntry", ["is_dir", "size", "mtime_ns"])
+
+
+class ProjectIndex:
+    """In-memory index of a project tree, built with a single os.scandir walk.
+
+    Paths are stored relative to the project root using forward slashes
+    ("" is the root itself), so every check can query the index instead of
+    touching the filesystem again.
+    """
+
+    # Entries are real files whose stats can be compared across runs
+    on_disk = True
+    # Set while the index is kept up to date from filesystem events (watch mode);
+    # the stats of its files are then current enough to fingerprint their contents
+    watched = False
+
+    def __init__(self, project_path):
+        self.project_path = Path(project_path)
+        self.entries = {}
+        self.children = {}
+        self.child_dirs = {}
+        self.links = set()
+        self.by_extension = {}
+        self.scandir_calls = 0
+        self.stat_calls = 0
+        self.open_calls = 0
+        self.reused_dirs = set()
+        self._digests = {}
+
+    def build(self, previous=None):
+        """Walk the project tree once, recording type, size and mtime of every entry
+
+        previous is an optional snapshot() of an earlier build. Directories whose
+        mtime is unchanged reuse their cached listing, so only their subdirectories
+        are stat'ed again. Cached file sizes/mtimes are not refreshed in that case.
+        """
+        self.entries.clear()
+        self.children.clear()
+        self.child_dirs.clear()
+        self.links.clear()
+        self.by_extension.clear()
+        self.reused_dirs.clear()
+        self._digests.clear()
+        previous = previous or {}
+
+        try:
+            root_stat = os.stat(self.project_path)
+        except OSError:
+            return self
+        self.stat_calls += 1
+        self.entries[""] = IndexEntry(True, 0, root_stat.st_mtime_ns)
+
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            self.children[rel_dir] = []
+            self.child_dirs[rel_dir] = []
+            cached = previous.get(rel_dir)
+            if cached is not None and cached["mtime_ns"] == self.entries[rel_dir].mtime_ns:
+                self._reuse_listing(rel_dir, cached["children"], pending)
+            else:
+                self._scan_listing(rel_dir, pending)
+
+        return self
+
+    def refresh(self, rel_paths):
+        """Bring the index up to date after the given paths changed on disk
+
+        Used by watch mode instead of a full build: the parent directory of
+        every changed path (and the path itself if it is a directory) is listed
+        again, new subdirectories are scanned and vanished entries are dropped
+        with everything below them.
+        """
+        self._digests.clear()
+        dirs = set()
+        for rel in rel_paths:
+            if rel and not self.is_file(rel):
+                dirs.add(rel)
+            dirs.add(posixpath.dirname(rel) if rel else "")
+        # Parents first, so a directory scanned as new is not listed twice
+        scanned = set()
+        for rel_dir in sorted(dirs, key=lambda rel: (rel.count("/") + bool(rel), rel)):
+            # Changes below a directory the index does not know yet: list its nearest indexed ancestor
+            while rel_dir not in self.children and rel_dir:
+                rel_dir = posixpath.dirname(rel_dir)
+            if rel_dir not in scanned:
+                self._resync_listing(rel_dir, scanned)
+        return self
+
+    def _resync_listing(self, rel_dir, scanned):
+        try:
+            stat = os.stat(self.project_path / rel_dir)
+            self.stat_calls += 1
+            self.scandir_calls += 1
+            with os.scandir(self.project_path / rel_dir) as it:
+                dir_entries = list(it)
+        except OSError:
+            if rel_dir:
+                self._remove(rel_dir)
+            else:
+                self.entries.pop("", None)
+            return
+        self.entries[rel_dir] = IndexEntry(True, 0, stat.st_mtime_ns)
+        self.reused_dirs.discard(rel_dir)
+
+        listed = set()
+        pending = []
+        for dir_entry in dir_entries:
+            try:
+                is_dir = dir_entry.is_dir()
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+            self.stat_calls += 1
+            is_link = is_dir and dir_entry.is_symlink()
+            rel = self.join(rel_dir, dir_entry.name)
+            listed.add(dir_entry.name)
+            entry = self.entries.get(rel)
+            if entry is not None and entry.is_dir == is_dir and (rel in self.links) == is_link:
+                # Known entry: only its stats change, a directory's contents have their own events
+                self.entries[rel] = IndexEntry(is_dir, 0 if is_dir else stat.st_size, stat.st_mtime_ns)
+                continue
+            if entry is not None:
+                self._remove(rel)
+            self._add(rel_dir, dir_entry.name, is_dir, is_link, stat.st_size, stat.st_mtime_ns, pending)
+
+        for name in [name for name in self.children.get(rel_dir, []) if name not in listed]:
+            self._remove(self.join(rel_dir, name))
+
+        scanned.add(rel_dir)
+        while pending:
+            current = pending.pop()
+            scanned.add(current)
+            self.children[current] = []
+            self.child_dirs[current] = []
+            self._scan_listing(current, pending)
+
+    def _remove(self, rel):
+        """Drop an entry, and everything below it if it is a directory"""
+        if rel not in self.entries:
+            return
+        for child in [rel, *self.walk(rel)] if rel in self.children else [rel]:
+            entry = self.entries.pop(child)
+            self.links.discard(child)
+            self.children.pop(child, None)
+            self.child_dirs.pop(child, None)
+            if not entry.is_dir:
+                ext = os.path.splitext(child)[1]
+                self.by_extension[ext].remove(child)
+                if not self.by_extension[ext]:
+                    del self.by_extension[ext]
+        parent, name = posixpath.split(rel)
+        self.children[parent].remove(name)
+        if name in self.child_dirs[parent]:
+            self.child_dirs[parent].remove(name)
+
+    def _scan_listing(self, rel_dir, pending):
+        try:
+            self.scandir_calls += 1
+            with os.scandir(self.project_path / rel_dir) as it:
+                dir_entries = list(it)
+        except OSError:
+            return
+
+        for dir_entry in dir_entries:
+            try:
+                is_dir = dir_entry.is_dir()
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+            self.stat_calls += 1
+            # Do not descend into symlinked directories to avoid cycles
+            is_link = is_dir and dir_entry.is_symlink()
+            self._add(rel_dir, dir_entry.name, is_dir, is_link, stat.st_size, stat.st_mtime_ns, pending)
+
+    def _reuse_listing(self, rel_dir, cached_children, pending):
+        self.reused_dirs.add(rel_dir)
+        for name, kind, size, mtime_ns in cached_children:
+            if kind == "f":
+                self._add(rel_dir, name, False, False, size, mtime_ns, pending)
+                continue
+            # Subdirectories are stat'ed again so changes further down are noticed
+            try:
+                stat = os.stat(self.project_path / rel_dir / name)
+            except OSError:
+                continue
+            self.stat_calls += 1
+            self._add(rel_dir, name, True, kind == "l", 0, stat.st_mtime_ns, pending)
+
+    def _add(self, rel_dir, name, is_dir, is_link, size, mtime_ns, pending):
+        rel = self.join(rel_dir, name)
+        self.children[rel_dir].append(name)
+        if is_dir:
+            self.entries[rel] = IndexEntry(True, 0, mtime_ns)
+            self.child_dirs[rel_dir].append(name)
+            if is_link:
+                self.links.add(rel)
+            else:
+                pending.append(rel)
+        else:
+            self.entries[rel] = IndexEntry(False, size, mtime_ns)
+            ext = os.path.splitext(name)[1]
+            self.by_extension.setdefault(ext, []).append(rel)
+
+    def snapshot(self):
+        """Return the directory listings in a JSON-serialisable form accepted by build(previous=...)"""
+        listings = {}
+        for rel_dir, names in self.children.items():
+            children = []
+            for name in names:
+                rel = self.join(rel_dir, name)
+                entry = self.entries[rel]
+                kind = ("l" if rel in self.links else "d") if entry.is_dir else "f"
+                children.append([name, kind, entry.size, entry.mtime_ns])
+            listings[rel_dir] = {"mtime_ns": self.entries[rel_dir].mtime_ns, "children": children}
+        return listings
+
+    def fingerprint(self, rel_path="", recursive=True):
+        """Return a digest of a directory (and optionally its whole subtree)
+
+        Each directory contributes its mtime, child count and child names, so the
+        fingerprint changes whenever anything is added, removed or renamed below it.
+        """
+        if not self.is_dir(rel_path):
+            return "missing" if not self.exists(rel_path) else "file"
+
+        digest = hashlib.sha1()
+        pending = [rel_path]
+        while pending:
+            current = pending.pop()
+            digest.update(self._dir_digest(current))
+            if recursive:
+                pending.extend(
+                    self.join(current, name) for name in self.child_dirs.get(current, [])
+                    if self.join(current, name) in self.children
+                )
+        return digest.hexdigest()
+
+    def _dir_digest(self, rel_dir):
+        if rel_dir not in self._digests:
+            names = self.children.get(rel_dir, [])
+            record = f"{rel_dir}\0{self.entries[rel_dir].mtime_ns}\0{len(names)}\0" + "\0".join(names)
+            self._digests[rel_dir] = hashlib.sha1(record.encode("utf-8", "surrogateescape")).digest()
+        return self._digests[rel_dir]
+
+    def stat(self, rel_path):
+        """Return an up-to-date (size, mtime_ns) for an indexed file
+
+        Entries listed during this build are returned as is; entries taken from
+        a cached listing are stat'ed again since in-place edits are not visible
+        in the directory mtime.
+        """
+        entry = self.entries[rel_path]
+        if posixpath.dirname(rel_path) not in self.reused_dirs:
+            return entry.size, entry.mtime_ns
+        stat = os.stat(self.project_path / rel_path)
+        self.stat_calls += 1
+        return stat.st_size, stat.st_mtime_ns
+
+    def exists(self, rel_path=""):
+        return rel_path in self.entries
+
+    def is_dir(self, rel_path=""):
+        entry = self.entries.get(rel_path)
+        return entry is not None and entry.is_dir
+
+    def is_file(self, rel_path):
+        entry = self.entries.get(rel_path)
+        return entry is not None and not entry.is_dir
+
+    def list_dir(self, rel_path=""):
+        """Return the names of the direct children of a directory"""
+        return self.children.get(rel_path, [])
+
+    def subdirs(self, rel_path=""):
+        """Return the names of the direct subdirectories of a directory"""
+        return self.child_dirs.get(rel_path, [])
+
+    def files(self, rel_path=""):
+        """Return the names of the direct files of a directory"""
+        return [name for name in self.list_dir(rel_path) if self.is_file(self.join(rel_path, name))]
+
+    def find(self, rel_path, extensions, recursive=False):
+        """Return relative paths of files under rel_path whose name ends with one of the extensions"""
+        if not recursive:
+            return [
+                self.join(rel_path, name) for name in self.files(rel_path)
+                if name.endswith(tuple(extensions))
+            ]
+
+        prefix = f"{rel_path}/" if rel_path else ""
+        matches = []
+        for ext in extensions:
+            for candidate in self.by_extension.get(ext, []):
+                if candidate.startswith(prefix):
+                    matches.append(candidate)
+        return matches
+
+    def walk(self, rel_path=""):
+        """Yield every indexed path below rel_path (not including rel_path itself)"""
+        pending = [rel_path]
+        while pending:
+            current = pending.pop()
+            for name in self.list_dir(current):
+                child = self.join(current, name)
+                yield child
+                if child in self.children:
+                    pending.append(child)
+
+    def fs_calls(self):
+        """Total number of scandir, stat and open calls made through this index"""
+        return self.scandir_calls + self.stat_calls + self.open_calls
+
+    def open(self, rel_path, mode="r", **kwargs):
+        """Open an indexed file for reading"""
+        self.open_calls += 1
+        return open(self.project_path / rel_path, mode, **kwargs)
+
+    def read_text(self, rel_path):
+        with self.open(rel_path, "r") as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def join(rel_dir, name):
+        return posixpath.join(rel_dir, name) if rel_dir else name
+
+
+class ZipProjectIndex(ProjectIndex):
+    """ProjectIndex built from the central directory of a ZIP archive.
+
+    Nothing is extracted: names, sizes and directory structure come from the
+    archive index, and members are only streamed when a check opens them.
+    If every member lives under a single top-level folder, that folder is
+    treated as the project root. Archives failing check_archive() (zip bombs,
+    members outside the root) raise UnsafeArchiveError when built.
+    """
+
+    on_disk = False
+
+    def __init__(self, zip_source, name=None):
+        self.zip_file = zipfile.ZipFile(zip_source)
+        if name is None and isinstance(zip_source, (str, os.PathLike)):
+            name = os.fspath(zip_source)
+        self.archive_name = name or getattr(zip_source, "name", None) or "archive.zip"
+        self.prefix = ""
+        self.members = {}
+        super().__init__(Path(os.path.basename(str(self.archive_name))))
+
+    def build(self, previous=None):
+        """Index the archive members; previous is accepted for API compatibility and ignored"""
+        self.entries.clear()
+        self.children.clear()
+        self.child_dirs.clear()
+        self.links.clear()
+        self.by_extension.clear()
+        self.members.clear()
+        self._digests.clear()
+
+        try:
+            check_archive(self.zip_file)
+        except UnsafeArchiveError:
+            self.close()
+            raise
+        infos = [info for info in self.zip_file.infolist() if not self._is_metadata(info.filename)]
+        self.prefix = self._detect_root([info.filename for info in infos])
+        if self.prefix:
+            self.project_path = Path(self.project_path) / self.prefix.rstrip("/")
+
+        self.entries[""] = IndexEntry(True, 0, 0)
+        self.children[""] = []
+        self.child_dirs[""] = []
+        for info in infos:
+            name = info.filename.replace("\\", "/")
+            if not name.startswith(self.prefix):
+                continue
+            rel = name[len(self.prefix):].strip("/")
+            parts = rel.split("/")
+            # Skip the root itself and unsafe names (absolute paths, '..' components)
+            if not rel or name.startswith("/") or any(part in ("", ".", "..") for part in parts):
+                continue
+
+            mtime_ns = self._mtime_ns(info)
+            parent = posixpath.dirname(rel)
+            self._ensure_dir(parent, mtime_ns)
+            if info.is_dir():
+                self._ensure_dir(rel, mtime_ns)
+            elif rel not in self.entries:
+                self.members[rel] = info
+                self.children[parent].append(parts[-1])
+                self.entries[rel] = IndexEntry(False, info.file_size, mtime_ns)
+                ext = os.path.splitext(parts[-1])[1]
+                self.by_extension.setdefault(ext, []).append(rel)
+
+        return self
+
+    def _ensure_dir(self, rel_dir, mtime_ns):
+        if rel_dir in self.children:
+            return
+        parent = posixpath.dirname(rel_dir)
+        self._ensure_dir(parent, mtime_ns)
+        name = posixpath.basename(rel_dir)
+        self.children[parent].append(name)
+        self.child_dirs[parent].append(name)
+        self.entries[rel_dir] = IndexEntry(True, 0, mtime_ns)
+        self.children[rel_dir] = []
+        self.child_dirs[rel_dir] = []
+
+    @staticmethod
+    def _is_metadata(name):
+        return name.startswith("__MACOSX/") or posixpath.basename(name.rstrip("/")) == ".DS_Store"
+
+    @staticmethod
+    def _detect_root(names):
+        top_level = {name.replace("\\", "/").lstrip("/").split("/")[0] for name in names}
+        if len(top_level) != 1:
+            return ""
+        top = top_level.pop()
+        # A single top-level folder (and not a single top-level file) is the project root
+        if top and any(name.replace("\\", "/").lstrip("/").startswith(f"{top}/") for name in names):
+            return f"{top}/"
+        return ""
+
+    @staticmethod
+    def _mtime_ns(info):
+        try:
+            return int(time.mktime(info.date_time + (0, 0, -1))) * 1_000_000_000
+        except (OverflowError, ValueError):
+            return 0
+
+    def open(self, rel_path, mode="r", **kwargs):
+        """Stream a single archive member without extracting it"""
+        self.open_calls += 1
+        stream = self.zip_file.open(self.members[rel_path])
+        if "b" in mode:
+            return stream
+        return io.TextIOWrapper(stream, encoding=kwargs.get("encoding", "utf-8"), errors=kwargs.get("errors", "replace"))
+
+    def close(self):
+        self.zip_file.close()
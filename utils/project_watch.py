@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from utils.project_index import ProjectIndex
+from utils.rules import default_rules
+from utils.validation_cache import ValidationCache
+from utils.validator_class import OpenScienceValidator
+
+
+# Events arriving this close together are handled as one change (an editor saving
+# through a temporary file, a folder copied in)
+DEBOUNCE_SECONDS = float(os.environ.get("FAIRYTALE_WATCH_DEBOUNCE_MS", "50")) / 1000
+# Projects the app watches at once; beyond this the least recently requested watch is stopped
+MAX_SHARED_WATCHES = int(os.environ.get("FAIRYTALE_WATCH_MAX", "8"))
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """Turn watchdog events into project-relative paths for ProjectWatch"""
+
+    def __init__(self, watch):
+        self.watch = watch
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        self.watch.changed([path for path in paths if path])
+
+
+class ProjectWatch:
+    """Keep a project validated while it is being edited
+
+    The project is indexed once; afterwards filesystem events update the
+    index in place and the validation runs again through an in-memory
+    ValidationCache, so only the rules whose inputs changed do any work
+    (the other results are replayed). on_update(watch) is called from the
+    watcher thread after every validation; watch.validator holds the latest
+    results.
+    """
+
+    def __init__(self, project_path, enabled_rules=(), disabled_rules=(), on_update=None,
+                 debounce=DEBOUNCE_SECONDS):
+        self.project_path = Path(project_path).resolve()
+        self.enabled_rules = enabled_rules
+        self.disabled_rules = disabled_rules
+        self.on_update = on_update
+        self.debounce = debounce
+        self.index = None
+        self.cache = ValidationCache(self.project_path, persistent=False)
+        self.registry = default_rules()
+        self.validator = None
+        self.revision = 0
+        self.seconds = 0.0
+        self.last_changes = []
+        self.error = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    def start(self):
+        """Start watching; the first validation and all later ones run in a background thread"""
+        if not self.project_path.is_dir():
+            raise FileNotFoundError(f"Project directory not found: {self.project_path}")
+        # Subscribe before the first scan so no edit made meanwhile is missed
+        self._observer = Observer()
+        self._observer.schedule(_ChangeCollector(self), str(self.project_path), recursive=True)
+        self._observer.start()
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, name="fairytale-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+
+    def changed(self, paths):
+        """Queue absolute paths reported by the filesystem for the next validation"""
+        with self._lock:
+            for path in paths:
+                try:
+                    rel = Path(os.fsdecode(path)).relative_to(self.project_path).as_posix()
+                except ValueError:
+                    continue
+                self._pending.add("" if rel == "." else rel)
+        self._wake.set()
+
+    def validate(self, changes=()):
+        """Update the index for the changed paths and validate again"""
+        start = time.perf_counter()
+        if self.index is None:
+            self.index = ProjectIndex(self.project_path).build()
+            self.index.watched = True
+        elif changes:
+            self.index.refresh(changes)
+        validator = OpenScienceValidator(
+            self.project_path, verbose=False, index=self.index, cache=self.cache, rules=self.registry,
+            enabled_rules=self.enabled_rules, disabled_rules=self.disabled_rules
+        )
+        validator.validate_structure()
+        self.validator = validator
+        self.seconds = time.perf_counter() - start
+        self.last_changes = sorted(changes)
+        self.error = None
+        self.revision += 1
+        if self.on_update is not None:
+            self.on_update(self)
+        return validator
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            if self._stopped.is_set():
+                return
+            # Let a burst of events settle before validating
+            time.sleep(self.debounce)
+            with self._lock:
+                self._wake.clear()
+                changes, self._pending = self._pending, set()
+            if not changes and self.validator is not None:
+                continue
+            try:
+                self.validate(changes)
+            except Exception as e:
+                # A file vanishing mid-check must not end the watch; the next event retries these paths
+                self.error = str(e) or type(e).__name__
+                with self._lock:
+                    self._pending |= changes
+
+
+_shared_watches = OrderedDict()
+_shared_lock = threading.Lock()
+
+
+def shared_watch(project_path):
+    """Return the watch of a project shared by every session of the app process, starting it if needed"""
+    key = str(Path(project_path).resolve())
+    with _shared_lock:
+        watch = _shared_watches.get(key)
+        if watch is None or not watch.running:
+            watch = ProjectWatch(key).start()
+            _shared_watches[key] = watch
+        _shared_watches.move_to_end(key)
+        stale = []
+        while len(_shared_watches) > MAX_SHARED_WATCHES:
+            stale.append(_shared_watches.popitem(last=False)[1])
+    for old in stale:
+        old.stop()
+    return watch
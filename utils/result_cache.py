@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+# Validations kept in memory, shared by every session of the app process
+MAX_ENTRIES = int(os.environ.get("FAIRYTALE_RESULT_CACHE_ENTRIES", "32"))
+# Seconds after which a cached validation is computed again, even if unchanged
+TTL_SECONDS = float(os.environ.get("FAIRYTALE_RESULT_CACHE_TTL", "900"))
+
+ZIP_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a time-to-live, shared across Streamlit sessions
+
+    get_or_compute() runs the computation once per key even when several
+    sessions ask for it at the same time; the others wait for its result.
+    Exceptions are not cached.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return (value, True) from the cache, or (compute(), False) after storing it"""
+        if key is None:
+            return compute(), False
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value, True
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another session may have finished the same computation meanwhile
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value, True
+            try:
+                value = compute()
+                self.put(key, value)
+                self.misses += 1
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def project_key(index):
+    """Key of an on-disk project: its resolved path plus the size and mtime of every entry"""
+    digest = hashlib.sha1(str(Path(index.project_path).resolve()).encode("utf-8", "surrogateescape"))
+    for rel in sorted(index.entries):
+        entry = index.entries[rel]
+        digest.update(f"\0{rel}\0{entry.is_dir:d}\0{entry.size}\0{entry.mtime_ns}".encode("utf-8", "surrogateescape"))
+    return f"dir:{digest.hexdigest()}"
+
+
+def zip_key(stream):
+    """Key of an uploaded archive: the SHA-256 of its bytes (the stream is rewound afterwards)"""
+    digest = hashlib.sha256()
+    buffer = memoryview(bytearray(ZIP_HASH_BLOCK_SIZE))
+    stream.seek(0)
+    while True:
+        n = stream.readinto(buffer)
+        if not n:
+            break
+        digest.update(buffer[:n])
+    stream.seek(0)
+    return f"zip:{digest.hexdigest()}"
+
+
+# Validators of recently validated projects and archives, shared by all sessions
+validation_results = ResultCache()
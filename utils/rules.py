@@ -0,0 +1,550 @@
+import os
+
+from utils.checksum_manifest import MANIFEST_PATH, RAW_DATA_DIR, verify_manifest
+from utils.duplicates import format_size
+from utils.data_sniffer import TABULAR_EXTENSIONS, TableProfile, looks_tabular, sniff_files
+
+
+class Rule:
+    """A validation check that the engine runs only on the paths it declares.
+
+    Subclasses set name (used to enable/disable the rule and in timing
+    stats) and at most one of:
+
+    - paths: project-relative files or directories; check() is called with
+      each one that exists (directories only when they are not empty)
+    - extensions: check_many() is called once with every indexed file that
+      has one of them (lower-case, with the dot); by default it calls check()
+      on each, rules that can batch their work override it (and call
+      validator.advance() per file so progress keeps moving)
+    - neither: a project rule, called once with rel_path None; watch lists
+      the directories whose listings decide whether cached results are reused
+
+    check() reports findings through validator.report().
+    """
+
+    name = None
+    paths = ()
+    extensions = ()
+    watch = None
+    # Rules disabled by default have to be enabled by name
+    default_enabled = True
+
+    def check(self, validator, rel_path):
+        raise NotImplementedError
+
+    def check_many(self, validator, rel_paths):
+        for rel_path in rel_paths:
+            self.check(validator, rel_path)
+            validator.advance()
+
+    def fingerprint(self, index, rel_path):
+        """Digest of the rule's inputs for the validation cache, or None if it must always run"""
+        if rel_path is None:
+            if self.watch is None:
+                return None
+            return ":".join(index.fingerprint(d, recursive=False) for d in self.watch)
+        if index.is_dir(rel_path):
+            return index.fingerprint(rel_path)
+        # File contents can change without their directory changing; only an index
+        # kept current by filesystem events has stats that can stand in for them
+        if index.watched and index.is_file(rel_path):
+            return "%d:%d" % index.stat(rel_path)
+        return None
+
+
+class RuleRegistry:
+    """Ordered collection of rules; the order is the order their findings are reported in"""
+
+    def __init__(self, rules=()):
+        self.rules = []
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule):
+        if not rule.name:
+            raise ValueError(f"{type(rule).__name__} has no name")
+        if rule.paths and rule.extensions:
+            raise ValueError(f"Rule '{rule.name}' declares both paths and extensions")
+        if any(existing.name == rule.name for existing in self.rules):
+            raise ValueError(f"A rule named '{rule.name}' is already registered")
+        self.rules.append(rule)
+        return rule
+
+    def names(self):
+        return [rule.name for rule in self.rules]
+
+    def select(self, enabled=(), disabled=()):
+        """Return a RuleSet of the default rules plus enabled, minus disabled (by name)"""
+        unknown = (set(enabled) | set(disabled)) - set(self.names())
+        if unknown:
+            raise ValueError(f"Unknown rule(s): {', '.join(sorted(unknown))}")
+        return RuleSet([
+            rule for rule in self.rules
+            if (rule.default_enabled or rule.name in enabled) and rule.name not in disabled
+        ])
+
+
+class RuleSet:
+    """Dispatch tables for the active rules: by path, by extension and project-wide"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.by_path = {}
+        self.extension_rules = []
+        self.project_rules = []
+        for rule in rules:
+            for rel_path in rule.paths:
+                self.by_path.setdefault(rel_path, []).append(rule)
+            if rule.extensions:
+                self.extension_rules.append(rule)
+            elif not rule.paths:
+                self.project_rules.append(rule)
+
+    def for_path(self, rel_path):
+        return self.by_path.get(rel_path, [])
+
+
+class ReadmeSectionsRule(Rule):
+    """Check README.md for key sections"""
+
+    name = "readme.sections"
+    paths = ("README.md",)
+    sections = ["description", "installation", "usage", "citation", "license"]
+
+    def check(self, validator, rel_path):
+        content = validator.index.read_text(rel_path).lower()
+        missing_sections = [section for section in self.sections if section not in content]
+
+        if missing_sections:
+            validator.report(
+                "warning", "readme.sections",
+                f"README.md missing sections: {', '.join(missing_sections)}",
+                rel_path
+            )
+
+
+class LicenseRule(Rule):
+    """Check if license is CC-BY-4.0 or similar"""
+
+    name = "license.cc_by"
+    paths = ("LICENSE",)
+
+    def check(self, validator, rel_path):
+        content = validator.index.read_text(rel_path).lower()
+
+        if "cc" in content or "creative commons" in content:
+            if "by" in content and "4.0" in content:
+                validator.report("pass", "license.cc_by", "License appears to be CC-BY-4.0", rel_path)
+            else:
+                validator.report("warning", "license.cc_by", "License is Creative Commons but not CC-BY-4.0", rel_path)
+        else:
+            validator.report(
+                "warning", "license.cc_by",
+                "Consider using CC-BY-4.0 for open science compliance",
+                rel_path
+            )
+
+
+class CitationRule(Rule):
+    """Check CITATION.cff format"""
+
+    name = "citation.fields"
+    paths = ("CITATION.cff",)
+    required_fields = ["cff-version", "authors", "title", "message"]
+
+    def check(self, validator, rel_path):
+        content = validator.index.read_text(rel_path)
+        missing_fields = [field for field in self.required_fields if field not in content]
+
+        if missing_fields:
+            validator.report(
+                "warning", "citation.fields",
+                f"CITATION.cff missing fields: {', '.join(missing_fields)}",
+                rel_path
+            )
+
+
+class ParticipantsRule(Rule):
+    """Check participant info for data files"""
+
+    name = "participants.data_files"
+    paths = ("01_docs/01_participants",)
+
+    def check(self, validator, rel_path):
+        data_files = validator.index.find(rel_path, [".csv", ".tsv"])
+        if not data_files:
+            validator.report(
+                "warning", "participants.data_files",
+                f"No CSV or TSV files found in {rel_path}. Expected participant data files.",
+                rel_path
+            )
+        else:
+            validator.report(
+                "pass", "participants.data_files",
+                f"Found {len(data_files)} data file(s) in {rel_path}",
+                rel_path
+            )
+
+
+class DataStructureRule(Rule):
+    """Check data directory structure and naming conventions"""
+
+    name = "data.structure"
+    paths = ("02_data", "02_data/02_preproc", RAW_DATA_DIR)
+
+    # Expected naming patterns for data subdirectories (BIDS-like)
+    expected_patterns = {
+        "sub-": "subject/participant folders (e.g., sub-01, sub-002)",
+        "ses-": "session folders (e.g., ses-01, ses-pre, ses-post)",
+        "task-": "task-based data (e.g., task-rest, task-nback)",
+        "run-": "run numbers (e.g., run-01, run-02)"
+    }
+    data_extensions = ['.csv', '.tsv', '.json', '.npy', '.mat', '.h5', '.hdf5', '.parquet']
+
+    def check(self, validator, rel_path):
+        index = validator.index
+
+        # First, check if there are any folders in the data directory
+        subdirs = index.subdirs(rel_path)
+
+        if not subdirs:
+            validator.report(
+                "warning", "data.subdirs",
+                f"No subdirectories found in {rel_path}. Expected 'raw' and 'preproc' folders.",
+                rel_path
+            )
+            return
+
+        raw_dirs = [index.join(rel_path, subdir) for subdir in subdirs if "raw" in subdir.lower()]
+        preproc_dirs = [index.join(rel_path, subdir) for subdir in subdirs if "preproc" in subdir.lower()]
+
+        # Warn if missing expected directories
+        if not raw_dirs:
+            validator.report(
+                "warning", "data.raw_dir",
+                f"No 'raw' data directory found in {rel_path}. Consider adding a folder containing 'raw' in its name.",
+                rel_path
+            )
+
+        if not preproc_dirs:
+            validator.report(
+                "warning", "data.preproc_dir",
+                f"No 'preproc' data directory found in {rel_path}. Consider adding a folder containing 'preproc' in its name.",
+                rel_path
+            )
+
+        # Now check the second level - subdirectories within raw and preproc
+        for raw_dir in raw_dirs:
+            self._check_data_subdirectory(validator, raw_dir, "raw")
+
+        for preproc_dir in preproc_dirs:
+            self._check_data_subdirectory(validator, preproc_dir, "preprocessed")
+
+    def _check_data_subdirectory(self, validator, data_dir, data_type):
+        """Check subdirectories within raw/preproc folders"""
+        index = validator.index
+        data_dir_name = os.path.basename(data_dir)
+        items = index.list_dir(data_dir)
+        subdirs = index.subdirs(data_dir)
+
+        # Check if directory is empty
+        if not items:
+            validator.report(
+                "warning", "data.empty",
+                f"{data_type.capitalize()} data directory '{data_dir_name}' is empty.",
+                data_dir
+            )
+            return
+
+        # If there are subdirectories, check their naming convention
+        if subdirs:
+            follows_convention = any(
+                subdir.startswith(pattern) for subdir in subdirs for pattern in self.expected_patterns
+            )
+
+            if not follows_convention:
+                validator.report(
+                    "warning",
+                    "data.naming",
+                    f"Subdirectories in {data_dir_name} don't follow recommended naming convention. "
+                    f"Consider using: {', '.join(self.expected_patterns.keys())}",
+                    data_dir
+                )
+
+            # Check if subdirectories have content
+            empty_subdirs = [subdir for subdir in subdirs if not index.list_dir(index.join(data_dir, subdir))]
+
+            if empty_subdirs:
+                validator.report(
+                    "warning", "data.empty_subdirs",
+                    f"Empty subdirectories in {data_dir_name}: {', '.join(empty_subdirs)}",
+                    data_dir
+                )
+
+        # Check both in current directory and subdirectories
+        data_files = index.find(data_dir, self.data_extensions, recursive=True)
+
+        if not data_files:
+            validator.report(
+                "warning",
+                "data.files",
+                f"No data files found in {data_dir_name} or its subdirectories. "
+                f"Expected files with extensions: {', '.join(self.data_extensions)}",
+                data_dir
+            )
+        else:
+            validator.report("pass", "data.files", f"Found {len(data_files)} data file(s) in {data_dir_name}", data_dir)
+
+        # Check for documentation (only for raw data)
+        if data_type == "raw":
+            has_readme = "README.md" in items or "README.txt" in items
+            has_dict = any(name.lower() in ['data_dictionary.csv', 'data_dict.csv', 'codebook.csv'] for name in items)
+
+            if not has_readme:
+                validator.report(
+                    "warning", "data.readme",
+                    f"No README found in {data_dir_name}. Consider adding data documentation.",
+                    data_dir
+                )
+
+            if not has_dict:
+                validator.report(
+                    "warning", "data.dictionary",
+                    f"No data dictionary found in {data_dir_name}. Consider adding a codebook or data_dictionary.csv",
+                    data_dir
+                )
+
+
+class ExpectedFilesRule(Rule):
+    """Warn when a directory has no files with the expected extensions"""
+
+    def __init__(self, name, rel_path, extensions, message):
+        self.name = name
+        self.paths = (rel_path,)
+        self.expected = extensions
+        self.message = message
+
+    def check(self, validator, rel_path):
+        if not validator.index.find(rel_path, self.expected):
+            validator.report("warning", self.name, self.message.format(path=rel_path), rel_path)
+
+
+class TabularDataRule(Rule):
+    """Sniff the start of every CSV/TSV/TXT file for delimiter, encoding, header and ragged rows"""
+
+    name = "data.tabular"
+    extensions = TABULAR_EXTENSIONS
+
+    def check(self, validator, rel_path):
+        self.check_many(validator, [rel_path])
+
+    def check_many(self, validator, rel_paths):
+        well_formed = 0
+        profiles = validator.file_results(
+            self, rel_paths, lambda paths: (profile._asdict() for profile in sniff_files(validator.index, paths))
+        )
+        for _, record in profiles:
+            profile = TableProfile(**record)
+            validator.advance()
+            # .txt is also used for notes, logs and requirements; only judge it if it is delimited
+            if profile.path.lower().endswith(".txt") and not looks_tabular(profile):
+                continue
+            if profile.issues:
+                validator.report(
+                    "warning", "data.tabular",
+                    f"Tabular file {profile.path}: {'; '.join(profile.issues)}",
+                    profile.path
+                )
+            else:
+                well_formed += 1
+
+        if well_formed:
+            validator.report("pass", "data.tabular", f"{well_formed} tabular file(s) are well-formed")
+
+
+class GitignoreRule(Rule):
+    """Check for .gitignore"""
+
+    name = "practice.gitignore"
+    watch = [""]
+
+    def check(self, validator, rel_path):
+        if validator.index.exists(".gitignore"):
+            validator.report("pass", "practice.gitignore", "Found .gitignore", ".gitignore")
+        else:
+            validator.report(
+                "warning", "practice.gitignore",
+                "Consider adding .gitignore for version control",
+                ".gitignore"
+            )
+
+
+class EnvironmentRule(Rule):
+    """Check for requirements.txt or environment.yml in the root or 03_scripts/"""
+
+    name = "practice.environment"
+    watch = ["", "03_scripts"]
+    env_files = ["requirements.txt", "environment.yml", "pyproject.toml"]
+
+    def check(self, validator, rel_path):
+        # Check in root
+        for env_file in self.env_files:
+            if validator.index.exists(env_file):
+                validator.report("pass", "practice.environment", f"Found {env_file}", env_file)
+                return
+
+        # Check in scripts directory
+        for env_file in self.env_files:
+            if validator.index.exists(f"03_scripts/{env_file}"):
+                validator.report(
+                    "pass", "practice.environment",
+                    f"Found {env_file} in 03_scripts/",
+                    f"03_scripts/{env_file}"
+                )
+                return
+
+        validator.report(
+            "warning", "practice.environment",
+            "No environment specification found (requirements.txt, environment.yml, etc.)"
+        )
+
+
+class DataDictionaryRule(Rule):
+    """Check for project-level data documentation"""
+
+    name = "practice.data_dictionary"
+    watch = ["02_data", "05_meta"]
+    data_docs = ["data_dictionary.csv", "codebook.csv", "variables.csv"]
+
+    def check(self, validator, rel_path):
+        for doc in self.data_docs:
+            if validator.index.exists(f"02_data/{doc}") or validator.index.exists(f"05_meta/{doc}"):
+                validator.report("pass", "practice.data_dictionary", f"Found data documentation: {doc}")
+                return
+
+        validator.report(
+            "warning", "practice.data_dictionary",
+            "No data dictionary or codebook found. Consider adding variable descriptions."
+        )
+
+
+class ManifestRule(Rule):
+    """Check files under 02_data against 05_meta/manifest-sha256.txt"""
+
+    name = "manifest"
+    paths = (MANIFEST_PATH,)
+
+    def fingerprint(self, index, rel_path):
+        # The result depends on every file under 02_data, not only on the manifest
+        return None
+
+    def check(self, validator, rel_path):
+        report = verify_manifest(validator.index, cache_dir=validator.cache_dir)
+
+        for modified in report["modified"]:
+            if modified.startswith(f"{RAW_DATA_DIR}/"):
+                validator.report(
+                    "fail", "manifest.modified",
+                    f"Raw data modified in place: {modified} (checksum mismatch)",
+                    modified
+                )
+            else:
+                validator.report(
+                    "warning", "manifest.modified",
+                    f"File changed since the checksum manifest was generated: {modified}",
+                    modified
+                )
+
+        for missing in report["missing"]:
+            if missing.startswith(f"{RAW_DATA_DIR}/"):
+                validator.report(
+                    "fail", "manifest.missing",
+                    f"Raw data file listed in the checksum manifest is missing: {missing}",
+                    missing
+                )
+            else:
+                validator.report(
+                    "warning", "manifest.missing",
+                    f"File listed in the checksum manifest is missing: {missing}",
+                    missing
+                )
+
+        if report["unlisted"]:
+            validator.report(
+                "warning",
+                "manifest.unlisted",
+                f"{len(report['unlisted'])} file(s) in 02_data are not listed in {MANIFEST_PATH}. "
+                f"Regenerate the manifest after adding data.",
+                "02_data"
+            )
+
+        if report["verified"]:
+            validator.report(
+                "pass", "manifest.verified",
+                f"Checksum manifest verified: {report['verified']} file(s) unchanged",
+                MANIFEST_PATH
+            )
+
+
+class DuplicateFilesRule(Rule):
+    """Report files stored more than once (e.g. the same data in 01_raw, 02_preproc and 04_results)
+
+    Disabled by default: files of equal size have to be read to be compared.
+    """
+
+    name = "files.duplicates"
+    default_enabled = False
+
+    def check(self, validator, rel_path):
+        report = validator.find_duplicates()
+        for group in report["groups"]:
+            copies = ", ".join(group.paths[1:])
+            validator.report(
+                "warning", "files.duplicates",
+                f"{group.paths[0]} is also stored as {copies} "
+                f"({format_size(group.size * (len(group.paths) - 1))} reclaimable)",
+                group.paths[0]
+            )
+
+        if report["groups"]:
+            validator.report(
+                "warning", "files.duplicates",
+                f"{report['duplicate_files']} duplicate file(s) take {format_size(report['reclaimable_bytes'])}. "
+                f"Keep one copy, or export the ZIP with duplicates stored once."
+            )
+        else:
+            validator.report("pass", "files.duplicates", f"No duplicate files among {report['files']} files")
+
+
+def default_rules():
+    """Return a new registry with the built-in rules; register lab-specific rules on it"""
+    return RuleRegistry([
+        ReadmeSectionsRule(),
+        LicenseRule(),
+        CitationRule(),
+        ParticipantsRule(),
+        DataStructureRule(),
+        ExpectedFilesRule(
+            "scripts.prep", "03_scripts/02_prep", [".py", ".R", ".ipynb", ".m"],
+            "No script files found in {path}. Expected .py, .R, .ipynb, or .m files."
+        ),
+        ExpectedFilesRule(
+            "scripts.analysis", "03_scripts/03_analysis", [".py", ".R", ".ipynb", ".m"],
+            "No analysis scripts found in {path}. Expected analysis code files."
+        ),
+        ExpectedFilesRule(
+            "results.figures", "04_results/02_figures", [".png", ".jpg", ".pdf", ".svg"],
+            "No figure files found in {path}. Expected .png, .jpg, .pdf, or .svg files."
+        ),
+        ExpectedFilesRule(
+            "results.tables", "04_results/03_tables", [".csv", ".xlsx", ".txt"],
+            "No table files found in {path}. Expected .csv, .xlsx, or .txt files."
+        ),
+        TabularDataRule(),
+        GitignoreRule(),
+        EnvironmentRule(),
+        DataDictionaryRule(),
+        ManifestRule(),
+        DuplicateFilesRule(),
+    ])
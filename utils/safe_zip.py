@@ -0,0 +1,155 @@
+import os
+import posixpath
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+
+# Limits checked against the central directory before any member is read
+MAX_UNCOMPRESSED_BYTES = int(os.environ.get("FAIRYTALE_ZIP_MAX_MB", "4096")) * 1024 * 1024
+MAX_MEMBERS = int(os.environ.get("FAIRYTALE_ZIP_MAX_MEMBERS", "50000"))
+MAX_RATIO = float(os.environ.get("FAIRYTALE_ZIP_MAX_RATIO", "200"))
+# Small members (a file of zeros, an empty CSV template) may compress far beyond the ratio
+RATIO_MIN_SIZE = 1024 * 1024
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class UnsafeArchiveError(ValueError):
+    """Raised for archives that are too large, too compressed or have members outside the root"""
+
+
+def is_safe_member_name(name):
+    """True if an archive member name stays inside the extraction directory"""
+    name = name.replace("\\", "/")
+    parts = name.rstrip("/").split("/")
+    return bool(name) and not name.startswith("/") and ":" not in parts[0] and ".." not in parts
+
+
+def check_archive(zip_file, max_bytes=MAX_UNCOMPRESSED_BYTES, max_members=MAX_MEMBERS, max_ratio=MAX_RATIO):
+    """Check a ZipFile's central directory before reading any member
+
+    Raises UnsafeArchiveError for too many members, a total uncompressed size
+    above max_bytes, members compressed more than max_ratio times, and
+    absolute or '..' member names. Returns the total uncompressed size.
+    """
+    infos = zip_file.infolist()
+    if len(infos) > max_members:
+        raise UnsafeArchiveError(f"The archive has {len(infos)} members, more than the limit of {max_members}")
+
+    total = 0
+    for info in infos:
+        if not is_safe_member_name(info.filename):
+            raise UnsafeArchiveError(f"The archive member '{info.filename}' points outside the project folder")
+        total += info.file_size
+        if info.file_size >= RATIO_MIN_SIZE and info.file_size > max_ratio * max(info.compress_size, 1):
+            raise UnsafeArchiveError(
+                f"The archive member '{info.filename}' expands {info.file_size / max(info.compress_size, 1):.0f} "
+                f"times, more than the limit of {max_ratio:.0f} (zip bomb?)"
+            )
+    if total > max_bytes:
+        raise UnsafeArchiveError(
+            f"The archive expands to {total / 1e6:.0f} MB, more than the limit of {max_bytes / 1e6:.0f} MB"
+        )
+    return total
+
+
+def _copy_member(zip_file, info, target, budget):
+    """Stream one member to disk; returns the bytes left in budget"""
+    written = 0
+    with zip_file.open(info) as source, open(target, "wb") as f:
+        while True:
+            block = source.read(COPY_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            # The central directory was checked, but local headers can disagree with it
+            if written > info.file_size or written > budget:
+                raise UnsafeArchiveError(f"The archive member '{info.filename}' is larger than declared")
+            f.write(block)
+    return budget - written
+
+
+def _extract_members(zip_file, target_dir, max_bytes):
+    """Extract every member after checking the archive and free space; returns the bytes written"""
+    total = check_archive(zip_file, max_bytes=max_bytes)
+    free = shutil.disk_usage(target_dir).free
+    if total > free:
+        raise UnsafeArchiveError(
+            f"Not enough disk space to extract the archive ({total / 1e6:.0f} MB needed, {free / 1e6:.0f} MB free)"
+        )
+
+    budget = total
+    root = Path(target_dir)
+    for info in zip_file.infolist():
+        name = info.filename.replace("\\", "/")
+        if name.startswith("__MACOSX/") or posixpath.basename(name.rstrip("/")) == ".DS_Store":
+            continue
+        target = root / name
+        if info.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        budget = _copy_member(zip_file, info, target, budget)
+    return total - budget
+
+
+def _check_duplicates(copies, extracted, max_bytes, max_members, target_dir):
+    """Refuse a DUPLICATES.csv whose copies would take the project beyond the extraction limits"""
+    if len(copies) > max_members:
+        raise UnsafeArchiveError(
+            f"The archive lists {len(copies)} duplicate copies to restore, more than the limit of {max_members}"
+        )
+    restored = sum(source.stat().st_size for source in copies.values())
+    if extracted + restored > max_bytes:
+        raise UnsafeArchiveError(
+            f"Restoring the duplicate copies listed in the archive would write {restored / 1e6:.0f} MB more, "
+            f"beyond the limit of {max_bytes / 1e6:.0f} MB"
+        )
+    free = shutil.disk_usage(target_dir).free
+    if restored > free:
+        raise UnsafeArchiveError(
+            f"Not enough disk space to restore the duplicate copies ({restored / 1e6:.0f} MB needed, "
+            f"{free / 1e6:.0f} MB free)"
+        )
+
+
+def _project_root(extract_dir):
+    """The single top-level folder of an extracted archive, or the extraction directory itself"""
+    children = [child for child in extract_dir.iterdir() if child.name != "__MACOSX"]
+    if len(children) == 1 and children[0].is_dir():
+        return children[0]
+    return extract_dir
+
+
+def extract_project(zip_source, destination, max_bytes=MAX_UNCOMPRESSED_BYTES):
+    """Extract a project archive (e.g. a FAIRyTale export) to a new folder
+
+    Members are extracted next to destination and only moved into place once
+    everything was written, so a refused or interrupted extraction leaves
+    nothing behind. Copies left out of a deduplicated export are restored;
+    they count against max_bytes and MAX_MEMBERS like the members themselves.
+    Returns a summary dict.
+    """
+    # Imported here: duplicates -> checksum_manifest -> project_index imports this module
+    from utils.duplicates import read_duplicates, restore_duplicates
+
+    destination = Path(destination)
+    if destination.exists():
+        raise FileExistsError(f"{destination} already exists")
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    extract_dir = Path(tempfile.mkdtemp(prefix=f".{destination.name}.", dir=destination.parent))
+    try:
+        with zipfile.ZipFile(zip_source) as zip_file:
+            extracted = _extract_members(zip_file, extract_dir, max_bytes)
+            members = len(zip_file.infolist())
+        project_root = _project_root(extract_dir)
+        # DUPLICATES.csv comes from the archive too: a few rows can name one large member many times
+        copies = read_duplicates(project_root)
+        _check_duplicates(copies, extracted, max_bytes, MAX_MEMBERS - members, extract_dir)
+        restored = restore_duplicates(project_root, copies)
+        os.rename(project_root, destination)
+    finally:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+    return {"project": str(destination), "members": members, "restored_duplicates": restored}
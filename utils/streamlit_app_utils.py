@@ -5,6 +5,8 @@ import shutil
 import streamlit as st
 from pathlib import Path
 import zipfile
+from utils.file_transfer import stream_to_file
+from utils.project_export import export_project_zip, DEFAULT_COMPRESSLEVEL
 
 # Helper function to create directory structure
 def create_directory_structure(base_path):
@@ -61,47 +63,88 @@ def upload_files(category_name, allowed_types=None):
     return uploaded_files
 
 # Function to save files into a specific folder
-def save_files(uploaded_files, target_folder):
-    """Save uploaded files into the specified folder."""
+def save_files(uploaded_files, target_folder, compute_hash=True):
+    """Save uploaded files into the specified folder, copying them in bounded chunks.
+
+    The path, size and SHA-256 of every saved file are recorded in
+    st.session_state.saved_files, so reruns skip files that are already on disk.
+    """
+    saved_files = st.session_state.setdefault("saved_files", {})
     for uploaded_file in uploaded_files:
         # Create the folder path
         target_path = target_folder / uploaded_file.name
+        record = saved_files.get(str(target_path))
+        if (record and record["file_id"] == uploaded_file.file_id
+                and target_path.exists() and target_path.stat().st_size == record["size"]):
+            continue
+
         # Save the file
-        with open(target_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        uploaded_file.seek(0)
+        size, digest = stream_to_file(uploaded_file, target_path, algorithm="sha256" if compute_hash else None)
+        saved_files[str(target_path)] = {
+            "file_id": uploaded_file.file_id,
+            "size": size,
+            "mtime_ns": target_path.stat().st_mtime_ns,
+            "sha256": digest,
+        }
         st.write(f"Saved file: {uploaded_file.name} to {target_folder}")
 
+# Path to the README.md template included at the root of every exported ZIP
+README_TEMPLATE = Path("./Example_Repos/Good_Repo/README.md")
+
+
+def project_zip_path(base_path, project_name):
+    """Exported ZIPs live next to the project folder, never inside the folder being zipped."""
+    return Path(base_path).parent / "exports" / f"{Path(project_name).name}.zip"
+
+
 # Function to organize and compress the files into a zip folder
-def create_zip_folder(base_path, project_name):
-    """Create a zip file of the project folder and include a specific README.md"""
-    zip_filename = f"{project_name}.zip"
-    zip_filepath = base_path / zip_filename
-
-    # Path to the README.md you want to include
-    readme_path = Path("./Example_Repos/Good_Repo/README.md")
-
-    # Create a Zip file with the entire project folder (excluding the zip file itself)
-    with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Add the README.md to the ZIP if it exists
-        if readme_path.exists():
-            # Adding README.md to the ZIP with a relative path
-            # Using a more explicit method to ensure it gets added correctly
-            zipf.write(readme_path, "README.md")  # Specify the name inside the zip
-            st.write(f"Added {readme_path} to the ZIP file.")
-        else:
-            st.error(f"README.md file not found at {readme_path}")
-        
-        # Add all files and folders from the project directory to the ZIP
-        for root, dirs, files in os.walk(base_path):
-            for file in files:
-                # Exclude the zip file from being added to the zip
-                if file != zip_filename:  # Ensure the zip file isn't added
-                    zipf.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), base_path))
-            # Also add directories if empty
-            for dir in dirs:
-                dir_path = os.path.join(root, dir)
-                if dir != zip_filename:  # Ensure the zip file's directory isn't included
-                    zipf.write(dir_path, os.path.relpath(dir_path, base_path))
-
-    st.write(f"Created zip file: {zip_filepath}")
-    return zip_filepath
\ No newline at end of file
+def create_zip_folder(base_path, project_name, compresslevel=DEFAULT_COMPRESSLEVEL, dedupe=False):
+    """Create a zip file of the project folder and include a specific README.md
+
+    The archive is reused while the project is unchanged and new files are
+    appended to it, so it is only rebuilt after files change or are removed.
+    Already-compressed formats are stored; other files are deflated.
+    With dedupe, identical files are stored once and listed in DUPLICATES.csv.
+    """
+    zip_filepath = project_zip_path(base_path, project_name)
+
+    if not README_TEMPLATE.exists():
+        st.error(f"README.md file not found at {README_TEMPLATE}")
+
+    action = export_project_zip(
+        base_path, zip_filepath, extra_files={"README.md": README_TEMPLATE}, compresslevel=compresslevel,
+        dedupe=dedupe
+    )
+    if action == "cached":
+        st.write(f"Zip file is up to date: {zip_filepath}")
+    elif action == "appended":
+        st.write(f"Added new files to zip file: {zip_filepath}")
+    else:
+        st.write(f"Created zip file: {zip_filepath}")
+    return zip_filepath
+
+
+# Function to add Parquet copies of the raw tables to 02_data/02_preproc
+def convert_tables_to_parquet(base_path):
+    """Convert the tabular files in 02_data/01_raw to Parquet, keeping the originals"""
+    # pyarrow and pandas are only imported when a project asks for Parquet copies
+    from utils.parquet_conversion import convert_raw_to_parquet
+
+    try:
+        summary = convert_raw_to_parquet(base_path)
+    except FileNotFoundError as e:
+        st.warning(str(e))
+        return None
+    except Exception as e:
+        # Unreadable files are reported per file; anything else must not take the page down
+        st.error(f"Parquet conversion failed: {e or type(e).__name__}")
+        return None
+
+    for record in summary["converted"]:
+        st.write(f"Converted {record['source']} to {record['target']} ({record['rows']} rows)")
+    for source, error in summary["failed"].items():
+        st.error(f"Could not convert {source}: {error}")
+    if not summary["converted"] and not summary["failed"]:
+        st.write("Parquet copies are up to date")
+    return summary
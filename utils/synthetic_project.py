@@ -0,0 +1,122 @@
+import random
+from pathlib import Path
+
+
+# Shape of the project written by generate_project(); override any key with keyword arguments
+DEFAULT_SHAPE = {
+    "subjects": 10,
+    "sessions": 2,
+    "runs": 2,
+    # Data files written in every run directory of 01_raw (and mirrored in 02_preproc)
+    "files_per_run": 5,
+    # Extra directory levels between each run directory and its files
+    "depth": 0,
+    "file_size": 16 * 1024,
+    # Fraction of data files written as incompressible binary .npy instead of .csv
+    "binary_ratio": 0.2,
+    "seed": 0,
+}
+
+README_TEXT = """# Synthetic FAIR project
+
+## Description
+Generated for benchmarking.
+
+## Installation
+pip install -r requirements.txt
+
+## Usage
+python 03_scripts/03_analysis/analysis.py
+
+## Citation
+See CITATION.cff
+
+## License
+CC-BY-4.0
+"""
+
+CITATION_TEXT = """cff-version: 1.2.0
+message: "If you use this dataset, please cite it as below."
+title: "Synthetic FAIR project"
+authors:
+  - family-names: Doe
+    given-names: Jane
+"""
+
+
+def _csv_bytes(rng, size):
+    """Return roughly size bytes of numeric CSV, which compresses like real tabular data"""
+    lines = ["trial,condition,rt,accuracy\n"]
+    total = len(lines[0])
+    trial = 0
+    while total < size:
+        line = f"{trial},{rng.choice('ABCD')},{rng.uniform(0.2, 1.5):.4f},{rng.randint(0, 1)}\n"
+        lines.append(line)
+        total += len(line)
+        trial += 1
+    return "".join(lines).encode("ascii")[:max(size, 1)]
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def generate_project(path, **shape):
+    """Write a synthetic FAIR project with BIDS-style sub-/ses-/run- data folders
+
+    Returns a dict with the shape used plus the number of files and bytes written.
+    Output is deterministic for a given shape (including seed).
+    """
+    unknown = set(shape) - set(DEFAULT_SHAPE)
+    if unknown:
+        raise ValueError(f"Unknown shape option(s): {', '.join(sorted(unknown))}")
+    shape = dict(DEFAULT_SHAPE, **shape)
+    rng = random.Random(shape["seed"])
+    root = Path(path)
+    files = 0
+    total_bytes = 0
+
+    def write(rel_path, data):
+        nonlocal files, total_bytes
+        _write(root / rel_path, data)
+        files += 1
+        total_bytes += len(data)
+
+    write("README.md", README_TEXT.encode("utf-8"))
+    write("LICENSE", b"Creative Commons Attribution 4.0 International (CC BY 4.0)\n")
+    write("CITATION.cff", CITATION_TEXT.encode("utf-8"))
+    write(".gitignore", b"__pycache__/\n")
+    write("requirements.txt", b"pandas\n")
+    for rel_dir in ["01_docs/02_ethics", "01_docs/03_dmp", "01_docs/04_prereg"]:
+        write(f"{rel_dir}/README.md", b"Placeholder\n")
+    write("01_docs/01_participants/participants.tsv",
+          "".join(f"sub-{s + 1:02d}\t{rng.randint(18, 60)}\n" for s in range(shape["subjects"])).encode("ascii"))
+    write("03_scripts/01_exp/task.py", b"print('experiment')\n")
+    write("03_scripts/02_prep/prep.py", b"print('prep')\n")
+    write("03_scripts/03_analysis/analysis.py", b"print('analysis')\n")
+    write("04_results/01_output/log.txt", b"done\n")
+    write("04_results/02_figures/figure.svg", b"<svg xmlns='http://www.w3.org/2000/svg'/>\n")
+    write("04_results/03_tables/table.csv", b"a,b\n1,2\n")
+    write("05_meta/codebook.csv", b"variable,description\nrt,reaction time\n")
+    write("02_data/01_raw/README.md", b"Raw data, never modified\n")
+    write("02_data/01_raw/data_dictionary.csv", b"variable,description\nrt,reaction time\n")
+
+    nested = "/".join(f"level-{level + 1}" for level in range(shape["depth"]))
+    for s in range(shape["subjects"]):
+        for e in range(shape["sessions"]):
+            for r in range(shape["runs"]):
+                run_dir = f"sub-{s + 1:02d}/ses-{e + 1:02d}/run-{r + 1:02d}"
+                if nested:
+                    run_dir = f"{run_dir}/{nested}"
+                for i in range(shape["files_per_run"]):
+                    if rng.random() < shape["binary_ratio"]:
+                        name, data = f"data-{i + 1:03d}.npy", rng.randbytes(shape["file_size"])
+                    else:
+                        name, data = f"data-{i + 1:03d}.csv", _csv_bytes(rng, shape["file_size"])
+                    write(f"02_data/01_raw/{run_dir}/{name}", data)
+                    write(f"02_data/02_preproc/{run_dir}/{name}", data)
+
+    shape.update(files=files, bytes=total_bytes)
+    return shape
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+
+CACHE_VERSION = 3
+
+# Directories modified this close to the moment the cache was written are listed
+# again on the next run: a change within the same mtime tick would go unnoticed.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def default_cache_dir():
+    """Return the per-user cache directory used when none is given"""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "fairytale"
+
+
+class ValidationCache:
+    """Persistent cache of directory listings and check results for one project.
+
+    Listings let ProjectIndex skip directories whose mtime is unchanged, and
+    check results are replayed when the fingerprint of their inputs matches.
+    With persistent=False nothing is read or written: watch mode keeps one
+    instance in memory and revalidates through it after every change.
+    """
+
+    def __init__(self, project_path, cache_dir=None, salt="", persistent=True):
+        self.project_path = Path(project_path).resolve()
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        key = hashlib.sha1(str(self.project_path).encode("utf-8", "surrogateescape")).hexdigest()
+        self.cache_file = self.cache_dir / f"{key}.json"
+        # Changing the validator's configuration must invalidate stored results
+        self.salt = salt
+        self.persistent = persistent
+        self.directories = {}
+        self.checks = {}
+        self.hits = 0
+        self.misses = 0
+        self._used_checks = {}
+
+    def load(self):
+        """Read the cache file, ignoring it if missing, corrupt or written by another version"""
+        if not self.persistent:
+            return self
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+
+        if data.get("version") != CACHE_VERSION or data.get("salt") != self.salt:
+            return self
+        if data.get("project_path") != str(self.project_path):
+            return self
+
+        trusted_before = data.get("saved_at_ns", 0) - RACY_WINDOW_NS
+        self.directories = {
+            rel_dir: listing for rel_dir, listing in data.get("directories", {}).items()
+            if listing["mtime_ns"] < trusted_before
+        }
+        self.checks = data.get("checks", {})
+        return self
+
+    def get(self, key, fingerprint):
+        """Return the stored results of a check if its fingerprint is unchanged, else None"""
+        cached = self.checks.get(key)
+        if cached is None or cached["fingerprint"] != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used_checks[key] = cached
+        return cached["results"]
+
+    def put(self, key, fingerprint, results):
+        self._used_checks[key] = {"fingerprint": fingerprint, "results": results}
+
+    def save(self, index):
+        """Write the index listings and the check results used in this run
+
+        Only those results are kept for the next run through this instance.
+        """
+        self.checks = self._used_checks
+        self._used_checks = {}
+        if not self.persistent:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "salt": self.salt,
+            "project_path": str(self.project_path),
+            "saved_at_ns": time.time_ns(),
+            "directories": index.snapshot(),
+            "checks": self.checks,
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            # A read-only or full cache location must never fail a validation
+            pass
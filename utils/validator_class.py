@@ -1,22 +1,93 @@
-import os
+import hashlib
+import io
+import time
 from pathlib import Path
 from datetime import datetime
-from rich import print
-from rich.table import Table
-from rich.console import Console
-from fpdf import FPDF, XPos, YPos
 import json
+from utils.project_index import ProjectIndex
+from utils.validation_cache import ValidationCache
+from utils.findings import (
+    Finding, RULES, SEVERITY_RESULTS, format_finding, finding_to_dict, finding_to_jsonl,
+    findings_to_csv, findings_to_json, findings_to_sarif, group_findings
+)
+from utils.rules import default_rules
+from utils.duplicates import MIN_SIZE, find_duplicates
+from utils.profiling import profile_span
+
+
+# Extra recommendations, keyed by (rule id, path) of a failed or warning finding
+RULE_RECOMMENDATIONS = {
+    ("dir.recommended", "02_data/01_raw"): "💡 Create 02_data/01_raw/ to preserve original data (never modify!)",
+    ("file.recommended", "LICENSE"): "📜 Add a LICENSE file (recommend CC-BY-4.0 for open science)",
+    ("file.recommended", "CITATION.cff"): "📚 Add CITATION.cff to make your work easily citable",
+}
+
+# Symbols the PDF core fonts cannot draw, replaced in a single str.translate() pass
+PDF_SYMBOLS = str.maketrans({
+    '✓': '[PASS]',
+    '✗': '[FAIL]',
+    '⚠': '[WARN]',
+    '📊': '[F]',
+    '🔓': '[A]',
+    '🔄': '[I]',
+    '♻': '[R]',
+    '\ufe0f': '',
+    '💡': '[TIP]',
+    '📜': '[LICENSE]',
+    '📚': '[CITE]',
+})
+# Messages listed per rule and directory in the PDF; the rest are only counted
+PDF_EXAMPLES = 5
+FINDINGS_CSV_NAME = "validation_findings.csv"
+
+
+def _pdf_text(text):
+    # Core fonts only cover Latin-1; anything the table does not replace becomes '?'
+    return text.translate(PDF_SYMBOLS).encode("latin-1", "replace").decode("latin-1")
 
 
 class OpenScienceValidator:
-    def __init__(self, project_path):
+    def __init__(self, project_path, use_cache=False, cache_dir=None, verbose=True, index=None,
+                 check_manifest=True, on_finding=None, rules=None, enabled_rules=(), disabled_rules=(),
+                 on_progress=None, cache=None, profiler=None):
         self.project_path = Path(project_path)
+        self.verbose = verbose
+        self.check_manifest = check_manifest
+        # Called with every Finding as soon as it is reported (e.g. to stream JSONL)
+        self.on_finding = on_finding
+        # Called with (done, total) as checks complete; raising from it aborts the validation
+        self.on_progress = on_progress
+        self._progress_done = 0
+        self._progress_total = 0
+        # Records a span per phase and rule when given (see utils/profiling.py)
+        self.profiler = profiler
+        # A prebuilt index (e.g. a ZipProjectIndex) replaces the filesystem scan
+        self.source_index = index
+        self.index = None
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        # A ValidationCache owned by the caller (watch mode keeps one in memory between runs)
+        self.cache = cache
         self.validation_results = {
             "passed": [],
             "failed": [],
             "warnings": [],
             "recommendations": []
         }
+        # Rules run on the indexed files and directories they declare (see utils/rules.py)
+        disabled_rules = set(disabled_rules)
+        if not check_manifest:
+            disabled_rules.add("manifest")
+        self.rules = (rules or default_rules()).select(enabled_rules, disabled_rules)
+        # Per rule: runs, results replayed from the cache, wall time and filesystem calls
+        self.rule_stats = {
+            rule.name: {"runs": 0, "cached": 0, "seconds": 0.0, "fs_calls": 0} for rule in self.rules.rules
+        }
+        # Structured counterpart of validation_results, plus (rule id, path) of every issue
+        self.findings = []
+        self._issue_keys = set()
+        # Identical files found by find_duplicates(), if it was run
+        self.duplicates = None
 
         # Required files (failures if missing)
         self.required_files = {
@@ -56,375 +127,238 @@ class OpenScienceValidator:
 
     def validate_structure(self):
         """Main validation function"""
-        console = Console()
-        console.print("[bold cyan]🔍 Starting Open Science Project Validation...[/bold cyan]\n")
+        with profile_span(self.profiler, "validate_structure", project=str(self.project_path)):
+            return self._validate_structure()
 
-        # Check if project exists
-        if not self.project_path.exists():
-            self.validation_results["failed"].append(f"Project path '{self.project_path}' does not exist")
-            return
+    def _validate_structure(self):
+        if self.verbose:
+            from rich.console import Console
+            console = Console()
+            console.print("[bold cyan]🔍 Starting Open Science Project Validation...[/bold cyan]\n")
 
-        # Validate files
-        self._validate_files()
+        if self.source_index is not None:
+            self.index = self.source_index
+        else:
+            # Load listings and check results from the previous run, if enabled
+            previous = None
+            if self.use_cache:
+                with profile_span(self.profiler, "cache.load"):
+                    self.cache = ValidationCache(
+                        self.project_path, self.cache_dir, salt=self._config_fingerprint()
+                    ).load()
+                previous = self.cache.directories
+
+            # Index the project tree once; every check below queries the index
+            index = ProjectIndex(self.project_path)
+            with profile_span(self.profiler, "index.build", index=index):
+                self.index = index.build(previous=previous)
 
-        # Validate directories
-        self._validate_directories()
+        # Check if project exists
+        if not self.index.exists(""):
+            self.report("fail", "project.exists", f"Project path '{self.project_path}' does not exist")
+            return
 
-        # Check for additional best practices
-        self._check_best_practices()
+        # Rules interested in file types get every indexed file with those extensions at once
+        extension_paths = [
+            (rule, sorted(
+                rel_path for ext, rel_paths in self.index.by_extension.items() if ext.lower() in rule.extensions
+                for rel_path in rel_paths
+            ))
+            for rule in self.rules.extension_rules
+        ]
+        # Progress units: the structure checks, each project rule and each file given to an extension rule
+        self._progress_done = 0
+        self._progress_total = 1 + len(self.rules.project_rules) + sum(len(paths) for _, paths in extension_paths)
+        self.advance(0)
+
+        # Validate files and directories, dispatching each one to the rules that declared it
+        visited = set()
+        with profile_span(self.profiler, "checks.files", index=self.index):
+            self._validate_files(visited)
+        with profile_span(self.profiler, "checks.directories", index=self.index):
+            self._validate_directories(visited)
+        self.advance()
+
+        # Project-wide rules, then declared paths outside the expected structure
+        for rule in self.rules.project_rules:
+            self._run_rule(rule, None)
+            self.advance()
+        for rel_path, rules in self.rules.by_path.items():
+            if rel_path in visited or not self.index.exists(rel_path):
+                continue
+            # Like the structure checks above, empty directories are not handed to path rules
+            if self.index.is_dir(rel_path) and not self.index.list_dir(rel_path):
+                continue
+            for rule in rules:
+                self._run_rule(rule, rel_path)
+
+        for rule, rel_paths in extension_paths:
+            if rel_paths:
+                done = self._progress_done
+                self._timed(rule, rule.check_many, rel_paths)
+                # Rules that do not report progress per file finish their share at once
+                self._progress_done = done
+                self.advance(len(rel_paths))
+
+        if self.cache is not None:
+            with profile_span(self.profiler, "cache.save"):
+                self.cache.save(self.index)
 
         # Generate FAIR recommendations
-        self._generate_fair_recommendations()
+        with profile_span(self.profiler, "recommendations"):
+            self._generate_fair_recommendations()
 
         # Display results
-        self._display_results()
+        if self.verbose:
+            with profile_span(self.profiler, "display_results", "report"):
+                self._display_results()
 
         return self.validation_results
 
-    def _validate_files(self):
+    def _validate_files(self, visited):
         """Check for required and recommended files"""
         # Check required files (failures if missing)
         for file_name, description in self.required_files.items():
-            file_path = self.project_path / file_name
-            if file_path.exists():
-                self.validation_results["passed"].append(f"✓ Found {file_name}")
-
-                # Additional checks for specific files
-                if file_name == "README.md":
-                    self._check_readme_content(file_path)
+            if self.index.exists(file_name):
+                self.report("pass", "file.required", f"Found {file_name}", file_name)
+                self._dispatch(file_name, visited)
             else:
-                self.validation_results["failed"].append(
-                    f"✗ Missing required file {file_name}: {description}"
-                )
+                self.report("fail", "file.required", f"Missing required file {file_name}: {description}", file_name)
 
         # Check recommended files (warnings if missing)
         for file_name, description in self.recommended_files.items():
-            file_path = self.project_path / file_name
-            if file_path.exists():
-                self.validation_results["passed"].append(f"✓ Found {file_name}")
-
-                # Additional checks for specific files
-                if file_name == "LICENSE":
-                    self._check_license_content(file_path)
-                elif file_name == "CITATION.cff":
-                    self._check_citation_content(file_path)
+            if self.index.exists(file_name):
+                self.report("pass", "file.recommended", f"Found {file_name}", file_name)
+                self._dispatch(file_name, visited)
             else:
-                self.validation_results["warnings"].append(
-                    f"⚠ Missing recommended file {file_name}: {description}"
+                self.report(
+                    "warning", "file.recommended",
+                    f"Missing recommended file {file_name}: {description}",
+                    file_name
                 )
 
-    def _validate_directories(self):
+    def _validate_directories(self, visited):
         """Check for required and recommended directory structure"""
         # Check required directories (failures)
         for dir_path, description in self.required_dirs.items():
-            full_path = self.project_path / dir_path
-            if full_path.exists() and full_path.is_dir():
-                # Check if directory is empty
-                if not any(full_path.iterdir()):
-                    self.validation_results["warnings"].append(
-                        f"⚠ Required directory '{dir_path}' exists but is empty"
-                    )
-                else:
-                    self.validation_results["passed"].append(f"✓ Found {dir_path}/")
-                    # Additional content checks for specific directories
-                    self._check_directory_contents(dir_path, full_path)
-            else:
-                self.validation_results["failed"].append(
-                    f"✗ Missing required directory '{dir_path}': {description}"
-                )
+            self._validate_directory(dir_path, description, True, visited)
 
         # Check recommended directories (warnings)
         for dir_path, description in self.recommended_dirs.items():
-            full_path = self.project_path / dir_path
-            if full_path.exists() and full_path.is_dir():
-                if not any(full_path.iterdir()):
-                    self.validation_results["warnings"].append(
-                        f"⚠ Recommended directory '{dir_path}' exists but is empty"
-                    )
-                else:
-                    self.validation_results["passed"].append(f"✓ Found {dir_path}/")
-                    # Additional content checks
-                    self._check_directory_contents(dir_path, full_path)
-            else:
-                self.validation_results["warnings"].append(
-                    f"⚠ Missing recommended directory '{dir_path}': {description}"
-                )
-
-    def _check_directory_contents(self, dir_path, full_path):
-        """Check specific directory contents and naming conventions"""
-
-        # Check participant info for data files
-        if dir_path == "01_docs/01_participants":
-            data_files = list(full_path.glob("*.csv")) + list(full_path.glob("*.tsv"))
-            if not data_files:
-                self.validation_results["warnings"].append(
-                    f"⚠ No CSV or TSV files found in {dir_path}. Expected participant data files."
-                )
+            self._validate_directory(dir_path, description, False, visited)
+
+    def _validate_directory(self, dir_path, description, required, visited):
+        """Check that a single directory exists, is not empty and has the expected contents"""
+        kind = "Required" if required else "Recommended"
+        rule_id = "dir.required" if required else "dir.recommended"
+        if self.index.is_dir(dir_path):
+            # Check if directory is empty
+            if not self.index.list_dir(dir_path):
+                self.report("warning", "dir.empty", f"{kind} directory '{dir_path}' exists but is empty", dir_path)
             else:
-                self.validation_results["passed"].append(
-                    f"✓ Found {len(data_files)} data file(s) in {dir_path}"
-                )
-
-        # Check data directories for proper structure and naming
-        elif dir_path.startswith("02_data"):
-            self._check_data_directory(dir_path, full_path)
-
-        # Check scripts directories for code files
-        elif dir_path == "03_scripts/02_prep":
-            code_files = list(full_path.glob("*.py")) + list(full_path.glob("*.R")) + list(full_path.glob("*.ipynb")) + list(full_path.glob("*.m"))
-            if not code_files:
-                self.validation_results["warnings"].append(
-                    f"⚠ No script files found in {dir_path}. Expected .py, .R, .ipynb, or .m files."
-                )
-
-        elif dir_path == "03_scripts/03_analysis":
-            code_files = list(full_path.glob("*.py")) + list(full_path.glob("*.R")) + list(full_path.glob("*.ipynb")) + list(full_path.glob("*.m"))
-            if not code_files:
-                self.validation_results["warnings"].append(
-                    f"⚠ No analysis scripts found in {dir_path}. Expected analysis code files."
-                )
-
-        # Check results directories
-        elif dir_path == "04_results/02_figures":
-            fig_files = list(full_path.glob("*.png")) + list(full_path.glob("*.jpg")) + list(full_path.glob("*.pdf")) + list(full_path.glob("*.svg"))
-            if not fig_files:
-                self.validation_results["warnings"].append(
-                    f"⚠ No figure files found in {dir_path}. Expected .png, .jpg, .pdf, or .svg files."
-                )
-
-        elif dir_path == "04_results/03_tables":
-            table_files = list(full_path.glob("*.csv")) + list(full_path.glob("*.xlsx")) + list(full_path.glob("*.txt"))
-            if not table_files:  # This line is incorrectly indented!
-                self.validation_results["warnings"].append(
-                    f"⚠ No table files found in {dir_path}. Expected .csv, .xlsx, or .txt files."
-                )
-
-    def _check_data_directory(self, dir_path, full_path):
-        """Check data directory structure and naming conventions"""
-
-        # First, check if there are any folders in the data directory
-        subdirs = [d for d in full_path.iterdir() if d.is_dir()]
-
-        if not subdirs:
-            self.validation_results["warnings"].append(
-                f"⚠ No subdirectories found in {dir_path}. Expected 'raw' and 'preproc' folders."
-            )
-            return
-
-        # Check if we have raw and preproc folders
-        has_raw = False
-        has_preproc = False
-        raw_dirs = []
-        preproc_dirs = []
-
-        for subdir in subdirs:
-            if "raw" in subdir.name.lower():
-                has_raw = True
-                raw_dirs.append(subdir)
-            if "preproc" in subdir.name.lower():
-                has_preproc = True
-                preproc_dirs.append(subdir)
-
-        # Warn if missing expected directories
-        if not has_raw:
-            self.validation_results["warnings"].append(
-                f"⚠ No 'raw' data directory found in {dir_path}. Consider adding a folder containing 'raw' in its name."
-            )
-
-        if not has_preproc:
-            self.validation_results["warnings"].append(
-                f"⚠ No 'preproc' data directory found in {dir_path}. Consider adding a folder containing 'preproc' in its name."
-            )
-
-        # Now check the second level - subdirectories within raw and preproc
-        for raw_dir in raw_dirs:
-            self._check_data_subdirectory(raw_dir, "raw")
-
-        for preproc_dir in preproc_dirs:
-            self._check_data_subdirectory(preproc_dir, "preprocessed")
-
-    def _check_data_subdirectory(self, data_dir, data_type):
-        """Check subdirectories within raw/preproc folders"""
-
-        # Get all items in this directory
-        items = list(data_dir.iterdir())
-        subdirs = [d for d in items if d.is_dir()]
-        files = [f for f in items if f.is_file()]
-
-        # Check if directory is empty
-        if not items:
-            self.validation_results["warnings"].append(
-                f"⚠ {data_type.capitalize()} data directory '{data_dir.name}' is empty."
-            )
-            return
-
-        # If there are subdirectories, check their naming convention
-        if subdirs:
-            # Expected naming patterns for data subdirectories (BIDS-like)
-            expected_patterns = {
-                "sub-": "subject/participant folders (e.g., sub-01, sub-002)",
-                "ses-": "session folders (e.g., ses-01, ses-pre, ses-post)",
-                "task-": "task-based data (e.g., task-rest, task-nback)",
-                "run-": "run numbers (e.g., run-01, run-02)"
-            }
-
-            follows_convention = False
-            for subdir in subdirs:
-                for pattern in expected_patterns:
-                    if subdir.name.startswith(pattern):
-                        follows_convention = True
-                        break
-
-            if not follows_convention:
-                self.validation_results["warnings"].append(
-                    f"⚠ Subdirectories in {data_dir.name} don't follow recommended naming convention. "
-                    f"Consider using: {', '.join(expected_patterns.keys())}"
-                )
-
-            # Check if subdirectories have content
-            empty_subdirs = []
-            for subdir in subdirs:
-                if not any(subdir.iterdir()):
-                    empty_subdirs.append(subdir.name)
-
-            if empty_subdirs:
-                self.validation_results["warnings"].append(
-                    f"⚠ Empty subdirectories in {data_dir.name}: {', '.join(empty_subdirs)}"
-                )
-
-        # Check for data files
-        data_extensions = ['.csv', '.tsv', '.json', '.npy', '.mat', '.h5', '.hdf5', '.parquet']
-        data_files = []
-
-        # Check both in current directory and subdirectories
-        for ext in data_extensions:
-            data_files.extend(list(data_dir.glob(f"*{ext}")))
-            data_files.extend(list(data_dir.glob(f"**/*{ext}")))
-
-        if not data_files:
-            self.validation_results["warnings"].append(
-                f"⚠ No data files found in {data_dir.name} or its subdirectories. "
-                f"Expected files with extensions: {', '.join(data_extensions)}"
-            )
+                self.report("pass", rule_id, f"Found {dir_path}/", dir_path)
+                self._dispatch(dir_path, visited)
+        elif required:
+            self.report("fail", "dir.required", f"Missing required directory '{dir_path}': {description}", dir_path)
         else:
-            self.validation_results["passed"].append(
-                f"✓ Found {len(data_files)} data file(s) in {data_dir.name}"
+            self.report(
+                "warning", "dir.recommended",
+                f"Missing recommended directory '{dir_path}': {description}",
+                dir_path
             )
 
-        # Check for documentation (only for raw data)
-        if data_type == "raw":
-            has_readme = (data_dir / "README.md").exists() or (data_dir / "README.txt").exists()
-            has_dict = any(f.name.lower() in ['data_dictionary.csv', 'data_dict.csv', 'codebook.csv'] for f in data_dir.glob("*"))
-
-            if not has_readme:
-                self.validation_results["warnings"].append(
-                    f"⚠ No README found in {data_dir.name}. Consider adding data documentation."
-                )
-
-            if not has_dict:
-                self.validation_results["warnings"].append(
-                    f"⚠ No data dictionary found in {data_dir.name}. Consider adding a codebook or data_dictionary.csv"
-                )
-
-    def _check_readme_content(self, readme_path):
-        """Check README.md for key sections"""
-        with open(readme_path, 'r') as f:
-            content = f.read().lower()
-
-        sections = ["description", "installation", "usage", "citation", "license"]
-        missing_sections = []
-
-        for section in sections:
-            if section not in content:
-                missing_sections.append(section)
-
-        if missing_sections:
-            self.validation_results["warnings"].append(
-                f"⚠ README.md missing sections: {', '.join(missing_sections)}"
-            )
-
-    def _check_license_content(self, license_path):
-        """Check if license is CC-BY-4.0 or similar"""
-        with open(license_path, 'r') as f:
-            content = f.read().lower()
-
-        if "cc" in content or "creative commons" in content:
-            if "by" in content and "4.0" in content:
-                self.validation_results["passed"].append("✓ License appears to be CC-BY-4.0")
+    def report(self, severity, rule_id, message, path=None):
+        """Record a finding and its formatted message in validation_results"""
+        finding = Finding(rule_id, severity, message, path, RULES.get(rule_id, (None, None))[1])
+        self._add_finding(finding)
+
+    def advance(self, count=1):
+        """Count units of work as done (rules call this per file) and report progress"""
+        self._progress_done = min(self._progress_done + count, self._progress_total)
+        if self.on_progress is not None:
+            self.on_progress(self._progress_done, self._progress_total)
+
+    def _add_finding(self, finding):
+        self.findings.append(finding)
+        self.validation_results[SEVERITY_RESULTS[finding.severity]].append(format_finding(finding))
+        if finding.severity != "pass":
+            self._issue_keys.add((finding.rule_id, finding.path))
+        if self.on_finding is not None:
+            self.on_finding(finding)
+
+    def _dispatch(self, rel_path, visited):
+        """Run the rules declared for an existing file or non-empty directory"""
+        visited.add(rel_path)
+        for rule in self.rules.for_path(rel_path):
+            self._run_rule(rule, rel_path)
+
+    def _run_rule(self, rule, rel_path):
+        """Run one rule, or replay its findings from the cache if its inputs are unchanged"""
+        stats = self.rule_stats[rule.name]
+        key = f"{rule.name}:{rel_path or ''}"
+        fingerprint = rule.fingerprint(self.index, rel_path) if self.cache is not None else None
+        if fingerprint is not None:
+            cached = self.cache.get(key, fingerprint)
+            if cached is not None:
+                for record in cached:
+                    self._add_finding(Finding(**record))
+                stats["cached"] += 1
+                return
+
+        before = len(self.findings)
+        self._timed(rule, rule.check, rel_path)
+        if fingerprint is not None:
+            self.cache.put(key, fingerprint, [finding_to_dict(f) for f in self.findings[before:]])
+
+    def file_results(self, rule, rel_paths, compute):
+        """Yield (rel_path, result) per file, replaying the results of unchanged files from the cache
+
+        compute(rel_paths) must yield one JSON-serialisable result per path, in
+        order; it is only given the files that have no usable cached result.
+        """
+        stored = {}
+        if self.cache is not None:
+            for rel_path in rel_paths:
+                fingerprint = rule.fingerprint(self.index, rel_path)
+                if fingerprint is not None:
+                    key = f"{rule.name}:{rel_path}"
+                    stored[rel_path] = (key, fingerprint, self.cache.get(key, fingerprint))
+
+        fresh = compute([rel_path for rel_path in rel_paths if stored.get(rel_path, (None, None, None))[2] is None])
+        for rel_path in rel_paths:
+            key, fingerprint, result = stored.get(rel_path, (None, None, None))
+            if result is None:
+                result = next(fresh)
+                if fingerprint is not None:
+                    self.cache.put(key, fingerprint, result)
             else:
-                self.validation_results["warnings"].append(
-                    "⚠ License is Creative Commons but not CC-BY-4.0"
-                )
-        else:
-            self.validation_results["warnings"].append(
-                "⚠ Consider using CC-BY-4.0 for open science compliance"
-            )
-
-    def _check_citation_content(self, citation_path):
-        """Check CITATION.cff format"""
-        with open(citation_path, 'r') as f:
-            content = f.read()
-
-        required_fields = ["cff-version", "authors", "title", "message"]
-        missing_fields = []
-
-        for field in required_fields:
-            if field not in content:
-                missing_fields.append(field)
-
-        if missing_fields:
-            self.validation_results["warnings"].append(
-                f"⚠ CITATION.cff missing fields: {', '.join(missing_fields)}"
-            )
-
-    def _check_best_practices(self):
-        """Check for additional best practices"""
-        # Check for .gitignore
-        if (self.project_path / ".gitignore").exists():
-            self.validation_results["passed"].append("✓ Found .gitignore")
-        else:
-            self.validation_results["warnings"].append(
-                "⚠ Consider adding .gitignore for version control"
-            )
-
-        # Check for requirements.txt or environment.yml in the right place
-        env_files = ["requirements.txt", "environment.yml", "pyproject.toml"]
-        found_env = False
-
-        # Check in root
-        for env_file in env_files:
-            if (self.project_path / env_file).exists():
-                found_env = True
-                self.validation_results["passed"].append(f"✓ Found {env_file}")
-                break
-
-        # Check in scripts directory
-        if not found_env:
-            for env_file in env_files:
-                if (self.project_path / "03_scripts" / env_file).exists():
-                    found_env = True
-                    self.validation_results["passed"].append(f"✓ Found {env_file} in 03_scripts/")
-                    break
-
-        if not found_env:
-            self.validation_results["warnings"].append(
-                "⚠ No environment specification found (requirements.txt, environment.yml, etc.)"
-            )
-        # Add check for data documentation
-        data_docs = ["data_dictionary.csv", "codebook.csv", "variables.csv"]
-        found_data_doc = False
-
-        for doc in data_docs:
-            if (self.project_path / "02_data" / doc).exists() or \
-               (self.project_path / "05_meta" / doc).exists():
-                found_data_doc = True
-                self.validation_results["passed"].append(f"✓ Found data documentation: {doc}")
-                break
-
-        if not found_data_doc:
-            self.validation_results["warnings"].append(
-                "⚠ No data dictionary or codebook found. Consider adding variable descriptions."
-            )
+                self.rule_stats[rule.name]["cached"] += 1
+            yield rel_path, result
+
+    def _timed(self, rule, method, arg):
+        """Call a rule method, adding its wall time and filesystem calls to rule_stats"""
+        stats = self.rule_stats[rule.name]
+        fs_calls = self.index.fs_calls()
+        start = time.perf_counter()
+        with profile_span(self.profiler, f"rule:{rule.name}", "rule", index=self.index,
+                          path=arg if isinstance(arg, str) else None,
+                          files=len(arg) if isinstance(arg, list) else None):
+            method(self, arg)
+        stats["seconds"] += time.perf_counter() - start
+        stats["fs_calls"] += self.index.fs_calls() - fs_calls
+        stats["runs"] += 1
+
+    def _config_fingerprint(self):
+        """Digest of the expected files/directories, so cached results follow config changes"""
+        config = [self.required_files, self.recommended_files, self.required_dirs, self.recommended_dirs]
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def find_duplicates(self, min_size=MIN_SIZE):
+        """Group identical files in the project and count the bytes their extra copies take"""
+        if self.index is None:
+            self.index = self.source_index or ProjectIndex(self.project_path).build()
+        self.duplicates = find_duplicates(self.index, min_size=min_size, cache_dir=self.cache_dir)
+        return self.duplicates
 
     def _generate_fair_recommendations(self):
         """Generate FAIR principle recommendations"""
@@ -435,24 +369,17 @@ class OpenScienceValidator:
             "♻️  REUSABLE: Include clear licensing and detailed provenance metadata"
         ])
 
-        # Specific recommendations based on findings
-        if any("01_raw" in warning for warning in self.validation_results["warnings"]):
-            self.validation_results["recommendations"].append(
-                "💡 Create 02_data/01_raw/ to preserve original data (never modify!)"
-            )
-
-        if any("LICENSE" in warning for warning in self.validation_results["warnings"]):
-            self.validation_results["recommendations"].append(
-                "📜 Add a LICENSE file (recommend CC-BY-4.0 for open science)"
-            )
-
-        if any("CITATION.cff" in warning for warning in self.validation_results["warnings"]):
-            self.validation_results["recommendations"].append(
-                "📚 Add CITATION.cff to make your work easily citable"
-            )
+        # Specific recommendations based on the rules that reported an issue
+        for key, recommendation in RULE_RECOMMENDATIONS.items():
+            if key in self._issue_keys:
+                self.validation_results["recommendations"].append(recommendation)
 
     def _display_results(self):
         """Display validation results in console"""
+        # rich is only imported when something is printed (batch jobs and the quiet CLI never do)
+        from rich.console import Console
+        from rich.table import Table
+
         console = Console()
 
         # Summary table
@@ -479,31 +406,45 @@ class OpenScienceValidator:
             for item in self.validation_results["warnings"]:
                 console.print(f"  {item}")
 
-    def generate_pdf_report(self, output_path="validation_report.pdf"):
-        """Generate a PDF report of validation results"""
+    def to_json(self):
+        """Return the findings, recommendations and per-rule stats as a JSON-serialisable dict"""
+        report = findings_to_json(self.findings, self.project_path, self.validation_results["recommendations"])
+        report["rules"] = self.rule_stats
+        if self.duplicates is not None:
+            report["duplicates"] = {
+                "groups": [group._asdict() for group in self.duplicates["groups"]],
+                "duplicate_files": self.duplicates["duplicate_files"],
+                "reclaimable_bytes": self.duplicates["reclaimable_bytes"],
+            }
+        return report
+
+    def to_sarif(self):
+        """Return the findings as a SARIF 2.1.0 log"""
+        return findings_to_sarif(self.findings, self.project_path)
+
+    def write_jsonl(self, stream):
+        """Write one JSON line per finding to a text stream"""
+        for finding in self.findings:
+            stream.write(finding_to_jsonl(finding))
+
+    def generate_pdf_report(self, output_path="validation_report.pdf", examples=PDF_EXAMPLES, attach_csv=False):
+        """Generate a PDF report of validation results
+
+        Findings are grouped by rule and directory, with at most examples
+        messages listed per group. With attach_csv, every finding is also
+        embedded in the PDF as a CSV file attachment.
+        """
+        with profile_span(self.profiler, "pdf_report", "report", findings=len(self.findings)):
+            self._write_pdf_report(output_path, examples, attach_csv)
+
+    def _write_pdf_report(self, output_path, examples, attach_csv):
+        # fpdf takes longer to import than a small project takes to validate
+        from fpdf import FPDF, XPos, YPos
+
         pdf = FPDF()
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)  # Add this
 
-        # Helper function to clean Unicode characters
-        def clean_text(text):
-            # Remove common Unicode symbols
-            replacements = {
-                '✓': '[PASS]',
-                '✗': '[FAIL]',
-                '⚠': '[WARN]',
-                '📊': '[F]',
-                '🔓': '[A]',
-                '🔄': '[I]',
-                '♻️': '[R]',
-                '💡': '[TIP]',
-                '📜': '[LICENSE]',  # Add this line
-                '📚': '[CITE]'      # Add this line too for CITATION.cff
-            }
-            for unicode_char, replacement in replacements.items():
-                text = text.replace(unicode_char, replacement)
-            return text
-
         # Use helvetica directly (it's a core font)
         pdf.set_font("helvetica", "B", 16)
 
@@ -515,7 +456,7 @@ class OpenScienceValidator:
 
         # Project info
         pdf.set_font("helvetica", "B", 14)
-        pdf.cell(0, 10, f"Project: {self.project_path.name}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.cell(0, 10, _pdf_text(f"Project: {self.project_path.name}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
 
         # Summary
@@ -525,66 +466,87 @@ class OpenScienceValidator:
         pdf.cell(0, 8, f"Passed checks: {len(self.validation_results['passed'])}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.cell(0, 8, f"Failed checks: {len(self.validation_results['failed'])}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.cell(0, 8, f"Warnings: {len(self.validation_results['warnings'])}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        if attach_csv:
+            pdf.cell(0, 8, f"All {len(self.findings)} findings are attached as {FINDINGS_CSV_NAME}",
+                     new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            listing = io.StringIO()
+            findings_to_csv(self.findings, listing)
+            pdf.embed_file(bytes=listing.getvalue().encode("utf-8"), basename=FINDINGS_CSV_NAME,
+                           desc="All validation findings")
         pdf.ln(5)
 
+        by_severity = {"pass": [], "fail": [], "warning": []}
+        for finding in self.findings:
+            by_severity[finding.severity].append(finding)
+
         # Failed checks
-        if self.validation_results["failed"]:
-            pdf.set_font("helvetica", "B", 12)
-            pdf.set_text_color(255, 0, 0)
-            pdf.cell(0, 10, "Failed Checks - Action Required", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.set_font("helvetica", "", 10)
-            pdf.set_text_color(0, 0, 0)
-            for item in self.validation_results["failed"]:
-                # Clean and truncate if needed
-                cleaned_item = clean_text(item)
-                # Use text parameter explicitly and set width
-                pdf.multi_cell(w=0, h=8, text=f"- {cleaned_item}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.ln(5)
+        if by_severity["fail"]:
+            self._pdf_findings(pdf, "Failed Checks - Action Required", (255, 0, 0), by_severity["fail"], examples)
 
         # Warnings
-        if self.validation_results["warnings"]:
-            pdf.set_font("helvetica", "B", 12)
-            pdf.set_text_color(255, 165, 0)
-            pdf.cell(0, 10, "Warnings - Recommended Improvements", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.set_font("helvetica", "", 10)
-            pdf.set_text_color(0, 0, 0)
-            for item in self.validation_results["warnings"]:
-                cleaned_item = clean_text(item)
-                pdf.multi_cell(w=0, h=8, text=f"- {cleaned_item}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.ln(5)
+        if by_severity["warning"]:
+            self._pdf_findings(
+                pdf, "Warnings - Recommended Improvements", (255, 165, 0), by_severity["warning"], examples
+            )
 
         # FAIR recommendations
         pdf.set_font("helvetica", "B", 12)
         pdf.cell(0, 10, "FAIR Principle Recommendations", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.set_font("helvetica", "", 10)
         for rec in self.validation_results["recommendations"]:
-            cleaned_rec = clean_text(rec)
-            pdf.multi_cell(w=0, h=8, text=f"- {cleaned_rec}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.multi_cell(w=0, h=8, text=_pdf_text(f"- {rec}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
         # Add passed checks on new page if there are many
-        if self.validation_results["passed"]:
+        if by_severity["pass"]:
             pdf.add_page()
-            pdf.set_font("helvetica", "B", 12)
-            pdf.set_text_color(0, 128, 0)
-            pdf.cell(0, 10, "Passed Checks", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.set_font("helvetica", "", 10)
-            pdf.set_text_color(0, 0, 0)
-            for item in self.validation_results["passed"]:
-                cleaned_item = clean_text(item)
-                pdf.multi_cell(w=0, h=8, text=f"- {cleaned_item}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            self._pdf_findings(pdf, "Passed Checks", (0, 128, 0), by_severity["pass"], examples)
 
         # Save PDF
         pdf.output(output_path)
-        print(f"[green]📄 PDF report saved to: {output_path}[/green]")
+        if self.verbose:
+            from rich import print
+            print(f"[green]📄 PDF report saved to: {output_path}[/green]")
+
+    @staticmethod
+    def _pdf_findings(pdf, title, color, findings, examples):
+        """Write one section of findings, one block per rule and directory"""
+        from fpdf import XPos, YPos
+
+        pdf.set_font("helvetica", "B", 12)
+        pdf.set_text_color(*color)
+        pdf.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.set_text_color(0, 0, 0)
+        for rule_id, directory, group in group_findings(findings):
+            if len(group) == 1:
+                pdf.set_font("helvetica", "", 10)
+                pdf.multi_cell(w=0, h=8, text=_pdf_text(f"- {group[0].message}"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+                continue
+
+            description = RULES.get(rule_id, (rule_id, None))[0]
+            where = f"{directory}/" if directory else "project root"
+            pdf.set_font("helvetica", "B", 10)
+            pdf.multi_cell(w=0, h=8, text=_pdf_text(f"- {description} ({rule_id}) in {where}: {len(group)} findings"),
+                           new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.set_font("helvetica", "", 9)
+            lines = [f"    {finding.message}" for finding in group[:examples]]
+            if len(group) > examples:
+                lines.append(f"    ... and {len(group) - examples} more")
+            # One cell for the whole block is much faster than one per line
+            pdf.multi_cell(w=0, h=6, text=_pdf_text("\n".join(lines)), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.ln(5)
+
 
+def validate_project(project_path, use_cache=False, pdf=False, verbose=True):
+    """Main function to validate a project
 
-def validate_project(project_path):
-    """Main function to validate a project"""
-    validator = OpenScienceValidator(project_path)
+    The PDF report (validation_report.pdf inside the project) is only written
+    with pdf=True; verbose=False prints nothing, so rich and fpdf are never imported.
+    """
+    validator = OpenScienceValidator(project_path, use_cache=use_cache, verbose=verbose)
     results = validator.validate_structure()
 
-    # Generate PDF report
-    report_path = Path(project_path) / "validation_report.pdf"
-    validator.generate_pdf_report(report_path)
+    if pdf:
+        report_path = Path(project_path) / "validation_report.pdf"
+        validator.generate_pdf_report(report_path)
 
     return results
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+MOCK_TOKEN = "fairytale-mock-token"
+
+
+class MockZenodo:
+    """In-memory stand-in for the Zenodo deposition API, with file contents on disk
+
+    Implements what utils.zenodo_publish uses: creating and reading
+    depositions, listing a bucket, single-request uploads and multipart
+    uploads (?uploads, ?uploadId=&partNumber=). With fail_every=N every Nth
+    request is answered with 503 to exercise retries. Stored files can be
+    checked with read_object().
+    """
+
+    def __init__(self, data_dir, token=MOCK_TOKEN, fail_every=0):
+        self.data_dir = Path(data_dir)
+        self.token = token
+        self.fail_every = fail_every
+        self.base_url = ""
+        self.depositions = {}
+        self.buckets = {}
+        self.uploads = {}
+        self.requests = 0
+        self.failures = 0
+        self._next_id = 1000
+        self._lock = threading.Lock()
+
+    def create_deposition(self, metadata):
+        with self._lock:
+            self._next_id += 1
+            deposition_id = self._next_id
+        bucket = uuid.uuid4().hex
+        self.buckets[bucket] = {}
+        self.depositions[deposition_id] = {"id": deposition_id, "bucket": bucket, "metadata": metadata or {},
+                                           "submitted": False}
+        return self.deposition_json(deposition_id)
+
+    def deposition_json(self, deposition_id):
+        deposition = self.depositions[deposition_id]
+        bucket_url = f"{self.base_url}/files/{deposition['bucket']}"
+        return {
+            "id": deposition_id,
+            "metadata": deposition["metadata"],
+            "title": deposition["metadata"].get("title", ""),
+            "state": "done" if deposition["submitted"] else "unsubmitted",
+            "submitted": deposition["submitted"],
+            "files": [
+                {"filename": key, "filesize": size, "checksum": checksum.split(":", 1)[1]}
+                for key, (size, checksum, _) in sorted(self.buckets[deposition["bucket"]].items())
+            ],
+            "links": {
+                "self": f"{self.base_url}/deposit/depositions/{deposition_id}",
+                "bucket": bucket_url,
+                "html": f"{self.base_url}/deposit/{deposition_id}",
+            },
+        }
+
+    def object_json(self, bucket, key):
+        size, checksum, _ = self.buckets[bucket][key]
+        return {"key": key, "size": size, "checksum": checksum, "is_head": True, "delete_marker": False,
+                "links": {"self": f"{self.base_url}/files/{bucket}/{key}"}}
+
+    def store(self, bucket, key, path):
+        """Make a fully received file the head version of key"""
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        target = self.data_dir / bucket / hashlib.sha1(key.encode("utf-8")).hexdigest()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+        self.buckets[bucket][key] = (target.stat().st_size, f"md5:{digest.hexdigest()}", target)
+
+    def read_object(self, deposition_id, key):
+        """Return the stored bytes of a file in a deposition"""
+        bucket = self.depositions[deposition_id]["bucket"]
+        with open(self.buckets[bucket][key][2], "rb") as f:
+            return f.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client's connection pool is actually exercised
+    protocol_version = "HTTP/1.1"
+    server_version = "FAIRyTaleMockZenodo/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def zenodo(self):
+        return self.server.zenodo
+
+    def _reply(self, status, body=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        self._reply(status, {"status": status, "message": message})
+
+    def _body_to_file(self):
+        """Stream the request body to a temporary file in the data directory"""
+        length = int(self.headers.get("Content-Length") or 0)
+        fd, path = tempfile.mkstemp(dir=self.zenodo.data_dir, prefix=".upload-")
+        with os.fdopen(fd, "wb") as f:
+            while length > 0:
+                block = self.rfile.read(min(length, 1024 * 1024))
+                if not block:
+                    break
+                f.write(block)
+                length -= len(block)
+        return Path(path)
+
+    def _json_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _handle(self, method):
+        zenodo = self.zenodo
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        query = parse_qs(url.query, keep_blank_values=True)
+        body_file = self._body_to_file() if method == "PUT" else None
+        try:
+            with zenodo._lock:
+                zenodo.requests += 1
+                fail = zenodo.fail_every and zenodo.requests % zenodo.fail_every == 0
+                if fail:
+                    zenodo.failures += 1
+            if fail:
+                return self._error(503, "Service temporarily unavailable (injected by the mock)")
+            if zenodo.token and self.headers.get("Authorization") != f"Bearer {zenodo.token}":
+                return self._error(401, "The server could not verify that you are authorized")
+            if parts[:1] != ["api"]:
+                return self._error(404, "Not found")
+            return self._route(method, parts[1:], query, body_file)
+        finally:
+            if body_file is not None and body_file.exists():
+                body_file.unlink()
+
+    def _route(self, method, parts, query, body_file):
+        zenodo = self.zenodo
+        if parts[:2] == ["deposit", "depositions"]:
+            if len(parts) == 2 and method == "POST":
+                return self._reply(201, zenodo.create_deposition(self._json_body().get("metadata")))
+            if len(parts) == 3 and method == "GET" and parts[2].isdigit() and int(parts[2]) in zenodo.depositions:
+                return self._reply(200, zenodo.deposition_json(int(parts[2])))
+            return self._error(404, "Deposition not found")
+
+        if parts[:1] != ["files"] or len(parts) < 2 or parts[1] not in zenodo.buckets:
+            return self._error(404, "Bucket not found")
+        bucket = parts[1]
+        if len(parts) == 2 and method == "GET":
+            return self._reply(200, {"id": bucket, "contents": [
+                zenodo.object_json(bucket, key) for key in sorted(zenodo.buckets[bucket])
+            ]})
+        key = "/".join(parts[2:])
+        if not key:
+            return self._error(405, "Method not allowed")
+
+        if "uploads" in query and method == "POST":
+            return self._start_multipart(bucket, key, query)
+        if "uploadId" in query:
+            return self._multipart(method, bucket, key, query, body_file)
+        if method == "PUT":
+            zenodo.store(bucket, key, body_file)
+            return self._reply(201, zenodo.object_json(bucket, key))
+        if method == "GET" and key in zenodo.buckets[bucket]:
+            path = zenodo.buckets[bucket][key][2]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+            return None
+        return self._error(404, "Object not found")
+
+    def _start_multipart(self, bucket, key, query):
+        try:
+            size, part_size = int(query["size"][0]), int(query["partSize"][0])
+        except (KeyError, ValueError):
+            return self._error(400, "size and partSize are required")
+        if size <= 0 or part_size <= 0:
+            return self._error(400, "size and partSize must be positive")
+        upload_id = uuid.uuid4().hex
+        upload = {"id": upload_id, "bucket": bucket, "key": key, "size": size, "part_size": part_size,
+                  "last_part_number": math.ceil(size / part_size) - 1, "parts": {}}
+        (self.zenodo.data_dir / "multipart" / upload_id).mkdir(parents=True)
+        self.zenodo.uploads[upload_id] = upload
+        return self._reply(200, self._upload_json(upload))
+
+    def _upload_json(self, upload):
+        return {
+            "id": upload["id"], "bucket": upload["bucket"], "key": upload["key"], "size": upload["size"],
+            "part_size": upload["part_size"], "last_part_number": upload["last_part_number"], "completed": False,
+            "parts": [{"part_number": number, "checksum": checksum}
+                      for number, checksum in sorted(upload["parts"].items())],
+        }
+
+    def _multipart(self, method, bucket, key, query, body_file):
+        zenodo = self.zenodo
+        upload = zenodo.uploads.get(query["uploadId"][0])
+        if upload is None or upload["bucket"] != bucket or upload["key"] != key:
+            return self._error(404, "Multipart upload not found")
+        part_dir = zenodo.data_dir / "multipart" / upload["id"]
+
+        if method == "GET":
+            return self._reply(200, self._upload_json(upload))
+        if method == "DELETE":
+            del zenodo.uploads[upload["id"]]
+            shutil.rmtree(part_dir, ignore_errors=True)
+            return self._reply(204)
+        if method == "PUT":
+            try:
+                number = int(query["partNumber"][0])
+            except (KeyError, ValueError):
+                return self._error(400, "partNumber is required")
+            if not 0 <= number <= upload["last_part_number"]:
+                return self._error(400, f"partNumber must be between 0 and {upload['last_part_number']}")
+            expected = (upload["part_size"] if number < upload["last_part_number"]
+                        else upload["size"] - upload["part_size"] * upload["last_part_number"])
+            if body_file.stat().st_size != expected:
+                return self._error(400, f"Part {number} must be {expected} bytes")
+            digest = hashlib.md5(body_file.read_bytes()).hexdigest()
+            os.replace(body_file, part_dir / str(number))
+            upload["parts"][number] = f"md5:{digest}"
+            return self._reply(200, {"part_number": number, "checksum": f"md5:{digest}"})
+        if method == "POST":
+            missing = [number for number in range(upload["last_part_number"] + 1) if number not in upload["parts"]]
+            if missing:
+                return self._error(400, f"Not all parts have been uploaded ({len(missing)} missing)")
+            fd, path = tempfile.mkstemp(dir=zenodo.data_dir, prefix=".merge-")
+            with os.fdopen(fd, "wb") as merged:
+                for number in range(upload["last_part_number"] + 1):
+                    with open(part_dir / str(number), "rb") as part:
+                        shutil.copyfileobj(part, merged)
+            zenodo.store(bucket, key, Path(path))
+            del zenodo.uploads[upload["id"]]
+            shutil.rmtree(part_dir, ignore_errors=True)
+            return self._reply(200, zenodo.object_json(bucket, key))
+        return self._error(405, "Method not allowed")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class MockZenodoServer(ThreadingHTTPServer):
+    """A local HTTP server answering like the Zenodo API under <url>/api
+
+    Use as a context manager, or call start() and shutdown(); url is the
+    base URL to give to the publisher.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, data_dir=None, token=MOCK_TOKEN, fail_every=0):
+        super().__init__((host, port), _Handler)
+        self._own_data_dir = data_dir is None
+        data_dir = Path(data_dir) if data_dir else Path(tempfile.mkdtemp(prefix="fairytale-zenodo-"))
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.zenodo = MockZenodo(data_dir, token, fail_every)
+        self.url = f"http://{host}:{self.server_address[1]}/api"
+        self.zenodo.base_url = self.url
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fairytale-zenodo-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        super().shutdown()
+        self.server_close()
+        if self._own_data_dir:
+            shutil.rmtree(self.zenodo.data_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,404 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from utils.checksum_manifest import hash_file
+from utils.project_index import ProjectIndex
+from utils.validation_cache import default_cache_dir
+
+
+ZENODO_API_URL = os.environ.get("FAIRYTALE_ZENODO_URL", "https://zenodo.org/api")
+ZENODO_SANDBOX_URL = "https://sandbox.zenodo.org/api"
+# Requests in flight at once; also the size of the HTTP connection pool
+PUBLISH_CONCURRENCY = int(os.environ.get("FAIRYTALE_PUBLISH_CONCURRENCY", "4"))
+# Files larger than this are sent in parts of this size, which an interrupted upload resumes from.
+# At most PUBLISH_CONCURRENCY parts are held in memory at once.
+CHUNK_SIZE = int(os.environ.get("FAIRYTALE_PUBLISH_CHUNK_MB", "16")) * 1024 * 1024
+RETRY_ATTEMPTS = int(os.environ.get("FAIRYTALE_PUBLISH_RETRIES", "5"))
+# Responses worth another attempt; other errors (bad token, quota, invalid request) are final
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = (10, 300)
+
+# Never published: version control, caches and OS clutter
+EXCLUDED_NAMES = {".git", ".hg", ".svn", "__pycache__", ".ipynb_checkpoints", ".DS_Store", "Thumbs.db"}
+
+
+class ZenodoError(Exception):
+    """An error response of the Zenodo API (status is None for errors detected locally)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_transient(error):
+    if isinstance(error, ZenodoError):
+        return error.status in RETRY_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def publishable_files(index):
+    """Every file of the project except version control and cache folders, in a stable order"""
+    return sorted(
+        rel for rel in index.walk("")
+        if index.is_file(rel) and not EXCLUDED_NAMES.intersection(rel.split("/"))
+    )
+
+
+class ZenodoClient:
+    """The parts of the Zenodo deposition and files API used for publishing
+
+    Calls are coroutines; each request runs in a worker thread on one pooled
+    requests.Session, so up to pool_size connections are kept alive and
+    reused. Transient failures (connection errors, timeouts, 429 and 5xx
+    responses) are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, base_url=ZENODO_API_URL, token=None, pool_size=PUBLISH_CONCURRENCY, attempts=RETRY_ATTEMPTS):
+        self.base_url = base_url.rstrip("/")
+        self.attempts = attempts
+        self.requests = 0
+        self.retries = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def close(self):
+        self.session.close()
+
+    def _send(self, method, url, params, json_body, data):
+        # A callable body is a file opener: each attempt streams the file again from the start
+        if callable(data):
+            with data() as f:
+                response = self.session.request(method, url, params=params, data=f, timeout=REQUEST_TIMEOUT)
+        else:
+            response = self.session.request(method, url, params=params, json=json_body, data=data,
+                                            timeout=REQUEST_TIMEOUT)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("message") or response.text
+            except ValueError:
+                detail = response.text
+            raise ZenodoError(f"{method} {url} failed with {response.status_code}: {detail}".strip(),
+                              response.status_code)
+        return response.json() if response.content else None
+
+    async def request(self, method, url, params=None, json_body=None, data=None):
+        """Send one request, retrying transient failures; returns the decoded JSON response"""
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_random_exponential(multiplier=0.5, max=30),
+            retry=retry_if_exception(_is_transient),
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                self.requests += 1
+                if attempt.retry_state.attempt_number > 1:
+                    self.retries += 1
+                return await asyncio.to_thread(self._send, method, url, params, json_body, data)
+
+    async def create_deposition(self, metadata=None):
+        return await self.request("POST", "deposit/depositions", json_body={"metadata": metadata} if metadata else {})
+
+    async def get_deposition(self, deposition_id):
+        return await self.request("GET", f"deposit/depositions/{deposition_id}")
+
+    async def list_bucket(self, bucket_url):
+        """Return {key: {size, checksum}} of the files already in a deposition's bucket"""
+        listing = await self.request("GET", bucket_url)
+        return {item["key"]: item for item in (listing or {}).get("contents", [])}
+
+    @staticmethod
+    def object_url(bucket_url, key):
+        return f"{bucket_url}/{quote(key, safe='/')}"
+
+    async def put_object(self, bucket_url, key, data):
+        return await self.request("PUT", self.object_url(bucket_url, key), data=data)
+
+    async def start_multipart(self, bucket_url, key, size, part_size):
+        return await self.request("POST", self.object_url(bucket_url, key),
+                                  params={"uploads": "", "size": size, "partSize": part_size})
+
+    async def list_parts(self, bucket_url, key, upload_id):
+        return await self.request("GET", self.object_url(bucket_url, key), params={"uploadId": upload_id})
+
+    async def put_part(self, bucket_url, key, upload_id, part_number, data):
+        return await self.request("PUT", self.object_url(bucket_url, key),
+                                  params={"uploadId": upload_id, "partNumber": part_number}, data=data)
+
+    async def complete_multipart(self, bucket_url, key, upload_id):
+        return await self.request("POST", self.object_url(bucket_url, key), params={"uploadId": upload_id})
+
+
+class PublishState:
+    """What a previous publish of a project left behind, so the next one can continue it
+
+    Kept per project and API: the deposition, multipart uploads still open
+    ({key: [upload_id, size, mtime_ns]}) and MD5s of files whose size and
+    mtime are unchanged ({path: [size, mtime_ns, md5]}).
+    """
+
+    def __init__(self, project_path, base_url, cache_dir=None):
+        project_path = Path(project_path).resolve()
+        cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        key = hashlib.sha1(f"{project_path}\0{base_url}".encode("utf-8", "surrogateescape")).hexdigest()
+        self.state_file = cache_dir / "publish" / f"{key}.json"
+        self.deposition_id = None
+        self.uploads = {}
+        self.md5 = {}
+
+    def load(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        self.deposition_id = data.get("deposition_id")
+        self.uploads = data.get("uploads", {})
+        self.md5 = data.get("md5", {})
+        return self
+
+    def lookup_md5(self, rel_path, size, mtime_ns):
+        record = self.md5.get(rel_path)
+        if record and record[0] == size and record[1] == mtime_ns:
+            return record[2]
+        return None
+
+    def save(self):
+        data = {"deposition_id": self.deposition_id, "uploads": self.uploads, "md5": self.md5}
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_file, self.state_file)
+        except OSError:
+            pass
+
+
+class ZenodoPublisher:
+    """Upload a project's files to a Zenodo deposition
+
+    Files already in the deposition with the same MD5 are skipped. Small
+    files are sent in one request; larger ones as a multipart upload of
+    chunk_size parts, whose upload id is remembered so an interrupted
+    publish resumes with the missing parts. Up to concurrency requests run
+    at once. The deposition is left as a draft to be reviewed and published
+    on Zenodo. on_progress(done_bytes, total_bytes) is called as parts finish.
+    """
+
+    def __init__(self, project_path, base_url=ZENODO_API_URL, token=None, concurrency=PUBLISH_CONCURRENCY,
+                 chunk_size=CHUNK_SIZE, cache_dir=None, on_progress=None):
+        self.project_path = Path(project_path)
+        self.base_url = base_url
+        self.token = token
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
+        self.on_progress = on_progress
+        self.index = None
+        self.state = None
+        self.client = None
+        self._slots = None
+        self._done_bytes = 0
+        self._sent_bytes = 0
+        self._total_bytes = 0
+
+    def publish(self, deposition_id=None, index=None, metadata=None):
+        """Upload the project and return a summary dict"""
+        return asyncio.run(self._publish(deposition_id, index, metadata))
+
+    async def _publish(self, deposition_id, index, metadata):
+        start = time.perf_counter()
+        self.index = index or ProjectIndex(self.project_path).build()
+        self.state = PublishState(self.project_path, self.base_url, self.cache_dir).load()
+        self.client = ZenodoClient(self.base_url, self.token, pool_size=self.concurrency)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # Hashing and requests share one pool sized for the connections in use
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency + 2, thread_name_prefix="fairytale-publish")
+        loop.set_default_executor(executor)
+        try:
+            deposition = await self._deposition(deposition_id, metadata)
+            bucket = deposition["links"]["bucket"]
+            remote = await self.client.list_bucket(bucket)
+
+            files = publishable_files(self.index)
+            checked = await asyncio.gather(*(self._needs_upload(rel, remote.get(rel)) for rel in files))
+            uploads = [rel for rel, needed in zip(files, checked) if needed]
+            self._total_bytes = sum(self.index.stat(rel)[0] for rel in uploads)
+            self._report()
+            results = await asyncio.gather(*(self._upload(bucket, rel) for rel in uploads),
+                                           return_exceptions=True)
+        finally:
+            self.state.save()
+            self.client.close()
+
+        failed = {rel: str(result) for rel, result in zip(uploads, results) if isinstance(result, BaseException)}
+        return {
+            "deposition": deposition["id"],
+            "url": deposition["links"].get("html"),
+            "files": len(files),
+            "uploaded": [rel for rel in uploads if rel not in failed],
+            "resumed": sum(1 for result in results if result == "resumed"),
+            "skipped": len(files) - len(uploads),
+            "failed": failed,
+            "remote_only": sorted(set(remote) - set(files)),
+            "bytes": self._sent_bytes,
+            "requests": self.client.requests,
+            "retries": self.client.retries,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    async def _deposition(self, deposition_id, metadata):
+        """The given or previously used draft deposition, or a new one"""
+        if deposition_id is not None:
+            deposition = await self.client.get_deposition(deposition_id)
+            if deposition.get("submitted"):
+                raise ZenodoError(f"Deposition {deposition_id} is already published; create a new version on Zenodo")
+        elif self.state.deposition_id is not None:
+            try:
+                deposition = await self.client.get_deposition(self.state.deposition_id)
+            except ZenodoError as e:
+                if e.status not in (404, 410):
+                    raise
+                deposition = None
+            if deposition is None or deposition.get("submitted"):
+                deposition = None
+                self.state.uploads = {}
+        else:
+            deposition = None
+
+        if deposition is None:
+            deposition = await self.client.create_deposition(
+                metadata or {"title": self.project_path.resolve().name, "upload_type": "dataset"}
+            )
+        if deposition["id"] != self.state.deposition_id:
+            self.state.deposition_id = deposition["id"]
+            self.state.uploads = {}
+        self.state.save()
+        return deposition
+
+    async def _md5(self, rel_path):
+        size, mtime_ns = self.index.stat(rel_path)
+        md5 = self.state.lookup_md5(rel_path, size, mtime_ns)
+        if md5 is None:
+            md5 = await asyncio.to_thread(hash_file, self.index, rel_path, "md5")
+            self.state.md5[rel_path] = [size, mtime_ns, md5]
+        return md5
+
+    async def _needs_upload(self, rel_path, remote):
+        # Only a remote file of the same size can be identical; the MD5 decides
+        if remote is None or remote.get("size") != self.index.stat(rel_path)[0]:
+            return True
+        return f"md5:{await self._md5(rel_path)}" != remote.get("checksum")
+
+    def _report(self, done=0, sent=True):
+        self._done_bytes += done
+        if sent:
+            self._sent_bytes += done
+        if self.on_progress is not None:
+            self.on_progress(self._done_bytes, self._total_bytes)
+
+    def _read(self, rel_path, offset, length):
+        with self.index.open(rel_path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _read_whole(self, rel_path, size):
+        data = self._read(rel_path, 0, size)
+        return data, hashlib.md5(data).hexdigest()
+
+    async def _upload(self, bucket, rel_path):
+        size, mtime_ns = self.index.stat(rel_path)
+        if size <= self.chunk_size:
+            async with self._slots:
+                data, md5 = await asyncio.to_thread(self._read_whole, rel_path, size)
+                response = await self.client.put_object(bucket, rel_path, data)
+            self.state.md5[rel_path] = [size, mtime_ns, md5]
+            self._report(size)
+            self._check(rel_path, response, md5)
+            return "uploaded"
+        return await self._upload_parts(bucket, rel_path, size, mtime_ns)
+
+    async def _upload_parts(self, bucket, rel_path, size, mtime_ns):
+        resumed = False
+        uploaded = set()
+        previous = self.state.uploads.get(rel_path)
+        if previous and previous[1:] == [size, mtime_ns]:
+            try:
+                listing = await self.client.list_parts(bucket, rel_path, previous[0])
+                uploaded = {part["part_number"] for part in listing.get("parts", [])}
+                upload_id, resumed = previous[0], True
+            except ZenodoError as e:
+                # The server forgot the upload (expired or aborted): start again
+                if e.status not in (404, 410):
+                    raise
+
+        if not resumed:
+            try:
+                upload = await self.client.start_multipart(bucket, rel_path, size, self.chunk_size)
+            except ZenodoError as e:
+                if e.status not in (400, 404, 405, 501):
+                    raise
+                # No multipart support: stream the whole file in one request
+                async with self._slots:
+                    response = await self.client.put_object(bucket, rel_path, lambda: self.index.open(rel_path, "rb"))
+                self._report(size)
+                self._check(rel_path, response, await self._md5(rel_path))
+                return "uploaded"
+            upload_id = upload["id"]
+            self.state.uploads[rel_path] = [upload_id, size, mtime_ns]
+            self.state.save()
+
+        parts = math.ceil(size / self.chunk_size)
+        self._report(sum(min(self.chunk_size, size - number * self.chunk_size) for number in uploaded), sent=False)
+
+        async def send(number):
+            offset = number * self.chunk_size
+            async with self._slots:
+                data = await asyncio.to_thread(self._read, rel_path, offset, min(self.chunk_size, size - offset))
+                await self.client.put_part(bucket, rel_path, upload_id, number, data)
+            self._report(len(data))
+
+        hashing = asyncio.ensure_future(self._md5(rel_path))
+        # A failed part does not stop the others: every part that arrives is one less to resume
+        sent = await asyncio.gather(*(send(number) for number in range(parts) if number not in uploaded),
+                                    return_exceptions=True)
+        md5 = await hashing
+        errors = [result for result in sent if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+        response = await self.client.complete_multipart(bucket, rel_path, upload_id)
+        del self.state.uploads[rel_path]
+        self._check(rel_path, response, md5)
+        return "resumed" if resumed else "uploaded"
+
+    def _check(self, rel_path, response, md5):
+        checksum = (response or {}).get("checksum")
+        if checksum and checksum != f"md5:{md5}":
+            raise ZenodoError(f"{rel_path} arrived corrupted (server {checksum}, local md5:{md5})")
+
+
+def publish_project(project_path, base_url=ZENODO_API_URL, token=None, deposition_id=None,
+                    concurrency=PUBLISH_CONCURRENCY, chunk_size=CHUNK_SIZE, cache_dir=None, on_progress=None,
+                    index=None):
+    """Upload a project to a Zenodo draft deposition; see ZenodoPublisher"""
+    publisher = ZenodoPublisher(project_path, base_url, token, concurrency, chunk_size, cache_dir, on_progress)
+    return publisher.publish(deposition_id, index)